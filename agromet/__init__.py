@@ -0,0 +1 @@
+"""Couche de calcul d'AGROMET_RCI, indépendante de Streamlit."""
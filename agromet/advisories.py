@@ -0,0 +1,237 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Opérateurs de comparaison autorisés dans les conditions des règles
+OPERATORS = {
+    '<': np.less,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '==': np.equal
+}
+
+# Indicateurs disponibles pour chaque (région, culture)
+INDICATORS = {
+    'pluie_3j': "Cumul de pluie des 3 derniers jours (mm)",
+    'pluie_7j': "Cumul de pluie des 7 derniers jours (mm)",
+    'tmax': "Température maximale du dernier jour (°C)",
+    'vent_max': "Vitesse de vent maximale du dernier jour (m/s)",
+    'reserve': "Taux de remplissage de la réserve en eau du sol (%)",
+    'wrsi': "Satisfaction en eau cumulée du semis normal (%)",
+    'stade': "Stade du semis normal (-1 avant semis, 0 à 3, 4 après récolte)",
+    'jours_avant_semis': "Jours restant avant la date de semis normal",
+    'spi_decade': "SPI décadaire",
+    'spi_3': "SPI-3",
+    'proba_inferieur': "Probabilité d'une saison déficitaire (%)",
+    'proba_superieur': "Probabilité d'une saison excédentaire (%)"
+}
+
+# Règles déclaratives : conditions (indicateur, opérateur, seuil) combinées par ET.
+# 'alerte' concerne toute la région ; 'conseil' est rattaché à une culture (toutes si 'crops' est absent).
+ADVISORY_RULES = [
+    {
+        'id': 'pluies_intenses', 'category': 'alerte', 'level': 'warning', 'icon': '🌧️',
+        'title': "Fort risque de pluies intenses",
+        'message': "Sécuriser les récoltes en cours de séchage ({pluie_3j:.0f} mm en 3 jours, sols saturés)",
+        'when': [('pluie_3j', '>=', 50), ('reserve', '>=', 80)]
+    },
+    {
+        'id': 'vents_forts', 'category': 'alerte', 'level': 'error', 'icon': '💨',
+        'title': "Vents forts",
+        'message': "Renforcer les tuteurages des jeunes plants (jusqu'à {vent_max:.1f} m/s)",
+        'when': [('vent_max', '>=', 7.5)]
+    },
+    {
+        'id': 'secheresse_moderee', 'category': 'alerte', 'level': 'warning', 'icon': '☀️',
+        'title': "Période sèche prolongée",
+        'message': "Planifier l'irrigation des cultures sensibles (SPI-3 = {spi_3:.2f})",
+        'when': [('spi_3', '<=', -1.0), ('spi_3', '>', -1.5)]
+    },
+    {
+        'id': 'secheresse_severe', 'category': 'alerte', 'level': 'error', 'icon': '☀️',
+        'title': "Période sèche prolongée",
+        'message': "Sécheresse sévère : irriguer en priorité les cultures sensibles (SPI-3 = {spi_3:.2f})",
+        'when': [('spi_3', '<=', -1.5)]
+    },
+    {
+        'id': 'reserve_basse', 'category': 'alerte', 'level': 'warning', 'icon': '🌍',
+        'title': "Réserve en eau du sol faible",
+        'message': "Limiter les semis en sol sec (réserve {reserve:.0f}%, {pluie_7j:.0f} mm en 7 jours)",
+        'when': [('reserve', '<=', 30), ('pluie_7j', '<', 10)]
+    },
+    {
+        'id': 'saison_deficitaire', 'category': 'alerte', 'level': 'info', 'icon': '📅',
+        'title': "Saison déficitaire probable",
+        'message': "Privilégier les variétés à cycle court ({proba_inferieur:.0f}% de risque)",
+        'when': [('proba_inferieur', '>=', 45)]
+    },
+    {
+        'id': 'saison_excedentaire', 'category': 'alerte', 'level': 'info', 'icon': '📅',
+        'title': "Saison excédentaire probable",
+        'message': "Prévoir le drainage des parcelles de bas-fond ({proba_superieur:.0f}% de chances)",
+        'when': [('proba_superieur', '>=', 45)]
+    },
+    {
+        'id': 'preparation_champs', 'category': 'conseil', 'level': 'success', 'icon': '✅',
+        'crops': ['Riz'],
+        'message': "**Préparation des champs**: Conditions favorables pour le labour",
+        'when': [('jours_avant_semis', '>', 0), ('jours_avant_semis', '<=', 30), ('reserve', '>=', 40)]
+    },
+    {
+        'id': 'irrigation_riz', 'category': 'conseil', 'level': 'warning', 'icon': '💧',
+        'crops': ['Riz'],
+        'message': "**Irrigation**: Maintenir 5cm d'eau dans les rizières (réserve {reserve:.0f}%)",
+        'when': [('stade', '>=', 0), ('stade', '<=', 3), ('reserve', '<', 60)]
+    },
+    {
+        'id': 'fertilisation_riz', 'category': 'conseil', 'level': 'success', 'icon': '🌿',
+        'crops': ['Riz'],
+        'message': "**Fertilisation**: Apporter l'engrais de fond avant repiquage",
+        'when': [('stade', '==', 0)]
+    },
+    {
+        'id': 'travaux_sols_detrempes', 'category': 'conseil', 'level': 'warning', 'icon': '🚜',
+        'crops': ['Riz'],
+        'message': "**Travaux**: Éviter les interventions mécaniques lourdes",
+        'when': [('pluie_3j', '>=', 30)]
+    },
+    {
+        'id': 'semis_favorable', 'category': 'conseil', 'level': 'success', 'icon': '🌱',
+        'message': "**{culture}**: Période favorable pour le semis",
+        'when': [('jours_avant_semis', '>=', -10), ('jours_avant_semis', '<=', 10), ('spi_decade', '>', -1.0)]
+    },
+    {
+        'id': 'semis_reporter', 'category': 'conseil', 'level': 'warning', 'icon': '⚠️',
+        'message': "**{culture}**: Reporter les semis de 7 jours (déficit pluviométrique)",
+        'when': [('jours_avant_semis', '>=', -10), ('jours_avant_semis', '<=', 10), ('spi_decade', '<=', -1.0)]
+    },
+    {
+        'id': 'stress_hydrique', 'category': 'conseil', 'level': 'warning', 'icon': '⚠️',
+        'message': "**{culture}**: Satisfaction en eau insuffisante (WRSI {wrsi:.0f}%)",
+        'when': [('stade', '>=', 0), ('stade', '<=', 3), ('wrsi', '<', 80)]
+    },
+    {
+        'id': 'besoins_satisfaits', 'category': 'conseil', 'level': 'success', 'icon': '✅',
+        'message': "**{culture}**: Besoins en eau satisfaits (WRSI {wrsi:.0f}%)",
+        'when': [('stade', '>=', 0), ('stade', '<=', 3), ('wrsi', '>=', 95)]
+    },
+    {
+        'id': 'protection_vent', 'category': 'conseil', 'level': 'success', 'icon': '💨',
+        'crops': ['Maïs', 'Igname', 'Légumineuses'],
+        'message': "**Protection**: Installer des brise-vents si nécessaire",
+        'when': [('vent_max', '>=', 6)]
+    },
+    {
+        'id': 'phytosanitaire', 'category': 'conseil', 'level': 'success', 'icon': '🐛',
+        'crops': ['Maïs', 'Légumineuses'],
+        'message': "**Phytosanitaire**: Surveiller les attaques de chenilles",
+        'when': [('pluie_7j', '>=', 20), ('tmax', '>=', 30), ('stade', '>=', 0), ('stade', '<=', 3)]
+    },
+    {
+        'id': 'recolte', 'category': 'conseil', 'level': 'success', 'icon': '🌾',
+        'message': "**{culture}**: Cycle achevé, organiser la récolte et le séchage",
+        'when': [('stade', '==', 4)]
+    }
+]
+
+
+class AdvisoryEngine:
+    """Règles d'avis compilées en masques booléens, évaluées sur toutes les (région, culture) en un lot.
+
+    Toutes les conditions sont regroupées par opérateur et évaluées par une comparaison vectorisée ;
+    une règle est vraie lorsqu'aucune de ses conditions n'échoue. Lors d'une nouvelle évaluation,
+    seules les règles dont un indicateur a changé sont recalculées.
+    """
+
+    def __init__(self, rules=ADVISORY_RULES):
+        self.rules = list(rules)
+        self.rule_ids = [rule['id'] for rule in self.rules]
+        conditions = [(k, *condition) for k, rule in enumerate(self.rules) for condition in rule['when']]
+        unknown = {indicator for _, indicator, _, _ in conditions} - set(INDICATORS)
+        if unknown:
+            raise ValueError(f"Indicateurs inconnus dans les règles : {sorted(unknown)}")
+
+        self.indicators = list(INDICATORS)
+        self._condition_column = np.array([self.indicators.index(c[1]) for c in conditions])
+        self._condition_threshold = np.array([c[3] for c in conditions], dtype=float)
+        self._condition_operator = np.array([c[2] for c in conditions])
+        self._incidence = np.zeros((len(conditions), len(self.rules)), dtype=np.int32)
+        self._incidence[np.arange(len(conditions)), [c[0] for c in conditions]] = 1
+        # Indicateurs lus par chaque règle (matrice règles × indicateurs)
+        self._rule_inputs = np.zeros((len(self.rules), len(self.indicators)), dtype=bool)
+        self._rule_inputs[[c[0] for c in conditions], self._condition_column] = True
+
+        self._index = None
+        self._values = None
+        self._masks = None
+        self._crop_mask = None
+        self.stats = {'evaluations': 0, 'rules_evaluated': 0}
+        self._lock = threading.Lock()
+
+    def _compile_crops(self, index):
+        crops = np.asarray(index.get_level_values('Culture'))
+        return np.column_stack([
+            np.ones(len(crops), dtype=bool) if 'crops' not in rule else np.isin(crops, rule['crops'])
+            for rule in self.rules
+        ])
+
+    def evaluate(self, indicators):
+        """Masque (région, culture) × règles ; indicators est indexé par (Région, Culture)"""
+        with self._lock:
+            values = indicators.reindex(columns=self.indicators).to_numpy(dtype=float)
+            if self._index is None or not self._index.equals(indicators.index):
+                self._index = indicators.index
+                self._crop_mask = self._compile_crops(indicators.index)
+                self._masks = np.zeros((len(values), len(self.rules)), dtype=bool)
+                stale = np.ones(len(self.rules), dtype=bool)
+            else:
+                changed = ~np.all((values == self._values) | (np.isnan(values) & np.isnan(self._values)), axis=0)
+                stale = self._rule_inputs[:, changed].any(axis=1)
+            self._values = values
+
+            rules = np.flatnonzero(stale)
+            if rules.size:
+                conditions = np.flatnonzero(self._incidence[:, rules].any(axis=1))
+                truth = np.zeros((len(values), len(conditions)), dtype=bool)
+                for name, compare in OPERATORS.items():
+                    selected = np.flatnonzero(self._condition_operator[conditions] == name)
+                    if selected.size:
+                        columns = self._condition_column[conditions[selected]]
+                        with np.errstate(invalid='ignore'):
+                            truth[:, selected] = compare(values[:, columns], self._condition_threshold[conditions[selected]])
+                failures = (~truth).astype(np.int32) @ self._incidence[np.ix_(conditions, rules)]
+                self._masks[:, rules] = (failures == 0) & self._crop_mask[:, rules]
+
+            self.stats['evaluations'] += 1
+            self.stats['rules_evaluated'] += int(rules.size)
+            return pd.DataFrame(self._masks.copy(), index=indicators.index, columns=self.rule_ids)
+
+    def advisories(self, masks, indicators, region, category=None):
+        """Avis déclenchés pour une région, messages complétés par les valeurs des indicateurs"""
+        region_masks = masks.xs(region, level='Région')
+        region_values = indicators.xs(region, level='Région')
+        results = []
+        for k, rule in enumerate(self.rules):
+            if category is not None and rule['category'] != category:
+                continue
+            crops = list(region_masks.index[region_masks.iloc[:, k].to_numpy()])
+            if rule['category'] == 'alerte':
+                crops = crops[:1]
+            for crop in crops:
+                values = dict(region_values.loc[crop], culture=crop)
+                results.append({**rule, 'culture': crop, 'message': rule['message'].format(**values)})
+        return results
+
+
+def build_indicators(regions, crops, region_values=None, crop_values=None):
+    """Tableau (Région, Culture) × indicateurs : valeurs régionales diffusées à toutes les cultures"""
+    index = pd.MultiIndex.from_product([list(regions), list(crops)], names=['Région', 'Culture'])
+    indicators = pd.DataFrame(np.nan, index=index, columns=list(INDICATORS))
+    region_level = index.get_level_values('Région')
+    for name, values in (region_values or {}).items():
+        indicators[name] = pd.Series(values, dtype=float).reindex(region_level).to_numpy()
+    for name, values in (crop_values or {}).items():
+        indicators[name] = pd.Series(values, dtype=float).reindex(index).to_numpy()
+    return indicators
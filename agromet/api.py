@@ -0,0 +1,355 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+from urllib.parse import unquote, urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from agromet.cache import LRUCache
+from agromet.metrics import METRICS, PROMETHEUS_CONTENT_TYPE
+from agromet.pipeline import current_hour, generate_weather_data
+from agromet.products import get_product_store, load_product
+from agromet.snapshots import rainfall_deviations
+from agromet.spatial import get_station_index
+from agromet.stations import STATION_REGIONS, STATIONS_DATA
+from agromet.weather import weather_table
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Durée pendant laquelle un client peut réutiliser une réponse sans la revalider (secondes)
+API_MAX_AGE = int(os.environ.get("AGROMET_API_MAX_AGE", "60"))
+
+# Budget mémoire des réponses pré-encodées
+API_CACHE_MB = int(os.environ.get("AGROMET_API_CACHE_MB", "64"))
+
+# Intervalle de relecture du manifeste des produits publiés (secondes)
+RUN_CHECK_SECONDS = 5.0
+
+CONTENT_TYPES = {
+    'json': 'application/json; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8'
+}
+
+
+class NotFound(Exception):
+    pass
+
+
+def _records(frame):
+    return json.loads(frame.to_json(orient='records', date_format='iso', force_ascii=False))
+
+
+def _region(name):
+    if name not in STATIONS_DATA:
+        raise NotFound(f"Région inconnue : {name}")
+    return name
+
+
+# Chaque ressource retourne (document JSON, tableau CSV)
+def weather_resource(station):
+    if station not in STATION_REGIONS:
+        raise NotFound(f"Station inconnue : {station}")
+    panel = load_product('weather')
+    if station in panel.index.get_level_values('Station'):
+        table = weather_table(panel, station)
+    else:
+        table = generate_weather_data(station)
+    return {'station': station, 'region': STATION_REGIONS[station], 'days': _records(table)}, table
+
+
+def precipitation_resource():
+    table = pd.DataFrame({
+        'Précipitations du jour (mm)': pd.Series(load_product('daily_precipitation')),
+        'Précipitations sur 30 jours (mm)': pd.Series(load_product('rainfall_30d'))
+    }).rename_axis('Région').reset_index()
+    return {'regions': _records(table)}, table
+
+
+def spi_resource():
+    table = load_product('spi').round(2).rename_axis('Station').reset_index()
+    table.insert(1, 'Région', table['Station'].map(STATION_REGIONS))
+    return {'stations': _records(table)}, table
+
+
+def rainfall_resource(region):
+    table = rainfall_deviations(load_product('decade_rainfall', _region(region)))
+    stations = get_station_index().stations_in_region(region)
+    spi = load_product('spi').reindex(stations).mean().round(2)
+    document = {
+        'region': region,
+        'spi': {timescale: None if pd.isna(value) else float(value) for timescale, value in spi.items()},
+        'decades': _records(table)
+    }
+    return document, table
+
+
+def seasonal_resource(region):
+    outlook = load_product('seasonal')
+    _region(region)
+    start = pd.Timestamp(outlook['start'])
+    table = pd.DataFrame({
+        'Précipitations (mm)': outlook['monthly_rain'][region].round(0),
+        'Température (°C)': outlook['monthly_tmean'][region].round(1)
+    }).rename_axis('Mois').reset_index()
+    season_dates = {
+        label: None if pd.isna(offset) else (start + pd.Timedelta(days=int(round(offset)))).strftime('%Y-%m-%d')
+        for label, offset in outlook['season_dates'][region].items()
+    }
+    document = {
+        'region': region,
+        'start': outlook['start'],
+        'members': outlook['members'],
+        'terciles': outlook['terciles'][region].round(0).to_dict(),
+        'season_dates': season_dates,
+        'monthly': _records(table)
+    }
+    return document, table
+
+
+def advisories_resource(region):
+    items = load_product('advisories')[_region(region)]
+    calendar = load_product('calendar', region)
+    document = {
+        'region': region,
+        'date': datetime.now().strftime('%Y-%m-%d'),
+        'alerts': [item for item in items if item['category'] == 'alerte'],
+        'advice': [item for item in items if item['category'] == 'conseil'],
+        'calendar': _records(calendar)
+    }
+    table = pd.DataFrame(items, columns=['category', 'level', 'title', 'culture', 'message'])
+    return document, table
+
+
+def index_resource():
+    regions = get_station_index().regions_list()
+    document = {
+        'resources': [
+            '/api/precipitation.{json,csv}',
+            '/api/spi.{json,csv}',
+            '/api/weather/<station>.{json,csv}',
+            '/api/rainfall/<region>.{json,csv}',
+            '/api/seasonal/<region>.{json,csv}',
+            '/api/advisories/<region>.{json,csv}',
+            '/metrics'
+        ],
+        'regions': {region: get_station_index().stations_in_region(region) for region in regions}
+    }
+    table = pd.DataFrame(
+        [(region, station) for region, stations in document['regions'].items() for station in stations],
+        columns=['Région', 'Station']
+    )
+    return document, table
+
+
+# Ressources sans paramètre et ressources paramétrées par une région ou une station
+RESOURCES = {
+    'index': index_resource,
+    'precipitation': precipitation_resource,
+    'spi': spi_resource
+}
+PARAMETRIZED_RESOURCES = {
+    'weather': weather_resource,
+    'rainfall': rainfall_resource,
+    'seasonal': seasonal_resource,
+    'advisories': advisories_resource
+}
+
+
+def resolve(path):
+    """Ressource et format d'un chemin /api/<ressource>[/<paramètre>].<json|csv>"""
+    parts = [unquote(part) for part in urlsplit(path).path.strip('/').split('/')]
+    if not parts or parts[0] != 'api':
+        raise NotFound(path)
+    parts = parts[1:] or ['index.json']
+    name, extension = os.path.splitext(parts[-1])
+    extension = extension.lstrip('.') or 'json'
+    if extension not in CONTENT_TYPES:
+        raise NotFound(path)
+    parts[-1] = name
+    if len(parts) == 1 and parts[0] in RESOURCES:
+        return RESOURCES[parts[0]], (), extension
+    if len(parts) == 2 and parts[0] in PARAMETRIZED_RESOURCES:
+        return PARAMETRIZED_RESOURCES[parts[0]], (parts[1],), extension
+    raise NotFound(path)
+
+
+def encode(document, table, extension):
+    if extension == 'csv':
+        return table.to_csv(index=False).encode('utf-8')
+    return json.dumps(document, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
+
+class EncodedResponse:
+    """Corps d'une réponse et ses variantes compressées, calculés une seule fois"""
+
+    def __init__(self, body, content_type):
+        self.body = body
+        self.content_type = content_type
+        self.tag = hashlib.sha256(body).hexdigest()[:32]
+        self.variants = {'identity': body, 'gzip': gzip.compress(body, compresslevel=6, mtime=0)}
+        if brotli is not None:
+            self.variants['br'] = brotli.compress(body, quality=5)
+
+    def etag(self, coding):
+        # ETag fort propre à chaque représentation (RFC 9110 §8.8.3)
+        return f'"{self.tag}"' if coding == 'identity' else f'"{self.tag}-{coding}"'
+
+    def matches(self, if_none_match):
+        if if_none_match.strip() == '*':
+            return True
+        tags = [tag.strip().removeprefix('W/').strip('"') for tag in if_none_match.split(',')]
+        return any(tag.split('-')[0] == self.tag for tag in tags)
+
+    def size(self):
+        return sum(len(variant) for variant in self.variants.values())
+
+
+def accepted_coding(accept_encoding, available):
+    """Codage préféré parmi ceux acceptés par le client (br, puis gzip, puis identité)"""
+    accepted = {}
+    for item in (accept_encoding or '').split(','):
+        name, _, parameters = item.strip().partition(';')
+        quality = 1.0
+        if parameters.strip().startswith('q='):
+            try:
+                quality = float(parameters.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for coding in ('br', 'gzip'):
+        if coding in available and accepted.get(coding, accepted.get('*', 0.0)) > 0:
+            return coding
+    return 'identity'
+
+
+class ResponseCache:
+    """Réponses pré-encodées, indexées par l'exécution de produits dont elles dérivent"""
+
+    def __init__(self, max_bytes=API_CACHE_MB * 1024 * 1024):
+        self.responses = LRUCache(max_bytes, sizeof=lambda response: response.size())
+        self._lock = threading.Lock()
+        self._run = None
+        self._checked = 0.0
+
+    def current_run(self):
+        """Identifiant de la dernière exécution publiée, ou tranche horaire des caches du pipeline si les
+        produits sont calculés à la volée (les ETag changent alors avec les données)"""
+        with self._lock:
+            if time.monotonic() - self._checked > RUN_CHECK_SECONDS:
+                manifest = get_product_store().manifest(datetime.now().strftime('%Y-%m-%d'))
+                self._run = manifest['run'] if manifest else current_hour()
+                self._checked = time.monotonic()
+            return self._run
+
+    def get(self, path):
+        resource, arguments, extension = resolve(path)
+        key = (self.current_run(), resource.__name__, arguments, extension)
+        return self.responses.get_or_compute(
+            key, lambda: EncodedResponse(encode(*resource(*arguments), extension), CONTENT_TYPES[extension])
+        )
+
+    def warm(self):
+        """Pré-encode toutes les ressources de toutes les régions et stations"""
+        paths = [f"/api/{name}.{extension}" for name in RESOURCES for extension in CONTENT_TYPES]
+        for name in PARAMETRIZED_RESOURCES:
+            keys = list(STATION_REGIONS) if name == 'weather' else list(STATIONS_DATA)
+            paths += [f"/api/{name}/{key}.{extension}" for key in keys for extension in CONTENT_TYPES]
+        for path in paths:
+            self.get(path)
+        return len(paths)
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    cache = None
+    server_version = "AGROMET_RCI"
+
+    def do_GET(self):
+        self.respond(send_body=True)
+
+    def do_HEAD(self):
+        self.respond(send_body=False)
+
+    def respond(self, send_body):
+        if urlsplit(self.path).path.rstrip('/') == '/metrics':
+            return self.send_metrics(send_body)
+        try:
+            with METRICS.timer('api_response', page='api'):
+                response = self.cache.get(self.path)
+        except NotFound as error:
+            return self.send_error_json(404, f"Ressource introuvable : {error}", send_body)
+        except Exception as error:
+            return self.send_error_json(500, str(error), send_body)
+
+        coding = accepted_coding(self.headers.get('Accept-Encoding'), response.variants)
+        if response.matches(self.headers.get('If-None-Match', '')):
+            self.send_response(304)
+            self.send_common_headers(response, coding)
+            self.end_headers()
+            return
+        body = response.variants[coding]
+        self.send_response(200)
+        self.send_common_headers(response, coding)
+        self.send_header('Content-Type', response.content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if coding != 'identity':
+            self.send_header('Content-Encoding', coding)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def send_common_headers(self, response, coding):
+        self.send_header('ETag', response.etag(coding))
+        self.send_header('Cache-Control', f"public, max-age={API_MAX_AGE}")
+        self.send_header('Vary', 'Accept-Encoding')
+
+    def send_metrics(self, send_body):
+        body = METRICS.prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', PROMETHEUS_CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def send_error_json(self, status, message, send_body):
+        body = json.dumps({'error': message}, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', CONTENT_TYPES['json'])
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host="127.0.0.1", port=8502, cache=None):
+    cache = cache or ResponseCache()
+    METRICS.register_cache('api_responses', cache.responses.stats)
+    handler = type('Handler', (ApiHandler,), {'cache': cache})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API JSON/CSV des produits AGROMET_RCI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--warm", action="store_true", help="Pré-encoder toutes les réponses au démarrage")
+    args = parser.parse_args()
+    server = make_server(args.host, args.port)
+    if args.warm:
+        started = time.perf_counter()
+        count = server.RequestHandlerClass.cache.warm()
+        print(f"{count} réponses pré-encodées en {time.perf_counter() - started:.1f} s")
+    print(f"API disponible sur http://{args.host}:{args.port}/api")
+    server.serve_forever()
@@ -0,0 +1,191 @@
+import os
+import re
+import threading
+import unicodedata
+import multiprocessing
+from io import BytesIO
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import numpy as np
+
+from agromet.cache import content_hash
+from agromet.interpolation import INTERPOLATORS, MAX_STATION_DISTANCE_KM, national_grid, station_points
+
+# Version de mise en page : la changer invalide les bulletins déjà rendus
+BULLETIN_LAYOUT_VERSION = 1
+
+# Nombre de processus de rendu (par défaut un par cœur)
+BULLETIN_WORKERS = int(os.environ.get("AGROMET_BULLETIN_WORKERS", "0")) or None
+
+
+# Nom de fichier adressé par le contenu : même région, même date, mêmes données -> même PDF
+def bulletin_path(directory, content):
+    return os.path.join(directory, f"{content_hash('bulletin', BULLETIN_LAYOUT_VERSION, content)}.pdf")
+
+
+# Équivalents latin-1 des symboles hors du jeu des polices standard du PDF
+PLAIN_SUBSTITUTIONS = str.maketrans({
+    'œ': 'oe', 'Œ': 'OE', '≈': '~', '≤': '<=', '≥': '>=', '≠': '!=', '–': '-', '—': '-', '−': '-',
+    '‘': "'", '’': "'", '“': '"', '”': '"', '…': '...', '•': '-', '→': '->'
+})
+
+
+# Caractère latin-1, ou sa décomposition latin-1 (lettres accentuées), sinon rien (émojis)
+def _latin1(char):
+    if ord(char) < 256:
+        return char
+    return unicodedata.normalize('NFKD', char).encode('latin-1', 'ignore').decode('latin-1')
+
+
+# Texte compatible avec les polices standard du PDF (sans Markdown ni émojis)
+def _plain(text):
+    text = re.sub(r"\*\*(.+?)\*\*", r"\1", str(text)).translate(PLAIN_SUBSTITUTIONS)
+    return ''.join(_latin1(char) for char in text).strip()
+
+
+def _figure_png(figure):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    buffer = BytesIO()
+    FigureCanvasAgg(figure).print_png(buffer)
+    return buffer.getvalue()
+
+
+def render_map_png(values, palette, title, unit=""):
+    """Carte statique de la surface interpolée et des points de mesure"""
+    from matplotlib.figure import Figure
+    from matplotlib.colors import LinearSegmentedColormap
+
+    lats, lons, data = station_points(values)
+    grid_lats, grid_lons = national_grid(160)
+    if data.size > 1:
+        grid, nearest = INTERPOLATORS['idw'](lats, lons, data, grid_lats, grid_lons)
+    else:
+        grid, nearest = np.full(grid_lats.shape, data[0] if data.size else 0.0), np.zeros(grid_lats.shape)
+    grid = np.ma.masked_where(nearest > MAX_STATION_DISTANCE_KM, grid)
+
+    figure = Figure(figsize=(6, 5), dpi=120)
+    axes = figure.add_subplot()
+    colormap = LinearSegmentedColormap.from_list('bulletin', palette)
+    mesh = axes.pcolormesh(grid_lons, grid_lats, grid, cmap=colormap, shading='auto')
+    axes.scatter(lons, lats, c='black', s=12)
+    for name, lat, lon in zip(values, lats, lons):
+        axes.annotate(_plain(name), (lon, lat), fontsize=6, xytext=(3, 3), textcoords='offset points')
+    figure.colorbar(mesh, ax=axes, label=_plain(unit))
+    axes.set_title(_plain(title), fontsize=10)
+    axes.set_aspect(1 / np.cos(np.radians(np.mean(grid_lats))))
+    axes.set_xlabel("Longitude")
+    axes.set_ylabel("Latitude")
+    return _figure_png(figure)
+
+
+def render_rainfall_chart(labels, observed, normal):
+    """Histogramme décadaire : pluie observée et normale"""
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=(7, 3), dpi=120)
+    axes = figure.add_subplot()
+    x = np.arange(len(labels))
+    axes.bar(x - 0.2, np.nan_to_num(np.asarray(observed, dtype=float)), 0.4, label="Pluie observée", color='#6baed6')
+    axes.bar(x + 0.2, np.nan_to_num(np.asarray(normal, dtype=float)), 0.4, label="Moyenne 30 ans", color='#08519c')
+    axes.set_xticks(x)
+    axes.set_xticklabels([_plain(label) for label in labels], rotation=60, ha='right', fontsize=6)
+    axes.set_ylabel("Précipitations (mm)")
+    axes.legend(fontsize=7)
+    figure.tight_layout()
+    return _figure_png(figure)
+
+
+def render_bulletin(content, path):
+    """Rend le bulletin PDF d'une région (reportlab) ; le fichier n'apparaît qu'une fois complet"""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import cm
+    from reportlab.platypus import Image, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    styles = getSampleStyleSheet()
+    cell = styles['BodyText']
+
+    def table(header, rows, widths):
+        data = [[Paragraph(f"<b>{_plain(h)}</b>", cell) for h in header]]
+        data += [[Paragraph(_plain(value), cell) for value in row] for row in rows]
+        result = Table(data, colWidths=[w * cm for w in widths], repeatRows=1)
+        result.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E8B57')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP')
+        ]))
+        return result
+
+    def image(png, width):
+        reader = Image(BytesIO(png))
+        reader.drawHeight = width * cm * reader.imageHeight / reader.imageWidth
+        reader.drawWidth = width * cm
+        return reader
+
+    story = [
+        Paragraph(_plain(f"Bulletin agrométéorologique - Région {content['region']}"), styles['Title']),
+        Paragraph(_plain(f"Bulletin du {content['date']}"), styles['Normal']),
+        Spacer(1, 0.4 * cm),
+        table(["Indicateur", "Valeur"], content['indicators'], [9, 8]),
+        Spacer(1, 0.4 * cm),
+        Paragraph(_plain(content['map']['title']), styles['Heading2']),
+        image(render_map_png(content['map']['values'], content['map']['palette'],
+                             content['map']['title'], content['map']['unit']), 13),
+        Paragraph("Situation pluviométrique décadaire", styles['Heading2']),
+        image(render_rainfall_chart(**content['rainfall']), 17),
+        Paragraph("Satisfaction en eau des cultures (semis normal)", styles['Heading2']),
+        table(["Culture", "Initial", "Développement", "Mi-saison", "WRSI"], content['wrsi'], [4, 3, 3.5, 3, 3]),
+        Paragraph("Alertes", styles['Heading2']),
+        table(["Alerte", "Recommandation"], content['alerts'] or [["-", "Aucune alerte en cours"]], [5, 12]),
+        Paragraph("Conseils par culture", styles['Heading2']),
+        table(["Culture", "Conseil"], content['advice'] or [["-", "Aucun conseil particulier"]], [4, 13]),
+        Paragraph("Calendrier agricole", styles['Heading2']),
+        table(["Semaine", "Activités", "Conditions", "Priorité"], content['calendar'], [3, 8, 4, 2])
+    ]
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    SimpleDocTemplate(temporary, pagesize=A4, title=_plain(f"Bulletin {content['region']}"),
+                      leftMargin=2 * cm, rightMargin=2 * cm, topMargin=1.5 * cm, bottomMargin=1.5 * cm).build(story)
+    os.replace(temporary, path)
+    return path
+
+
+# Tâche exécutée dans un processus de rendu : relit le PDF s'il existe déjà
+def bulletin_job(content, directory):
+    path = bulletin_path(directory, content)
+    if not os.path.exists(path):
+        render_bulletin(content, path)
+    return path
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor(max_workers=BULLETIN_WORKERS):
+    """Pool de processus partagé ; 'spawn' évite de dupliquer les threads du serveur Streamlit"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+        return _executor
+
+
+def submit_bulletin(content, directory, executor=None):
+    """Future du chemin du PDF ; déjà résolue si le bulletin est en cache"""
+    path = bulletin_path(directory, content)
+    if os.path.exists(path):
+        future = Future()
+        future.set_result(path)
+        return future
+    return (executor or get_executor()).submit(bulletin_job, content, directory)
+
+
+def render_bulletins(contents, directory, executor=None):
+    """Rend en parallèle sur le pool partagé les bulletins d'un lot de régions ; retourne {région: chemin du PDF}"""
+    futures = {content['region']: submit_bulletin(content, directory, executor) for content in contents}
+    return {region: future.result() for region, future in futures.items()}
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+
+# Empreinte de contenu stable pour des entrées JSON-sérialisables
+def content_hash(*parts):
+    """Retourne un SHA-256 hexadécimal calculé sur la forme JSON canonique des arguments"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _default_sizeof(value):
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    return 1
+
+
+class LRUCache:
+    """Cache LRU thread-safe borné par un budget mémoire en octets"""
+
+    def __init__(self, max_bytes, sizeof=_default_sizeof):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            # Une entrée plus grande que le budget n'est jamais conservée
+            if size > self.max_bytes:
+                return value
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+        return value
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = self.put(key, compute())
+        return value
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes
+            }
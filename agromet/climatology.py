@@ -0,0 +1,280 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from agromet.weather import MONTH_LABELS, DECADE_LABELS
+
+DEKADS_PER_YEAR = 36
+NORMAL_YEARS = 30
+DEKADS = pd.RangeIndex(1, DEKADS_PER_YEAR + 1, name='Décade')
+
+# Libellés d'affichage des 36 décades de l'année
+DEKAD_LABELS = [f"{month} - {decade}" for month in MONTH_LABELS for decade in DECADE_LABELS]
+
+
+# Décade de l'année (1 à 36) avec les bornes 1-10 / 11-20 / 21-fin de mois
+def dekad_of_year(dates):
+    dates = pd.DatetimeIndex(dates)
+    return (dates.month.to_numpy() - 1) * 3 + np.minimum((dates.day.to_numpy() - 1) // 10, 2) + 1
+
+
+# Premier jour de la décade contenant la date
+def dekad_start(date):
+    date = pd.Timestamp(date).normalize()
+    return date.replace(day=min((date.day - 1) // 10, 2) * 10 + 1)
+
+
+def dekadal_totals(daily):
+    """Cumuls décadaires d'un tableau jours × stations, en un seul regroupement (année, décade)"""
+    totals = daily.groupby([daily.index.year, dekad_of_year(daily.index)]).sum(min_count=1)
+    totals.index.names = ['Année', 'Décade']
+    return totals
+
+
+# Classes de l'histogramme des cumuls décadaires (mm) : décades sèches, puis classes logarithmiques
+SKETCH_EDGES = np.concatenate([[0.0, 0.1], np.geomspace(1.0, 1000.0, 39)])
+SKETCH_BINS = len(SKETCH_EDGES) - 1
+
+
+def sketch_bin(values):
+    return np.clip(np.searchsorted(SKETCH_EDGES, values, side='right') - 1, 0, SKETCH_BINS - 1)
+
+
+# Colonnes (stations) d'un tableau réordonnées selon une liste de stations, NaN pour les stations absentes
+def take_stations(values, saved, stations, fill=np.nan):
+    positions = pd.Index(saved).get_indexer(stations)
+    taken = np.take(values, np.maximum(positions, 0), axis=-1)
+    if (positions < 0).any():
+        taken = np.where(positions < 0, fill, taken)
+    return taken
+
+
+class RunningStats:
+    """Statistiques suffisantes fusionnables d'un tableau de cellules : effectif, moyenne, M2 et histogramme"""
+
+    def __init__(self, shape):
+        self.count = np.zeros(shape, dtype=np.int32)
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)
+        self.sketch = np.zeros(tuple(shape) + (SKETCH_BINS,), dtype=np.uint16)
+
+    @classmethod
+    def from_values(cls, values):
+        values = np.asarray(values, dtype=float)
+        stats = cls(values.shape)
+        valid = ~np.isnan(values)
+        stats.count[valid] = 1
+        stats.mean[valid] = values[valid]
+        np.put_along_axis(
+            stats.sketch, sketch_bin(np.nan_to_num(values))[..., None], valid[..., None].astype(np.uint16), axis=-1
+        )
+        return stats
+
+    def add(self, index, values):
+        """Mise à jour de Welford d'une ligne de cellules ; les valeurs manquantes sont ignorées"""
+        values = np.asarray(values, dtype=float)
+        valid = ~np.isnan(values)
+        count = self.count[index] + valid
+        delta = np.where(valid, values - self.mean[index], 0.0)
+        mean = self.mean[index] + np.where(valid, delta / np.maximum(count, 1), 0.0)
+        self.m2[index] += np.where(valid, delta * (values - mean), 0.0)
+        self.mean[index] = mean
+        self.count[index] = count
+        bins = sketch_bin(np.nan_to_num(values))
+        row = self.sketch[index]
+        np.put_along_axis(row, bins[..., None], np.take_along_axis(row, bins[..., None], -1) + valid[..., None], -1)
+        self.sketch[index] = row
+
+    def merge(self, other):
+        """Fusion de deux agrégats partiels (formule de Chan et al.)"""
+        merged = RunningStats(self.count.shape)
+        merged.count = self.count + other.count
+        n = np.maximum(merged.count, 1)
+        delta = other.mean - self.mean
+        merged.mean = self.mean + delta * other.count / n
+        merged.m2 = self.m2 + other.m2 + delta ** 2 * self.count * other.count / n
+        merged.sketch = self.sketch + other.sketch
+        return merged
+
+    def copy(self):
+        return self.merge(RunningStats(self.count.shape))
+
+    def reindex(self, saved, stations):
+        """Agrégats réordonnés selon les stations données ; une station absente n'a aucune observation"""
+        stats = RunningStats(self.count.shape[:-1] + (len(stations),))
+        stats.count = take_stations(self.count, saved, stations, fill=0).astype(np.int32)
+        stats.mean = take_stations(self.mean, saved, stations, fill=0.0)
+        stats.m2 = take_stations(self.m2, saved, stations, fill=0.0)
+        sketch = take_stations(np.moveaxis(self.sketch, -1, 0), saved, stations, fill=0)
+        stats.sketch = np.moveaxis(sketch, 0, -1).astype(np.uint16)
+        return stats
+
+    def mean_values(self):
+        return np.where(self.count > 0, self.mean, np.nan)
+
+    def variance(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > 1, self.m2 / (self.count - 1), np.nan)
+
+    def std(self):
+        return np.sqrt(self.variance())
+
+    def quantile(self, q):
+        """Quantile approché par interpolation linéaire dans la classe de l'histogramme"""
+        cumulative = np.cumsum(self.sketch, axis=-1, dtype=float)
+        total = cumulative[..., -1]
+        target = q * total
+        bins = np.minimum((cumulative < target[..., None]).sum(axis=-1), SKETCH_BINS - 1)
+        below = np.where(bins > 0, np.take_along_axis(cumulative, np.maximum(bins - 1, 0)[..., None], -1)[..., 0], 0.0)
+        inside = np.take_along_axis(self.sketch, bins[..., None], -1)[..., 0].astype(float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            fraction = np.clip(np.where(inside > 0, (target - below) / inside, 0.0), 0.0, 1.0)
+        value = SKETCH_EDGES[bins] + fraction * (SKETCH_EDGES[bins + 1] - SKETCH_EDGES[bins])
+        return np.where(total > 0, value, np.nan)
+
+
+class Climatology:
+    """Climatologie décadaire incrémentale : agrégats partiels par année et par (décade, station).
+
+    Les normales d'une période de référence quelconque s'obtiennent en fusionnant les agrégats
+    annuels ; une décade nouvellement close est intégrée en O(1) par station.
+    """
+
+    def __init__(self, stations, yearly=None):
+        self.stations = list(stations)
+        self.yearly = dict(yearly or {})
+        self._normals = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, daily, stations=None):
+        climatology = cls(stations if stations is not None else daily.columns)
+        climatology.add_years(dekadal_totals(daily))
+        return climatology
+
+    def _year_values(self, dekadal, year):
+        return dekadal.xs(year, level='Année').reindex(index=DEKADS, columns=self.stations).to_numpy()
+
+    def add_years(self, dekadal, years=None):
+        """Ajoute (ou remplace) les agrégats annuels à partir d'une table de cumuls décadaires"""
+        available = set(dekadal.index.get_level_values('Année'))
+        years = sorted(available if years is None else available & set(years))
+        with self._lock:
+            for year in years:
+                self.yearly[year] = RunningStats.from_values(self._year_values(dekadal, year))
+            self._normals = {period: stats for period, stats in self._normals.items()
+                             if not any(period[0] <= year <= period[1] for year in years)}
+        return years
+
+    def missing_years(self, first_year, last_year):
+        return [year for year in range(first_year, last_year + 1) if year not in self.yearly]
+
+    def ingest(self, year, dekad, values):
+        """Intègre une décade close ; les cellules déjà renseignées pour cette année sont ignorées"""
+        values = pd.Series(values, dtype=float).reindex(self.stations).to_numpy()
+        with self._lock:
+            stats = self.yearly.setdefault(year, RunningStats((len(DEKADS), len(self.stations))))
+            values = np.where(stats.count[dekad - 1] > 0, np.nan, values)
+            new = int((~np.isnan(values)).sum())
+            if new:
+                stats.add(dekad - 1, values)
+                # Les normales déjà fusionnées qui couvrent cette année sont mises à jour sur place
+                for (first_year, last_year), normal in self._normals.items():
+                    if first_year <= year <= last_year:
+                        normal.add(dekad - 1, values)
+            return new
+
+    def ingest_dekadal(self, dekadal):
+        """Intègre toutes les décades d'une table de cumuls (année, décade) × stations"""
+        return sum(self.ingest(year, dekad, row) for (year, dekad), row in dekadal.iterrows())
+
+    def normal_stats(self, first_year, last_year):
+        with self._lock:
+            if (first_year, last_year) not in self._normals:
+                merged = RunningStats((len(DEKADS), len(self.stations)))
+                for year in range(first_year, last_year + 1):
+                    if year in self.yearly:
+                        merged = merged.merge(self.yearly[year])
+                self._normals[(first_year, last_year)] = merged
+            return self._normals[(first_year, last_year)]
+
+    def _frame(self, values):
+        return pd.DataFrame(values, index=DEKADS, columns=self.stations)
+
+    def normals(self, first_year, last_year):
+        """Moyennes décadaires (mm) sur la période de référence, décades × stations"""
+        return self._frame(self.normal_stats(first_year, last_year).mean_values())
+
+    def normal_quantiles(self, q, first_year, last_year):
+        return self._frame(self.normal_stats(first_year, last_year).quantile(q))
+
+    def year_totals(self, year):
+        if year not in self.yearly:
+            return self._frame(np.nan)
+        return self._frame(self.yearly[year].mean_values())
+
+    def dekadal_array(self, first_year, last_year, stations=None):
+        """Cumuls décadaires (années × décades × stations), NaN pour les années et les stations absentes"""
+        values = np.stack([
+            self.yearly[year].mean_values() if year in self.yearly
+            else np.full((len(DEKADS), len(self.stations)), np.nan)
+            for year in range(first_year, last_year + 1)
+        ])
+        if stations is None:
+            return values
+        return take_stations(values, self.stations, stations)
+
+    def save(self, path):
+        with self._lock:
+            years = sorted(self.yearly)
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            temporary = f"{path}.{os.getpid()}.tmp"
+            with open(temporary, 'wb') as f:
+                np.savez(
+                    f,
+                    stations=np.array(self.stations),
+                    years=np.array(years, dtype=np.int16),
+                    count=np.stack([self.yearly[y].count for y in years]) if years else np.zeros(0),
+                    mean=np.stack([self.yearly[y].mean for y in years]) if years else np.zeros(0),
+                    m2=np.stack([self.yearly[y].m2 for y in years]) if years else np.zeros(0),
+                    sketch=np.stack([self.yearly[y].sketch for y in years]) if years else np.zeros(0)
+                )
+            os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path, stations=None):
+        """Relit une climatologie ; avec stations, les agrégats sont réordonnés (stations absentes vides)"""
+        saved = np.load(path)
+        saved_stations = [str(s) for s in saved['stations']]
+        climatology = cls(saved_stations if stations is None else stations)
+        for k, year in enumerate(saved['years']):
+            stats = RunningStats(saved['count'].shape[1:])
+            stats.count, stats.mean, stats.m2, stats.sketch = (
+                saved['count'][k], saved['mean'][k], saved['m2'][k], saved['sketch'][k]
+            )
+            if climatology.stations != saved_stations:
+                stats = stats.reindex(saved_stations, climatology.stations)
+            climatology.yearly[int(year)] = stats
+        return climatology
+
+
+# Tableau décadaire d'un groupe de stations : observé, normale, écart et année précédente
+def decade_rainfall_table(climatology, observed_daily, stations, year, normal_years=NORMAL_YEARS):
+    observed = dekadal_totals(observed_daily.reindex(columns=stations))
+    if year in observed.index.get_level_values('Année'):
+        observed = observed.xs(year, level='Année').reindex(DEKADS).mean(axis=1)
+    else:
+        observed = pd.Series(np.nan, index=DEKADS)
+    normal = climatology.normals(year - normal_years, year - 1).reindex(columns=stations).mean(axis=1).round(1)
+    previous = climatology.year_totals(year - 1).reindex(columns=stations).mean(axis=1)
+    observed = observed.round(1)
+
+    return pd.DataFrame({
+        'Période': DEKAD_LABELS,
+        'Pluie observée (mm)': observed.to_numpy(),
+        'Moyenne 30 ans (mm)': normal.to_numpy(),
+        'Écart (mm)': (observed - normal).round(1).to_numpy(),
+        'Année précédente (mm)': previous.round(1).to_numpy()
+    })
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+
+from agromet.spatial import get_station_index
+
+SOLAR_CONSTANT = 0.0820  # MJ m-2 min-1
+STEFAN_BOLTZMANN = 4.903e-9  # MJ K-4 m-2 j-1
+ALBEDO = 0.23  # gazon de référence
+
+# Altitude (m) et hauteur de l'anémomètre (m) supposées quand la station ne les précise pas
+DEFAULT_ELEVATION = 200
+DEFAULT_WIND_HEIGHT = 2
+
+
+# Rayonnement extraterrestre Ra (MJ m-2 j-1), FAO-56 équations 21 à 25
+def extraterrestrial_radiation(lat_deg, day_of_year):
+    phi = np.radians(lat_deg)
+    j = np.asarray(day_of_year, dtype=float)
+    dr = 1 + 0.033 * np.cos(2 * np.pi * j / 365)
+    delta = 0.409 * np.sin(2 * np.pi * j / 365 - 1.39)
+    ws = np.arccos(np.clip(-np.tan(phi) * np.tan(delta), -1.0, 1.0))
+    return (24 * 60 / np.pi) * SOLAR_CONSTANT * dr * (
+        ws * np.sin(phi) * np.sin(delta) + np.cos(phi) * np.cos(delta) * np.sin(ws)
+    )
+
+
+# ET0 de Hargreaves (mm/j), FAO-56 équation 52
+def hargreaves_et0(tmin, tmax, lat_deg, day_of_year):
+    tmin = np.asarray(tmin, dtype=float)
+    tmax = np.asarray(tmax, dtype=float)
+    ra = extraterrestrial_radiation(lat_deg, day_of_year)
+    tmean = (tmin + tmax) / 2
+    return np.maximum(0.0023 * (tmean + 17.8) * np.sqrt(np.maximum(tmax - tmin, 0.0)) * 0.408 * ra, 0.0)
+
+
+# Pression de vapeur saturante (kPa), FAO-56 équation 11
+def saturation_vapour_pressure(t):
+    return 0.6108 * np.exp(17.27 * t / (t + 237.3))
+
+
+# ET0 de Penman-Monteith FAO-56 (mm/j), équation 6, sur des tableaux diffusables
+def penman_monteith_et0(tmin, tmax, rh_min, rh_max, wind_speed, sunshine_hours, lat_deg, day_of_year,
+                        elevation=DEFAULT_ELEVATION, wind_height=DEFAULT_WIND_HEIGHT):
+    tmin = np.asarray(tmin, dtype=float)
+    tmax = np.asarray(tmax, dtype=float)
+    tmean = (tmin + tmax) / 2
+
+    # Pression atmosphérique et constante psychrométrique (équations 7 et 8)
+    pressure = 101.3 * ((293 - 0.0065 * elevation) / 293) ** 5.26
+    gamma = 0.000665 * pressure
+
+    # Vent ramené à 2 m (équation 47)
+    u2 = np.asarray(wind_speed, dtype=float) * 4.87 / np.log(67.8 * wind_height - 5.42)
+
+    # Déficit de pression de vapeur (équations 12 et 17)
+    es_min = saturation_vapour_pressure(tmin)
+    es_max = saturation_vapour_pressure(tmax)
+    es = (es_min + es_max) / 2
+    ea = (es_min * np.asarray(rh_max, dtype=float) / 100 + es_max * np.asarray(rh_min, dtype=float) / 100) / 2
+    delta = 4098 * saturation_vapour_pressure(tmean) / (tmean + 237.3) ** 2
+
+    # Rayonnement : Angström pour Rs, bilan net courtes et grandes longueurs d'onde (équations 34 à 40)
+    phi = np.radians(lat_deg)
+    j = np.asarray(day_of_year, dtype=float)
+    declination = 0.409 * np.sin(2 * np.pi * j / 365 - 1.39)
+    ws = np.arccos(np.clip(-np.tan(phi) * np.tan(declination), -1.0, 1.0))
+    daylight_hours = 24 / np.pi * ws
+    ra = extraterrestrial_radiation(lat_deg, day_of_year)
+    rs = (0.25 + 0.50 * np.clip(np.asarray(sunshine_hours, dtype=float) / daylight_hours, 0.0, 1.0)) * ra
+    rso = (0.75 + 2e-5 * elevation) * ra
+    rns = (1 - ALBEDO) * rs
+    rnl = STEFAN_BOLTZMANN * ((tmax + 273.16) ** 4 + (tmin + 273.16) ** 4) / 2 \
+        * (0.34 - 0.14 * np.sqrt(np.maximum(ea, 0.0))) \
+        * (1.35 * np.clip(rs / rso, 0.0, 1.0) - 0.35)
+    rn = rns - rnl
+
+    numerator = 0.408 * delta * rn + gamma * 900 / (tmean + 273) * u2 * (es - ea)
+    return np.maximum(numerator / (delta + gamma * (1 + 0.34 * u2)), 0.0)
+
+
+# ET0 Penman-Monteith, avec repli sur Hargreaves là où humidité, vent ou insolation manquent
+def reference_et0(tmin, tmax, rh_min, rh_max, wind_speed, sunshine_hours, lat_deg, day_of_year,
+                  elevation=DEFAULT_ELEVATION, wind_height=DEFAULT_WIND_HEIGHT):
+    with np.errstate(invalid='ignore'):
+        pm = penman_monteith_et0(tmin, tmax, rh_min, rh_max, wind_speed, sunshine_hours,
+                                 lat_deg, day_of_year, elevation, wind_height)
+    hargreaves = hargreaves_et0(tmin, tmax, lat_deg, day_of_year)
+    return np.where(np.isnan(pm), hargreaves, pm)
+
+
+# Tableau jours × stations d'une colonne du panneau
+def panel_matrix(panel, column, stations=None):
+    matrix = panel[column].unstack('Station')
+    return matrix if stations is None else matrix.reindex(columns=stations)
+
+
+# ET0 journalière de toutes les stations d'un panneau (jours × stations)
+def panel_et0(panel, stations=None, elevation=DEFAULT_ELEVATION, wind_height=DEFAULT_WIND_HEIGHT):
+    tmin = panel_matrix(panel, 'Température Min (°C)', stations)
+    stations = list(tmin.columns)
+
+    def column(name):
+        if name not in panel.columns:
+            return np.full(tmin.shape, np.nan)
+        return panel_matrix(panel, name, stations).to_numpy()
+
+    station_index = get_station_index()
+    lats = np.array([station_index.coordinates(s)[0] for s in stations])[None, :]
+    doy = tmin.index.dayofyear.to_numpy()[:, None]
+    et0 = reference_et0(
+        tmin.to_numpy(), column('Température Max (°C)'),
+        column('Humidité Min (%)'), column('Humidité Max (%)'),
+        column('Vitesse Vent (m/s)'), column('Insolation (h)'),
+        lats, doy, elevation, wind_height
+    )
+    return pd.DataFrame(np.round(et0, 2), index=tmin.index, columns=stations)
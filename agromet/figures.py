@@ -0,0 +1,139 @@
+import plotly.graph_objects as go
+
+
+# Évolution des températures d'une station sur les derniers jours
+def temperature_figure(weather_data):
+    figure = go.Figure()
+    figure.add_trace(go.Scatter(
+        x=weather_data['Date'],
+        y=weather_data['Température Max (°C)'],
+        mode='lines+markers',
+        name='Temp Max',
+        line=dict(color='red')
+    ))
+    figure.add_trace(go.Scatter(
+        x=weather_data['Date'],
+        y=weather_data['Température Min (°C)'],
+        mode='lines+markers',
+        name='Temp Min',
+        line=dict(color='blue')
+    ))
+    figure.update_layout(title="📈 Évolution des Températures", xaxis_title="Date", yaxis_title="Température (°C)")
+    return figure
+
+
+# Pluie décadaire observée, normale et de l'année précédente
+def decade_rainfall_figure(rainfall_data):
+    figure = go.Figure()
+    figure.add_trace(go.Bar(
+        name='Pluie observée',
+        x=rainfall_data['Période'],
+        y=rainfall_data['Pluie observée (mm)'],
+        marker_color='lightblue'
+    ))
+    figure.add_trace(go.Bar(
+        name='Moyenne 30 ans',
+        x=rainfall_data['Période'],
+        y=rainfall_data['Moyenne 30 ans (mm)'],
+        marker_color='darkblue'
+    ))
+    figure.add_trace(go.Bar(
+        name='Année précédente',
+        x=rainfall_data['Période'],
+        y=rainfall_data['Année précédente (mm)'],
+        marker_color='green'
+    ))
+    figure.update_layout(
+        title="📊 Comparaison Pluviométrique par Décade",
+        barmode='group',
+        xaxis_title="Période",
+        yaxis_title="Précipitations (mm)"
+    )
+    return figure
+
+
+# Pluie et température mensuelles prévues (moyennes d'ensemble)
+def seasonal_timeline_figure(months, precipitation, temperature):
+    figure = go.Figure()
+    figure.add_trace(go.Bar(
+        name='Précipitations (mm)',
+        x=months,
+        y=precipitation,
+        yaxis='y',
+        marker_color='lightblue'
+    ))
+    figure.add_trace(go.Scatter(
+        name='Température (°C)',
+        x=months,
+        y=temperature,
+        yaxis='y2',
+        mode='lines+markers',
+        marker_color='red'
+    ))
+    figure.update_layout(
+        title="📈 Évolution Mensuelle des Prévisions",
+        xaxis_title="Mois",
+        yaxis=dict(title="Précipitations (mm)", side="left"),
+        yaxis2=dict(title="Température (°C)", side="right", overlaying="y")
+    )
+    return figure
+
+
+# Satisfaction en eau par stade ; None pour un stade pas encore atteint
+def stage_satisfaction_figure(stages, satisfaction_levels, crop, region):
+    plotted_levels = [x or 0 for x in satisfaction_levels]
+    figure = go.Figure(data=[
+        go.Bar(
+            x=stages,
+            y=plotted_levels,
+            marker_color=['green' if x >= 80 else 'orange' if x >= 60 else 'red' for x in plotted_levels],
+            text=["À venir" if x is None else f"{x}%" for x in satisfaction_levels],
+            textposition='auto'
+        )
+    ])
+    figure.update_layout(
+        title=f"📊 Satisfaction en Eau par Stade - {crop} - {region}",
+        xaxis_title="Stades de Développement",
+        yaxis_title="Niveau de Satisfaction (%)",
+        yaxis=dict(range=[0, 100])
+    )
+    return figure
+
+
+# Évolution de la réserve en eau du sol avec les seuils critique et optimal
+def soil_reserve_figure(dates, water_reserve):
+    figure = go.Figure()
+    figure.add_trace(go.Scatter(
+        x=dates,
+        y=water_reserve,
+        mode='lines+markers',
+        name='Réserve en eau (%)',
+        line=dict(color='blue', width=3),
+        fill='tonexty'
+    ))
+    figure.add_hline(y=30, line_dash="dash", line_color="red", annotation_text="Seuil critique")
+    figure.add_hline(y=80, line_dash="dash", line_color="green", annotation_text="Seuil optimal")
+    figure.update_layout(
+        title="📈 Évolution de la Réserve en Eau du Sol",
+        xaxis_title="Date",
+        yaxis_title="Réserve en Eau (%)",
+        yaxis=dict(range=[0, 100])
+    )
+    return figure
+
+
+# Séries longues déjà réduites (station -> série) ; WebGL au-delà de `webgl_threshold` points
+def long_series_figure(series, column, webgl_threshold):
+    trace = go.Scattergl if sum(len(values) for values in series.values()) > webgl_threshold else go.Scatter
+    figure = go.Figure()
+    for station, values in series.items():
+        figure.add_trace(trace(x=values.index, y=values.to_numpy(), mode='lines', name=station))
+    figure.update_layout(
+        title=f"📈 {column}",
+        xaxis_title="Date",
+        yaxis_title=column,
+        dragmode='select',
+        selectdirection='h',
+        hovermode='x unified'
+    )
+    return figure
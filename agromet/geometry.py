@@ -0,0 +1,305 @@
+import os
+import json
+import math
+
+import numpy as np
+
+from agromet.resources import RESOURCES
+from agromet.spatial import KM_PER_DEGREE, get_station_index
+from agromet.stations import COTE_DIVOIRE_BOUNDS, STATIONS_DATA
+
+# Limites des régions : GeoJSON (Polygon / MultiPolygon) dont une propriété porte le nom de la région
+# tel qu'écrit dans STATIONS_DATA. À défaut, chaque région est approchée par la zone d'influence
+# de ses stations (cellules plus proches d'une de ses stations que de toute autre) dans l'emprise nationale.
+REGIONS_FILE = os.environ.get(
+    "AGROMET_REGIONS_FILE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "geometry", "regions.geojson")
+)
+REGION_PROPERTY = os.environ.get("AGROMET_REGIONS_PROPERTY", "region")
+
+# Pas (degrés) de la grille des zones d'influence et distance maximale à une station (comme la surface interpolée)
+CATCHMENT_CELL_DEG = 0.02
+CATCHMENT_MAX_KM = 150
+
+# Niveaux de détail : zoom à partir duquel chaque niveau est utilisé ; la tolérance de Douglas-Peucker
+# vaut un pixel à ce zoom, l'écart au tracé complet reste donc invisible à l'écran
+GEOMETRY_ZOOMS = (5, 7, 9)
+
+
+# Taille (degrés de longitude) d'un pixel de tuile à un zoom donné
+def pixel_degrees(zoom):
+    return 360.0 / (256 * 2 ** zoom)
+
+
+# Niveau de détail adapté à un zoom : le plus détaillé dont le zoom de départ est atteint
+def geometry_level(zoom):
+    return max((level for level in GEOMETRY_ZOOMS if level <= zoom), default=GEOMETRY_ZOOMS[0])
+
+
+def read_region_polygons(path=REGIONS_FILE, region_property=REGION_PROPERTY):
+    """{région: [polygone]} depuis un GeoJSON ; un polygone est une liste d'anneaux fermés de (lon, lat)"""
+    with open(path, encoding='utf-8') as f:
+        collection = json.load(f)
+    polygons = {}
+    for feature in collection.get('features', []):
+        region = (feature.get('properties') or {}).get(region_property)
+        geometry = feature.get('geometry') or {}
+        if region not in STATIONS_DATA:
+            continue
+        parts = [geometry['coordinates']] if geometry.get('type') == 'Polygon' else \
+            geometry['coordinates'] if geometry.get('type') == 'MultiPolygon' else []
+        for part in parts:
+            rings = [[(float(x), float(y)) for x, y, *_ in ring] for ring in part]
+            polygons.setdefault(region, []).append([ring if ring[0] == ring[-1] else ring + ring[:1] for ring in rings])
+    return polygons
+
+
+def catchment_labels(cell_deg=CATCHMENT_CELL_DEG, max_km=CATCHMENT_MAX_KM):
+    """Grille (lignes du sud vers le nord) de l'indice de région de la station la plus proche, -1 hors zone"""
+    lats = [point[0] for point in COTE_DIVOIRE_BOUNDS]
+    lons = [point[1] for point in COTE_DIVOIRE_BOUNDS]
+    south, west = min(lats), min(lons)
+    rows = int(math.ceil((max(lats) - south) / cell_deg))
+    cols = int(math.ceil((max(lons) - west) / cell_deg))
+    station_index = get_station_index()
+    regions = list(STATIONS_DATA)
+    station_regions = np.asarray([regions.index(region) for region in station_index.regions])
+
+    # Centres des cellules en projection équirectangulaire locale (km)
+    cell_lats = south + (np.arange(rows) + 0.5) * cell_deg
+    cell_lons = west + (np.arange(cols) + 0.5) * cell_deg
+    scale = KM_PER_DEGREE * math.cos(math.radians((min(lats) + max(lats)) / 2))
+    y = (cell_lats[:, None] - station_index.lats[None, :]) * KM_PER_DEGREE
+    x = (cell_lons[:, None] - station_index.lons[None, :]) * scale
+    distances = np.sqrt(y[:, None, :] ** 2 + x[None, :, :] ** 2)
+    nearest = distances.argmin(axis=2)
+    labels = np.where(distances.min(axis=2) <= max_km, station_regions[nearest], -1)
+    return labels, (south, west), regions
+
+
+def trace_rings(mask):
+    """Contours d'un masque de cellules en anneaux fermés de sommets (colonne, ligne) de la grille.
+
+    Chaque arête de bord est orientée avec l'intérieur à gauche : les contours extérieurs tournent
+    dans le sens trigonométrique et les trous dans le sens horaire.
+    """
+    padded = np.pad(mask, 1)
+    inside = padded[1:-1, 1:-1]
+    edges = []
+    for (di, dj), (start, end) in (
+        ((-1, 0), ((0, 0), (0, 1))),  # bord sud, vers l'est
+        ((0, 1), ((0, 1), (1, 1))),   # bord est, vers le nord
+        ((1, 0), ((1, 1), (1, 0))),   # bord nord, vers l'ouest
+        ((0, -1), ((1, 0), (0, 0)))   # bord ouest, vers le sud
+    ):
+        neighbour = padded[1 + di:padded.shape[0] - 1 + di, 1 + dj:padded.shape[1] - 1 + dj]
+        for i, j in zip(*np.nonzero(inside & ~neighbour)):
+            edges.append(((int(j) + start[1], int(i) + start[0]), (int(j) + end[1], int(i) + end[0])))
+    outgoing = {}
+    for start, end in edges:
+        outgoing.setdefault(start, []).append(end)
+
+    rings = []
+    while outgoing:
+        first = next(iter(outgoing))
+        ring = [first]
+        while True:
+            targets = outgoing[ring[-1]]
+            point = targets.pop()
+            if not targets:
+                del outgoing[ring[-1]]
+            ring.append(point)
+            if point == first:
+                break
+        rings.append(_drop_collinear(ring))
+    return rings
+
+
+# Supprime les sommets alignés avec leurs voisins (les marches de la grille ne gardent que leurs coins)
+def _drop_collinear(ring):
+    points = ring[:-1]
+    n = len(points)
+    kept = [
+        points[k] for k in range(n)
+        if (points[k][0] - points[k - 1][0]) * (points[(k + 1) % n][1] - points[k][1])
+        != (points[k][1] - points[k - 1][1]) * (points[(k + 1) % n][0] - points[k][0])
+    ]
+    return kept + kept[:1]
+
+
+def _signed_area(ring):
+    return sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(ring, ring[1:])) / 2
+
+
+def _contains(ring, point):
+    x, y = point
+    inside = False
+    for (x0, y0), (x1, y1) in zip(ring, ring[1:]):
+        if (y0 > y) != (y1 > y) and x < x0 + (y - y0) * (x1 - x0) / (y1 - y0):
+            inside = not inside
+    return inside
+
+
+def catchment_polygons(cell_deg=CATCHMENT_CELL_DEG, max_km=CATCHMENT_MAX_KM):
+    """{région: [polygone]} des zones d'influence, chaque trou rattaché au contour qui le contient"""
+    labels, (south, west), regions = catchment_labels(cell_deg, max_km)
+    polygons = {}
+    for index, region in enumerate(regions):
+        rings = trace_rings(labels == index)
+        shells = [ring for ring in rings if _signed_area(ring) > 0]
+        parts = [[shell] for shell in shells]
+        for hole in (ring for ring in rings if _signed_area(ring) < 0):
+            # Un sommet de trou peut toucher le contour : on teste le milieu de sa première arête
+            probe = ((hole[0][0] + hole[1][0]) / 2, (hole[0][1] + hole[1][1]) / 2)
+            for part in parts:
+                if _contains(part[0], probe):
+                    part.append(hole)
+                    break
+        if parts:
+            # Sommets entiers de la grille -> (lon, lat) : les sommets partagés restent rigoureusement égaux
+            polygons[region] = [
+                [[(round(west + x * cell_deg, 6), round(south + y * cell_deg, 6)) for x, y in ring] for ring in part]
+                for part in parts
+            ]
+    return polygons
+
+
+def build_topology(polygons):
+    """Découpe les anneaux en arcs partagés : (arcs, {région: [[[indices d'arcs]]]}).
+
+    Un arc est coupé à chaque jonction (sommet où les anneaux qui s'y croisent n'ont pas les mêmes
+    voisins) ; une frontière commune à deux régions n'est stockée qu'une fois, ~i désignant l'arc i parcouru à l'envers.
+    """
+    rings = [ring[:-1] for parts in polygons.values() for part in parts for ring in part]
+    neighbours = {}
+    for ring in rings:
+        n = len(ring)
+        for k, point in enumerate(ring):
+            neighbours.setdefault(point, set()).add(frozenset((ring[k - 1], ring[(k + 1) % n])))
+    junctions = {point for point, pairs in neighbours.items() if len(pairs) > 1}
+
+    arcs, index = [], {}
+
+    def arc_id(points):
+        key = tuple(points)
+        if key in index:
+            return index[key]
+        reverse = key[::-1]
+        if reverse in index:
+            return ~index[reverse]
+        index[key] = len(arcs)
+        arcs.append(np.asarray(points, dtype=float))
+        return index[key]
+
+    def ring_arcs(ring):
+        cuts = [k for k, point in enumerate(ring) if point in junctions]
+        if not cuts:
+            # Anneau sans jonction (île, enclave) : départ canonique pour être reconnu depuis la région voisine
+            start = ring.index(min(ring))
+            rotated = ring[start:] + ring[:start]
+            return [arc_id(rotated + rotated[:1])]
+        rotated = ring[cuts[0]:] + ring[:cuts[0]]
+        cuts = [k - cuts[0] for k in cuts] + [len(ring)]
+        rotated = rotated + rotated[:1]
+        return [arc_id(rotated[a:b + 1]) for a, b in zip(cuts, cuts[1:])]
+
+    geometries = {
+        region: [[ring_arcs(ring[:-1]) for ring in part] for part in parts]
+        for region, parts in polygons.items()
+    }
+    return arcs, geometries
+
+
+def douglas_peucker(points, tolerance, min_points=2):
+    """Indices conservés d'une polyligne par Douglas-Peucker (extrémités toujours conservées).
+
+    Tant que moins de `min_points` points sont retenus, le point le plus éloigné est gardé quelle que
+    soit la tolérance : un anneau simplifié reste un polygone.
+    """
+    n = len(points)
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    kept = 2 if n > 1 else 1
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start, segment = points[first], points[last] - points[first]
+        offsets = points[first + 1:last] - start
+        length = math.hypot(*segment)
+        if length == 0:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            distances = np.abs(segment[0] * offsets[:, 1] - segment[1] * offsets[:, 0]) / length
+        k = int(np.argmax(distances))
+        if distances[k] > tolerance or kept < min_points:
+            keep[first + 1 + k] = True
+            kept += 1
+            stack += [(first + 1 + k, last), (first, first + 1 + k)]
+    return np.flatnonzero(keep)
+
+
+def simplify_topology(arcs, geometries, tolerance):
+    """Arcs simplifiés indépendamment : les régions voisines gardent exactement la même frontière"""
+    # Nombre d'arcs du plus petit anneau auquel appartient chaque arc
+    ring_sizes = {}
+    for parts in geometries.values():
+        for ring in (ring for part in parts for ring in part):
+            for i in (arc if arc >= 0 else ~arc for arc in ring):
+                ring_sizes[i] = min(ring_sizes.get(i, len(ring)), len(ring))
+    # Anneau d'un seul arc : 4 points (fermeture comprise) ; de deux arcs : un point intérieur par arc
+    minimum = {1: 4, 2: 3}
+    return [
+        arc[douglas_peucker(arc, tolerance, minimum.get(ring_sizes.get(i), 2))]
+        for i, arc in enumerate(arcs)
+    ]
+
+
+def encode_topojson(arcs, geometries, tolerance):
+    """Topologie TopoJSON quantifiée (pas d'un demi-pixel) avec arcs en coordonnées différentielles"""
+    step = tolerance / 2
+    stacked = np.vstack(arcs)
+    west, south = stacked.min(axis=0)
+    east, north = stacked.max(axis=0)
+    encoded = []
+    for arc in arcs:
+        quantized = np.round((arc - (west, south)) / step).astype(int)
+        # Points confondus après quantification : un seul est gardé, deux au minimum par arc
+        distinct = np.concatenate([[True], np.any(np.diff(quantized, axis=0) != 0, axis=1)])
+        distinct[-1] = True
+        quantized = quantized[distinct]
+        encoded.append(np.vstack([quantized[:1], np.diff(quantized, axis=0)]).tolist())
+    return {
+        'type': 'Topology',
+        'bbox': [round(float(v), 6) for v in (west, south, east, north)],
+        'transform': {'scale': [step, step], 'translate': [round(float(west), 6), round(float(south), 6)]},
+        'objects': {'regions': {'type': 'GeometryCollection', 'geometries': [
+            {'type': 'MultiPolygon', 'arcs': parts, 'properties': {'region': region}}
+            for region, parts in geometries.items()
+        ]}},
+        'arcs': encoded
+    }
+
+
+# Polygones chargés et découpés en arcs une seule fois par processus
+@RESOURCES.shared('region_topology')
+def get_region_topology():
+    polygons = read_region_polygons() if os.path.exists(REGIONS_FILE) else catchment_polygons()
+    return build_topology(polygons)
+
+
+# TopoJSON sérialisé d'un niveau de détail, partagé par toutes les cartes et sessions
+@RESOURCES.shared('region_topojson')
+def region_topojson(level):
+    arcs, geometries = get_region_topology()
+    tolerance = pixel_degrees(level)
+    return json.dumps(encode_topojson(simplify_topology(arcs, geometries, tolerance), geometries, tolerance),
+                      separators=(',', ':'))
+
+
+if __name__ == "__main__":
+    arcs, geometries = get_region_topology()
+    print(f"{len(geometries)} régions, {len(arcs)} arcs, {sum(len(arc) for arc in arcs)} sommets")
+    for level in GEOMETRY_ZOOMS:
+        print(f"zoom {level}+ : tolérance {pixel_degrees(level):.4f}°, {len(region_topojson(level)) / 1024:.1f} Ko")
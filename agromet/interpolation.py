@@ -0,0 +1,179 @@
+import os
+import base64
+from io import BytesIO
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image
+
+from agromet.cache import LRUCache, content_hash
+from agromet.spatial import KM_PER_DEGREE, get_station_index
+from agromet.stations import COTE_DIVOIRE_BOUNDS
+
+# Emprise de la grille nationale : [[sud, ouest], [nord, est]]
+GRID_BOUNDS = [
+    [min(p[0] for p in COTE_DIVOIRE_BOUNDS), min(p[1] for p in COTE_DIVOIRE_BOUNDS)],
+    [max(p[0] for p in COTE_DIVOIRE_BOUNDS), max(p[1] for p in COTE_DIVOIRE_BOUNDS)]
+]
+
+# Au-delà de cette distance de toute station, la surface n'est pas dessinée
+MAX_STATION_DISTANCE_KM = 150
+
+# Nombre de cellules traitées par lot pour borner la mémoire de la matrice des distances
+CHUNK_CELLS = 20000
+
+RASTER_CACHE = LRUCache(int(os.environ.get("AGROMET_RASTER_CACHE_MB", "32")) * 1024 * 1024)
+
+
+def _mercator_y(lat):
+    return np.log(np.tan(np.pi / 4 + np.radians(lat) / 2))
+
+
+def _inverse_mercator_y(y):
+    return np.degrees(2 * np.arctan(np.exp(y)) - np.pi / 2)
+
+
+# Grille nationale : lignes régulières en Mercator pour rester alignées avec les tuiles
+@lru_cache(maxsize=8)
+def national_grid(width=240, bounds=None):
+    (south, west), (north, east) = bounds or GRID_BOUNDS
+    height = int(round(width * (_mercator_y(north) - _mercator_y(south)) / np.radians(east - west)))
+    lons = np.linspace(west, east, width)
+    lats = _inverse_mercator_y(np.linspace(_mercator_y(north), _mercator_y(south), height))
+    grid_lats, grid_lons = np.meshgrid(lats, lons, indexing='ij')
+    grid_lats.flags.writeable = False
+    grid_lons.flags.writeable = False
+    return grid_lats, grid_lons
+
+
+# Projection équirectangulaire locale (km), suffisante à l'échelle du pays
+def _to_km(lats, lons, ref_lat):
+    x = np.asarray(lons, dtype=float) * KM_PER_DEGREE * np.cos(np.radians(ref_lat))
+    y = np.asarray(lats, dtype=float) * KM_PER_DEGREE
+    return x, y
+
+
+def _distances(cell_x, cell_y, x, y):
+    return np.hypot(cell_x[:, None] - x[None, :], cell_y[:, None] - y[None, :])
+
+
+def idw_grid(lats, lons, values, grid_lats, grid_lons, power=2.0):
+    """Interpolation par inverse des distances, vectorisée par lots de cellules"""
+    values = np.asarray(values, dtype=float)
+    ref_lat = float(np.mean(grid_lats))
+    x, y = _to_km(lats, lons, ref_lat)
+    gx, gy = _to_km(grid_lats.ravel(), grid_lons.ravel(), ref_lat)
+    result = np.empty(gx.size)
+    nearest = np.empty(gx.size)
+    for start in range(0, gx.size, CHUNK_CELLS):
+        chunk = slice(start, start + CHUNK_CELLS)
+        distances = _distances(gx[chunk], gy[chunk], x, y)
+        nearest[chunk] = distances.min(axis=1)
+        weights = 1.0 / np.maximum(distances, 1e-6) ** power
+        result[chunk] = weights @ values / weights.sum(axis=1)
+    return result.reshape(grid_lats.shape), nearest.reshape(grid_lats.shape)
+
+
+def _exponential_variogram(h, sill, range_km, nugget=0.0):
+    return nugget + sill * (1.0 - np.exp(-3.0 * h / range_km))
+
+
+def kriging_grid(lats, lons, values, grid_lats, grid_lons, range_km=None):
+    """Krigeage ordinaire (variogramme exponentiel ajusté sur la dispersion des stations)"""
+    values = np.asarray(values, dtype=float)
+    n = values.size
+    ref_lat = float(np.mean(grid_lats))
+    x, y = _to_km(lats, lons, ref_lat)
+    gx, gy = _to_km(grid_lats.ravel(), grid_lons.ravel(), ref_lat)
+
+    station_distances = _distances(x, y, x, y)
+    sill = max(float(values.var()), 1e-9)
+    range_km = range_km or max(float(station_distances.max()) / 3.0, 1.0)
+
+    # Système de krigeage (n + 1) × (n + 1) avec multiplicateur de Lagrange, factorisé une seule fois
+    system = np.ones((n + 1, n + 1))
+    system[:n, :n] = _exponential_variogram(station_distances, sill, range_km)
+    system[n, n] = 0.0
+    inverse = np.linalg.pinv(system)
+
+    result = np.empty(gx.size)
+    nearest = np.empty(gx.size)
+    for start in range(0, gx.size, CHUNK_CELLS):
+        chunk = slice(start, start + CHUNK_CELLS)
+        distances = _distances(gx[chunk], gy[chunk], x, y)
+        nearest[chunk] = distances.min(axis=1)
+        rhs = np.ones((distances.shape[0], n + 1))
+        rhs[:, :n] = _exponential_variogram(distances, sill, range_km)
+        weights = rhs @ inverse.T
+        result[chunk] = weights[:, :n] @ values
+    return result.reshape(grid_lats.shape), nearest.reshape(grid_lats.shape)
+
+
+INTERPOLATORS = {
+    'idw': idw_grid,
+    'kriging': kriging_grid
+}
+
+
+# Points d'interpolation : clés de station ou de région (station représentative)
+def station_points(data_dict):
+    station_index = get_station_index()
+    lats, lons, values = [], [], []
+    for name, value in data_dict.items():
+        station, _ = station_index.locate(name)
+        if station is None:
+            continue
+        lat, lon = station_index.coordinates(station)
+        lats.append(lat)
+        lons.append(lon)
+        values.append(float(value))
+    return np.asarray(lats), np.asarray(lons), np.asarray(values)
+
+
+def _hex_to_rgb(color):
+    color = color.lstrip('#')
+    return [int(color[i:i + 2], 16) for i in (0, 2, 4)]
+
+
+# Couleurs RVB (uint8) de valeurs ramenées sur [vmin, vmax], par interpolation linéaire dans la palette
+def palette_rgb(values, palette, vmin, vmax):
+    values = np.asarray(values, dtype=float)
+    stops = np.linspace(0.0, 1.0, len(palette))
+    rgb = np.array([_hex_to_rgb(c) for c in palette], dtype=float)
+    scaled = (values - vmin) / (vmax - vmin) if vmax != vmin else np.full(values.shape, 0.5)
+    scaled = np.clip(scaled, 0.0, 1.0)
+    return np.stack([np.interp(scaled, stops, rgb[:, channel]) for channel in range(3)], axis=-1).astype(np.uint8)
+
+
+def render_png(grid, mask, palette, vmin, vmax, opacity=0.75):
+    """Colorise une grille avec la palette (interpolation linéaire) et l'encode en PNG"""
+    image = np.empty(grid.shape + (4,), dtype=np.uint8)
+    image[..., :3] = palette_rgb(grid, palette, vmin, vmax)
+    image[..., 3] = np.where(mask, int(255 * opacity), 0)
+    buffer = BytesIO()
+    Image.fromarray(image, mode='RGBA').save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def interpolated_png(data_dict, palette, method='idw', width=240, opacity=0.75):
+    """PNG de la surface interpolée, mis en cache selon l'empreinte des entrées"""
+    key = content_hash('interpolated_png', data_dict, palette, method, width, opacity)
+
+    def compute():
+        lats, lons, values = station_points(data_dict)
+        grid_lats, grid_lons = national_grid(width)
+        if values.size == 0:
+            grid, nearest = np.zeros(grid_lats.shape), np.full(grid_lats.shape, np.inf)
+        elif values.size == 1:
+            grid, nearest = idw_grid(lats, lons, values, grid_lats, grid_lons)
+        else:
+            grid, nearest = INTERPOLATORS[method](lats, lons, values, grid_lats, grid_lons)
+        mask = nearest <= MAX_STATION_DISTANCE_KM
+        vmin, vmax = (float(values.min()), float(values.max())) if values.size else (0.0, 1.0)
+        return render_png(grid, mask, palette, vmin, vmax, opacity)
+
+    return RASTER_CACHE.get_or_compute(key, compute)
+
+
+def png_data_url(png_bytes):
+    return "data:image/png;base64," + base64.b64encode(png_bytes).decode('ascii')
@@ -0,0 +1,405 @@
+import os
+import json
+
+import folium
+from folium import plugins
+from branca.element import MacroElement
+from jinja2 import Template
+
+from agromet.cache import LRUCache, content_hash
+from agromet.geometry import GEOMETRY_ZOOMS, geometry_level, region_topojson
+from agromet.interpolation import GRID_BOUNDS, interpolated_png, palette_rgb, png_data_url
+from agromet.metrics import METRICS
+from agromet.spatial import get_station_index
+from agromet.tiles import (
+    ASSETS_URL, DEFAULT_TILE_LAYER, GEOMETRY_URL, TILE_LAYERS, TILE_MAX_ZOOM, TILE_MIN_ZOOM, TILES_URL, asset_path,
+    seeded_layers, tile_bounds, upstream_url
+)
+
+
+# Au-delà de ce nombre de points, les marqueurs individuels cèdent la place à une couche compacte
+MARKER_MODE_THRESHOLD = 50
+
+
+# Niveaux de valeur des marqueurs : faible, moyen, élevé
+MARKER_LEVEL_ICONS = ['green', 'orange', 'red']
+MARKER_LEVEL_COLORS = ['#2E8B57', '#f39c12', '#d73027']
+
+
+def marker_level(normalized_value):
+    return 2 if normalized_value > 0.7 else 1 if normalized_value > 0.4 else 0
+
+
+# Stations en une FeatureCollection compacte : les popups sont construits côté navigateur
+def station_feature_collection(points, unit=""):
+    features = []
+    for region, station_name, lat, lon, value, normalized_value in points:
+        features.append({
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [round(lon, 3), round(lat, 3)]},
+            'properties': {'r': region, 's': station_name, 'v': f"{value}{unit}"}
+        })
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def add_geojson_station_layer(m, points, value_label, unit=""):
+    # Une couche par niveau de couleur : aucun style calculé par station n'est sérialisé
+    station_layer = folium.FeatureGroup(name='Stations')
+    for level, color in enumerate(MARKER_LEVEL_COLORS):
+        level_points = [point for point in points if marker_level(point[5]) == level]
+        if not level_points:
+            continue
+        folium.GeoJson(
+            station_feature_collection(level_points, unit),
+            marker=folium.CircleMarker(radius=7, weight=1, color='white', fill=True, fill_color=color, fill_opacity=0.9),
+            tooltip=folium.GeoJsonTooltip(fields=['s', 'v'], aliases=['Station', value_label]),
+            popup=folium.GeoJsonPopup(fields=['r', 's', 'v'], aliases=['Région', 'Station', value_label])
+        ).add_to(station_layer)
+    station_layer.add_to(m)
+
+
+# Regroupement côté navigateur : une ligne de données par station et un seul callback JS partagé
+STATION_CLUSTER_CALLBACK = """
+function (row) {
+    var colors = %s;
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {
+        radius: 7, color: 'white', weight: 1, fillColor: colors[row[5]], fillOpacity: 0.9
+    });
+    marker.bindTooltip(row[2] + ': ' + row[4]);
+    marker.bindPopup('<strong>' + row[3] + '</strong><br>Station: ' + row[2] + '<br>' + row[4]);
+    return marker;
+};
+""" % json.dumps(MARKER_LEVEL_COLORS)
+
+
+def add_cluster_station_layer(m, points, unit=""):
+    rows = [
+        [round(lat, 3), round(lon, 3), station_name, region, f"{value}{unit}", marker_level(normalized_value)]
+        for region, station_name, lat, lon, value, normalized_value in points
+    ]
+    plugins.FastMarkerCluster(rows, callback=STATION_CLUSTER_CALLBACK, name='Stations').add_to(m)
+
+
+# Palettes de couleurs selon le type de données
+MAP_PALETTES = {
+    'temperature': ['#313695', '#4575b4', '#74add1', '#abd9e9', '#e0f3f8', 
+                   '#ffffcc', '#fee090', '#fdae61', '#f46d43', '#d73027', '#a50026'],
+    'precipitation': ['#ffffff', '#c6dbef', '#9ecae1', '#6baed6', '#4292c6', 
+                     '#2171b5', '#08519c', '#08306b', '#041f47', '#021238'],
+    'humidity': ['#f7fcf0', '#e0f3db', '#ccebc5', '#a8ddb5', '#7bccc4', 
+                '#4eb3d3', '#2b8cbe', '#0868ac', '#084081', '#042753'],
+    'water_satisfaction': ['#8c2d04', '#cc4c02', '#ec7014', '#fe9929', '#fec44f', 
+                          '#fee391', '#fff7bc', '#c7e9b4', '#7fcdbb', '#41b6c4', '#2c7fb8'],
+    'spi': ['#8c510a', '#bf812d', '#dfc27d', '#f6e8c3', '#f5f5f5',
+            '#c7eae5', '#80cdc1', '#35978f', '#01665e']
+}
+
+
+# Icône des marqueurs selon le type de données
+MAP_ICONS = {
+    'temperature': 'thermometer-half',
+    'precipitation': 'tint',
+    'humidity': 'eye-dropper',
+    'water_satisfaction': 'leaf',
+    'spi': 'tint'
+}
+
+
+class RegionChoropleth(MacroElement):
+    """Régions colorées selon leur valeur, à partir des TopoJSON simplifiés des niveaux de détail.
+
+    Avec le serveur local (GEOMETRY_URL), seul le niveau du zoom initial est inséré dans la page ; les autres
+    sont demandés au premier changement de zoom qui les requiert, puis gardés par le navigateur. Sans serveur,
+    la carte Streamlit n'a aucune URL où les lire et tous les niveaux sont insérés depuis le cache de géométrie.
+    Le navigateur décode les arcs partagés et remplace la couche par le niveau adapté au zoom courant.
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function () {
+            var map = {{ this._parent.get_name() }};
+            var levels = [{% for zoom, topology, url in this.levels %}[{{ zoom }}, {{ topology }}, {{ url|tojson }}]{{ "," if not loop.last }}{% endfor %}];
+            var styles = {{ this.styles|tojson }};
+            function features(topology) {
+                var t = topology.transform;
+                var arcs = topology.arcs.map(function (arc) {
+                    var x = 0, y = 0;
+                    return arc.map(function (p) {
+                        x += p[0]; y += p[1];
+                        return [x * t.scale[0] + t.translate[0], y * t.scale[1] + t.translate[1]];
+                    });
+                });
+                function ring(ids) {
+                    var points = [];
+                    ids.forEach(function (i) {
+                        var arc = i >= 0 ? arcs[i] : arcs[~i].slice().reverse();
+                        points = points.concat(points.length ? arc.slice(1) : arc);
+                    });
+                    return points;
+                }
+                return topology.objects.regions.geometries.filter(function (g) {
+                    return g.properties.region in styles;
+                }).map(function (g) {
+                    return {type: 'Feature', properties: g.properties, geometry: {
+                        type: 'MultiPolygon', coordinates: g.arcs.map(function (part) { return part.map(ring); })
+                    }};
+                });
+            }
+            var layer = null, current = null;
+            function draw() {
+                var level = levels[0];
+                levels.forEach(function (l) { if (l[0] <= map.getZoom()) { level = l; } });
+                if (level === current) { return; }
+                if (!level[1]) {
+                    // La couche actuelle reste affichée pendant le téléchargement (une seule requête par niveau)
+                    level[4] = level[4] || fetch(level[2]).then(function (response) { return response.json(); })
+                        .then(function (topology) { level[1] = topology; draw(); }).catch(function () {});
+                    return;
+                }
+                current = level;
+                level[3] = level[3] || features(level[1]);
+                var next = L.geoJSON(level[3], {
+                    style: function (f) {
+                        return {color: 'white', weight: 1, fillColor: styles[f.properties.region][0], fillOpacity: {{ this.opacity }}};
+                    },
+                    onEachFeature: function (f, l) {
+                        l.bindTooltip(f.properties.region + ': ' + styles[f.properties.region][1], {sticky: true});
+                    }
+                }).addTo(map);
+                if (layer) { map.removeLayer(layer); }
+                layer = next;
+            }
+            map.on('zoomend', draw);
+            draw();
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, styles, opacity=0.75, zoom=GEOMETRY_ZOOMS[0]):
+        super().__init__()
+        self._name = 'RegionChoropleth'
+        self.styles = styles
+        self.opacity = opacity
+        self.levels = []
+        for level in GEOMETRY_ZOOMS:
+            topology = region_topojson(level)
+            if GEOMETRY_URL and level != geometry_level(zoom):
+                self.levels.append((level, 'null', f"{GEOMETRY_URL}/{level}.json?v={content_hash(topology)[:12]}"))
+            else:
+                self.levels.append((level, topology, None))
+
+
+# Valeurs par région (moyenne des stations d'une même région) colorées avec la palette de la carte
+def add_region_choropleth(m, data_dict, palette, unit="", opacity=0.75):
+    station_index = get_station_index()
+    region_values = {}
+    for name, value in data_dict.items():
+        _, region = station_index.locate(name)
+        if region is not None:
+            region_values.setdefault(region, []).append(float(value))
+    means = {region: sum(values) / len(values) for region, values in region_values.items()}
+    if not means:
+        return
+    colors = palette_rgb(list(means.values()), palette, min(means.values()), max(means.values()))
+    styles = {
+        region: ['#%02x%02x%02x' % tuple(int(c) for c in color), f"{round(value, 1):g}{unit}"]
+        for (region, value), color in zip(means.items(), colors)
+    }
+    RegionChoropleth(styles, opacity, m.options.get('zoom', GEOMETRY_ZOOMS[0])).add_to(m)
+
+
+# Éléments Folium des cartes dont les scripts et styles sont copiés localement (python -m agromet.tiles assets)
+MAP_ASSET_CLASSES = (folium.Map, plugins.MeasureControl, plugins.MousePosition, plugins.MarkerCluster)
+
+
+def map_asset_urls():
+    return sorted({
+        url for cls in MAP_ASSET_CLASSES for _, url in list(cls.default_js) + list(cls.default_css)
+    })
+
+
+# Scripts et styles d'une carte et de ses éléments servis par le serveur local au lieu des CDN
+def use_local_assets(element):
+    for attribute in ('default_js', 'default_css'):
+        if getattr(element, attribute, None):
+            setattr(element, attribute, [(name, f"{ASSETS_URL}/{asset_path(url)}") for name, url in getattr(element, attribute)])
+    for child in element._children.values():
+        use_local_assets(child)
+
+
+# Fonds de carte : archives MBTiles du serveur local si configuré (seulement les fonds pré-chargés,
+# un fond sans archive resterait vide hors ligne), serveurs amont sinon
+def add_base_layers(m):
+    layers = seeded_layers() if TILES_URL else []
+    if layers:
+        default = DEFAULT_TILE_LAYER if DEFAULT_TILE_LAYER in layers else layers[0]
+        for layer in layers:
+            source = TILE_LAYERS[layer]
+            # Seule l'emprise nationale aux zooms pré-chargés est demandée ; Leaflet rééchantillonne au-delà
+            folium.TileLayer(
+                tiles=f"{TILES_URL}/{layer}/{{z}}/{{x}}/{{y}}.png",
+                attr=source['attribution'],
+                name=source['name'],
+                show=layer == default,
+                max_native_zoom=TILE_MAX_ZOOM,
+                min_native_zoom=TILE_MIN_ZOOM,
+                bounds=[list(corner) for corner in tile_bounds()]
+            ).add_to(m)
+    else:
+        for layer, source in TILE_LAYERS.items():
+            folium.TileLayer(
+                tiles=upstream_url(layer), attr=source['attribution'], name=source['name'],
+                show=layer == DEFAULT_TILE_LAYER
+            ).add_to(m)
+
+
+# Fonction pour créer une belle carte thermique avec Folium
+def create_folium_heatmap(data_dict, title, colormap='RdYlBu_r', unit="", map_type="temperature", surface="idw", marker_mode="auto"):
+    # Centre de la Côte d'Ivoire
+    center_lat, center_lon = 7.5, -5.5
+    
+    # Créer la carte de base avec un style moderne
+    m = folium.Map(
+        location=[center_lat, center_lon],
+        zoom_start=7,
+        tiles=None,
+        prefer_canvas=True
+    )
+    
+    # Couches de fond (CartoDB Positron par défaut pour un look propre)
+    add_base_layers(m)
+    
+    # Déterminer les valeurs min et max pour la normalisation des couleurs
+    values = list(data_dict.values())
+    min_val = min(values)
+    max_val = max(values)
+    
+    palette = MAP_PALETTES.get(map_type, MAP_PALETTES['temperature'])
+    
+    station_index = get_station_index()
+    points = []
+    for name, value in data_dict.items():
+        station_name, region = station_index.locate(name)
+        if station_name is not None:
+            # Station la plus proche du barycentre comme point représentatif d'une région
+            lat, lon = station_index.coordinates(station_name)
+            
+            # Normaliser la valeur pour la couleur du marqueur
+            normalized_value = (value - min_val) / (max_val - min_val) if max_val != min_val else 0.5
+            points.append((region, station_name, lat, lon, value, normalized_value))
+    
+    if marker_mode == "auto":
+        marker_mode = "markers" if len(points) <= MARKER_MODE_THRESHOLD else "cluster"
+    value_label = title.split('-')[-1].strip()
+    
+    if marker_mode == "geojson":
+        add_geojson_station_layer(m, points, value_label, unit)
+    elif marker_mode == "cluster":
+        add_cluster_station_layer(m, points, unit)
+    else:
+        icon_name = MAP_ICONS.get(map_type, 'info-sign')
+        
+        for region, station_name, lat, lon, value, normalized_value in points:
+            # Popup avec informations détaillées
+            popup_html = f"""
+            <div style='font-family: Arial, sans-serif; width: 200px;'>
+                <h4 style='color: #2E8B57; margin-bottom: 10px;'>{region}</h4>
+                <p><strong>Station:</strong> {station_name}</p>
+                <p><strong>{value_label}:</strong> 
+                   <span style='font-size: 18px; font-weight: bold; color: #d73027;'>
+                   {value}{unit}
+                   </span>
+                </p>
+                <p><strong>Coordonnées:</strong> {lat:.3f}°N, {abs(lon):.3f}°W</p>
+            </div>
+            """
+            
+            folium.Marker(
+                location=[lat, lon],
+                popup=folium.Popup(popup_html, max_width=250),
+                tooltip=f"{region}: {value}{unit}",
+                icon=folium.Icon(
+                    color=MARKER_LEVEL_ICONS[marker_level(normalized_value)],
+                    icon=icon_name,
+                    prefix='fa'
+                )
+            ).add_to(m)
+    if surface == "choropleth":
+        # Valeurs régionales sur les limites des régions (géométrie simplifiée selon le zoom)
+        add_region_choropleth(m, data_dict, palette, unit)
+    else:
+        # Surface interpolée sur la grille nationale, envoyée au navigateur en une seule image
+        folium.raster_layers.ImageOverlay(
+            image=png_data_url(interpolated_png(data_dict, palette, method=surface)),
+            bounds=GRID_BOUNDS,
+            name='Surface interpolée',
+            interactive=False,
+            zindex=1
+        ).add_to(m)
+    
+    # Ajouter une légende personnalisée
+    legend_html = f'''
+    <div style="position: fixed; 
+                top: 10px; right: 10px; width: 200px; height: auto;
+                background-color: white; border:2px solid grey; z-index:9999;
+                font-size:14px; padding: 10px; border-radius: 10px;
+                box-shadow: 0 4px 8px rgba(0,0,0,0.3);">
+    <p style="margin: 0 0 10px 0;"><strong>{title}</strong></p>
+    <p style="margin: 0;"><i class="fa fa-circle" style="color:#a50026"></i> Élevé ({max_val:.1f}{unit})</p>
+    <p style="margin: 0;"><i class="fa fa-circle" style="color:#f46d43"></i> Moyen-Élevé</p>
+    <p style="margin: 0;"><i class="fa fa-circle" style="color:#fee090"></i> Moyen</p>
+    <p style="margin: 0;"><i class="fa fa-circle" style="color:#abd9e9"></i> Moyen-Faible</p>
+    <p style="margin: 0;"><i class="fa fa-circle" style="color:#313695"></i> Faible ({min_val:.1f}{unit})</p>
+    </div>
+    '''
+    m.get_root().html.add_child(folium.Element(legend_html))
+    
+    # Ajouter un contrôle des couches
+    folium.LayerControl().add_to(m)
+    
+    # Ajouter un plugin de mesure
+    plugins.MeasureControl().add_to(m)
+    
+    # Ajouter la position de la souris
+    plugins.MousePosition().add_to(m)
+    
+    # Limiter la vue à la Côte d'Ivoire
+    m.fit_bounds([[4.0, -8.6], [10.8, -2.4]])
+    
+    # Hors ligne : aucune ressource demandée aux CDN
+    if ASSETS_URL:
+        use_local_assets(m)
+    
+    return m
+
+
+# Cache HTML des cartes, borné en mémoire et partagé entre toutes les sessions du processus
+MAP_HTML_CACHE = LRUCache(int(os.environ.get("AGROMET_MAP_CACHE_MB", "64")) * 1024 * 1024)
+METRICS.register_cache('map_html', MAP_HTML_CACHE.stats)
+
+
+# Habillage HTML d'une carte Folium déjà sérialisée
+def style_folium_html(map_html, height=500):
+    return f"""
+    <div class="folium-map" style="border: 3px solid #2E8B57; border-radius: 15px; overflow: hidden; box-shadow: 0 6px 12px rgba(0,0,0,0.3);">
+        <div style="height: {height}px;">
+            {map_html}
+        </div>
+    </div>
+    """
+
+
+# Carte thermique rendue une seule fois par contenu, puis servie depuis le cache
+def render_folium_heatmap_html(data_dict, title, colormap='RdYlBu_r', unit="", map_type="temperature", height=500, surface="idw", marker_mode="auto"):
+    key = content_hash("folium_heatmap", data_dict, title, colormap, unit, map_type, height, surface, marker_mode)
+
+    def render():
+        with METRICS.timer('folium_build'):
+            folium_map = create_folium_heatmap(
+                data_dict, title, colormap=colormap, unit=unit, map_type=map_type,
+                surface=surface, marker_mode=marker_mode
+            )
+        with METRICS.timer('folium_html'):
+            return style_folium_html(folium_map._repr_html_(), height)
+
+    return MAP_HTML_CACHE.get_or_compute(key, render)
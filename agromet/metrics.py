@@ -0,0 +1,276 @@
+import os
+import time
+import bisect
+import threading
+import contextvars
+from functools import wraps
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Bornes des histogrammes : durées (s) et tailles des contenus envoyés (octets)
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BYTES_BUCKETS = (1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7)
+
+# Fenêtre glissante : WINDOW_SLOTS tranches de SLOT_SECONDS secondes (10 minutes par défaut)
+SLOT_SECONDS = 10
+WINDOW_SLOTS = 60
+
+# Une session est active si elle a exécuté la page dans les dernières minutes
+SESSION_TIMEOUT = 300
+
+# Fichier d'export Prometheus (réécrit au plus toutes les EXPORT_INTERVAL secondes) et port local optionnel
+METRICS_FILE = os.environ.get("AGROMET_METRICS_FILE", "")
+METRICS_PORT = int(os.environ.get("AGROMET_METRICS_PORT", "0"))
+EXPORT_INTERVAL = 15
+
+# Page en cours de rendu dans le thread d'exécution de la session
+current_page = contextvars.ContextVar('current_page', default='')
+
+
+class RollingHistogram:
+    """Histogramme cumulé (export Prometheus) et fenêtre glissante (quantiles récents)"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.slots = [None] * WINDOW_SLOTS
+        self._lock = threading.Lock()
+
+    def _slot(self, now):
+        epoch = int(now // SLOT_SECONDS)
+        position = epoch % WINDOW_SLOTS
+        slot = self.slots[position]
+        if slot is None or slot[0] != epoch:
+            slot = self.slots[position] = (epoch, [0] * (len(self.buckets) + 1), [0.0, 0.0])
+        return slot
+
+    def observe(self, value, now=None):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += value
+            self.count += 1
+            _, counts, extremes = self._slot(time.time() if now is None else now)
+            counts[index] += 1
+            extremes[0] += value
+            extremes[1] = max(extremes[1], value)
+
+    def window(self, now=None):
+        """(comptes par classe, somme, maximum) des observations de la fenêtre glissante"""
+        oldest = int((time.time() if now is None else now) // SLOT_SECONDS) - WINDOW_SLOTS + 1
+        counts = [0] * (len(self.buckets) + 1)
+        total = maximum = 0.0
+        with self._lock:
+            for slot in self.slots:
+                if slot is not None and slot[0] >= oldest:
+                    counts = [a + b for a, b in zip(counts, slot[1])]
+                    total += slot[2][0]
+                    maximum = max(maximum, slot[2][1])
+        return counts, total, maximum
+
+    def quantile(self, q, counts):
+        """Quantile approché (borne supérieure de la classe) d'une répartition par classes"""
+        n = sum(counts)
+        if n == 0:
+            return float('nan')
+        rank = q * n
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class MetricsRegistry:
+    """Mesures de l'application : durées par étape et par page, tailles envoyées, caches, sessions"""
+
+    def __init__(self):
+        self.histograms = {}
+        self.caches = {}
+        self.gauges = {}
+        self.sessions = {}
+        self._lock = threading.Lock()
+        self._exported = 0.0
+
+    def histogram(self, name, labels, buckets):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = RollingHistogram(buckets)
+            return self.histograms[key]
+
+    def observe_seconds(self, stage, seconds, page=None):
+        labels = {'stage': stage, 'page': page if page is not None else current_page.get()}
+        self.histogram('agromet_stage_seconds', labels, SECONDS_BUCKETS).observe(seconds)
+
+    def observe_bytes(self, kind, size, page=None):
+        labels = {'kind': kind, 'page': page if page is not None else current_page.get()}
+        self.histogram('agromet_payload_bytes', labels, BYTES_BUCKETS).observe(size)
+
+    @contextmanager
+    def timer(self, stage, page=None):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_seconds(stage, time.perf_counter() - started, page)
+
+    def timed(self, stage):
+        """Décorateur : durée de chaque appel de la fonction sous l'étape donnée"""
+        def decorator(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.timer(stage):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def register_cache(self, name, stats):
+        """stats : fonction retournant au moins {'hits', 'misses'} (LRUCache.stats, lru_cache.cache_info)"""
+        self.caches[name] = stats
+
+    def register_gauge(self, metric, label, values):
+        """values : fonction retournant {valeur de l'étiquette : mesure} lue à chaque export"""
+        self.gauges[metric] = (label, values)
+
+    def cache_stats(self):
+        results = {}
+        for name, stats in list(self.caches.items()):
+            values = stats()
+            if not isinstance(values, dict):
+                values = {'hits': values.hits, 'misses': values.misses}
+            lookups = values['hits'] + values['misses']
+            results[name] = {'hits': values['hits'], 'misses': values['misses'],
+                             'hit_ratio': values['hits'] / lookups if lookups else 0.0}
+        return results
+
+    def touch_session(self, session_id):
+        """Registre unique des sessions : dernière activité et dernière taille mesurée de l'état"""
+        now = time.time()
+        with self._lock:
+            self.sessions.setdefault(session_id, {'bytes': None, 'measured': 0.0})['seen'] = now
+            for key in [k for k, entry in self.sessions.items() if now - entry['seen'] > SESSION_TIMEOUT]:
+                del self.sessions[key]
+
+    def active_sessions(self):
+        now = time.time()
+        with self._lock:
+            return sum(1 for entry in self.sessions.values() if now - entry['seen'] <= SESSION_TIMEOUT)
+
+    def session_due(self, session_id, interval=EXPORT_INTERVAL):
+        """Vrai si l'état de la session n'a pas été mesuré depuis interval secondes"""
+        with self._lock:
+            entry = self.sessions.get(session_id)
+            return entry is None or time.time() - entry['measured'] >= interval
+
+    def record_session_bytes(self, session_id, size):
+        now = time.time()
+        with self._lock:
+            entry = self.sessions.setdefault(session_id, {'seen': now})
+            entry['bytes'], entry['measured'] = size, now
+
+    def session_bytes(self):
+        """Dernière taille mesurée de l'état de chaque session active"""
+        now = time.time()
+        with self._lock:
+            return [entry['bytes'] for entry in self.sessions.values()
+                    if entry['bytes'] is not None and now - entry['seen'] <= SESSION_TIMEOUT]
+
+    def summary(self):
+        """Lignes (métrique, étiquettes, n, moyenne, p50, p95, max) sur la fenêtre glissante"""
+        rows = []
+        with self._lock:
+            items = sorted(self.histograms.items())
+        for (name, labels), histogram in items:
+            counts, total, maximum = histogram.window()
+            n = sum(counts)
+            if n:
+                rows.append({
+                    'metric': name, **dict(labels), 'n': n, 'mean': total / n,
+                    'p50': histogram.quantile(0.5, counts), 'p95': histogram.quantile(0.95, counts), 'max': maximum
+                })
+        return rows
+
+    def prometheus(self):
+        """Export au format texte Prometheus (histogrammes cumulés, ratios des caches, sessions actives)"""
+        lines = []
+        with self._lock:
+            items = sorted(self.histograms.items())
+        declared = set()
+        for (name, labels), histogram in items:
+            if name not in declared:
+                lines.append(f"# TYPE {name} histogram")
+                declared.add(name)
+            label_text = ','.join(f'{key}="{_escape(value)}"' for key, value in labels)
+            with histogram._lock:
+                counts, total, count = list(histogram.counts), histogram.total, histogram.count
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else f"{bound:g}"
+                lines.append(f'{name}_bucket{{{label_text},le="{le}"}} {cumulative}')
+            lines.append(f"{name}_sum{{{label_text}}} {total:.6f}")
+            lines.append(f"{name}_count{{{label_text}}} {count}")
+        caches = self.cache_stats()
+        for metric, key in (('agromet_cache_hits_total', 'hits'), ('agromet_cache_misses_total', 'misses')):
+            lines.append(f"# TYPE {metric} counter")
+            lines += [f'{metric}{{cache="{_escape(name)}"}} {values[key]}' for name, values in caches.items()]
+        lines.append("# TYPE agromet_cache_hit_ratio gauge")
+        lines += [f'agromet_cache_hit_ratio{{cache="{_escape(name)}"}} {values["hit_ratio"]:.4f}'
+                  for name, values in caches.items()]
+        for metric, (label, values) in list(self.gauges.items()):
+            lines.append(f"# TYPE {metric} gauge")
+            lines += [f'{metric}{{{label}="{_escape(key)}"}} {value:.12g}' for key, value in values().items()]
+        lines.append("# TYPE agromet_active_sessions gauge")
+        lines.append(f"agromet_active_sessions {self.active_sessions()}")
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path=METRICS_FILE, force=False):
+        """Réécrit le fichier d'export (remplacement atomique), au plus toutes les EXPORT_INTERVAL secondes"""
+        if not path or (not force and time.time() - self._exported < EXPORT_INTERVAL):
+            return
+        self._exported = time.time()
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus())
+        os.replace(temporary, path)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+METRICS = MetricsRegistry()
+
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=METRICS_PORT, host="127.0.0.1"):
+    """Point d'accès local /metrics servi dans un thread du processus (une seule fois)"""
+    global _server
+    with _server_lock:
+        if _server is not None or not port:
+            return _server
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = METRICS.prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', PROMETHEUS_CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        _server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=_server.serve_forever, daemon=True).start()
+        return _server
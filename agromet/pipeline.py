@@ -0,0 +1,388 @@
+import os
+from datetime import datetime
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from agromet.advisories import AdvisoryEngine, build_indicators
+from agromet.bulletin import render_bulletins, submit_bulletin
+from agromet.climatology import NORMAL_YEARS, Climatology, dekad_of_year, dekad_start, dekadal_totals, decade_rainfall_table
+from agromet.evapotranspiration import panel_et0, panel_matrix
+from agromet.maps import MAP_PALETTES
+from agromet.providers import create_provider
+from agromet.resources import RESOURCES
+from agromet.seasonal import ForecastEnsemble, climatology_terciles, regional_outlook, seasonal_outlook, synthetic_ensemble
+from agromet.soil_water import SoilWaterBalance
+from agromet.spatial import get_station_index
+from agromet.spi import SPICalibration
+from agromet.stations import ALL_STATIONS, STATION_REGIONS, STATION_SOIL_TYPES, STATIONS_DATA
+from agromet.weather import decade_of, regional_daily_values, regional_period_totals, weather_table
+from agromet.wrsi import CROP_CALENDARS, STAGE_ACTIVITIES, compute_wrsi, crop_stage, regional_matrix
+
+
+# Archive Parquet des observations (les séries simulées sont utilisées tant qu'elle est vide)
+OBSERVATIONS_DIR = os.environ.get(
+    "AGROMET_DATA_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "observations")
+)
+
+
+# Source des données : 'auto' (l'archive si elle couvre la fenêtre du panneau météo, les séries simulées sinon),
+# 'observations' ou 'synthetique'
+DATA_PROVIDER = os.environ.get("AGROMET_DATA_PROVIDER", "auto")
+
+# Profondeur du panneau météo partagé (stations × jours)
+WEATHER_PANEL_DAYS = int(os.environ.get("AGROMET_WEATHER_PANEL_DAYS", "365"))
+
+
+@RESOURCES.shared('data_provider', frozen=False)
+def get_data_provider():
+    return create_provider(DATA_PROVIDER, OBSERVATIONS_DIR, WEATHER_PANEL_DAYS)
+
+
+# Tranche horaire 'AAAA-MM-JJ HH' des caches du jour : les observations arrivées en cours de journée
+# sont prises en compte au plus une heure plus tard
+def current_hour():
+    return datetime.now().strftime('%Y-%m-%d %H')
+
+
+# Panneau météo de tout le réseau jusqu'au jour de la tranche, rechargé une fois par heure et partagé entre les sessions
+@lru_cache(maxsize=4)
+def get_weather_panel(hour, days=WEATHER_PANEL_DAYS):
+    end = pd.Timestamp(hour[:10])
+    return get_data_provider().weather(start=end - pd.Timedelta(days=days - 1), end=end)
+
+
+def current_weather_panel():
+    return get_weather_panel(current_hour())
+
+
+# ET0 journalière (jours × stations) du panneau partagé
+@lru_cache(maxsize=4)
+def get_panel_et0(hour):
+    return panel_et0(get_weather_panel(hour))
+
+
+# Bilan hydrique partagé (un par source de données) : seuls les jours pas encore intégrés sont calculés à chaque appel
+@RESOURCES.shared('soil_water_balance', frozen=False)
+def get_soil_water_balance(source):
+    return SoilWaterBalance(ALL_STATIONS, soil_types=STATION_SOIL_TYPES)
+
+
+def current_soil_water_balance():
+    hour = current_hour()
+    balance = get_soil_water_balance(get_data_provider().name)
+    # Le jour en cours (observations encore partielles) n'est intégré que le lendemain
+    yesterday = pd.Timestamp(hour[:10]) - pd.Timedelta(days=1)
+    balance.advance(panel_matrix(get_weather_panel(hour), 'Précipitations (mm)'), get_panel_et0(hour), through=yesterday)
+    return balance
+
+
+# Satisfaction en eau de toutes les régions × cultures × semis, recalculée une fois par décade
+@lru_cache(maxsize=3)
+def get_wrsi_table(decade):
+    hour = current_hour()
+    rain = regional_matrix(panel_matrix(get_weather_panel(hour), 'Précipitations (mm)'))
+    et0 = regional_matrix(get_panel_et0(hour))
+    return compute_wrsi(rain, et0)
+
+
+def current_wrsi_table():
+    return get_wrsi_table(decade_of(datetime.now()))
+
+
+# Données météo journalières d'une station (fenêtre lue directement auprès de la source)
+def generate_weather_data(station, days=7):
+    end = pd.Timestamp(datetime.now()).normalize()
+    panel = get_data_provider().weather([station], start=end - pd.Timedelta(days=days - 1), end=end)
+    return weather_table(panel, station)
+
+
+# Série journalière longue d'un paramètre (jours × stations), partagée entre les sessions
+@lru_cache(maxsize=8)
+def get_station_series(stations, column, start, end):
+    panel = get_data_provider().weather(list(stations), start, end, columns=[column])
+    return panel_matrix(panel, column, list(stations))
+
+
+# Climatologies incrémentales enregistrées (une par source de données)
+CLIMATOLOGY_DIR = os.environ.get(
+    "AGROMET_CLIMATOLOGY_DIR",
+    os.path.join(os.path.dirname(OBSERVATIONS_DIR), "climatology")
+)
+
+
+def climatology_path(source):
+    return os.path.join(CLIMATOLOGY_DIR, f"{source}.npz")
+
+
+# Pluie journalière (jours × stations) de la source de données
+def read_rainfall_archive(start, end, stations=None):
+    return get_data_provider().rainfall(pd.Timestamp(start), pd.Timestamp(end), stations)
+
+
+# Climatologie partagée d'une source, relue sur disque au premier usage (complétée en place au fil des années)
+@RESOURCES.shared('climatology', frozen=False)
+def get_climatology(source):
+    path = climatology_path(source)
+    if os.path.exists(path):
+        return Climatology.load(path, ALL_STATIONS)
+    return Climatology(ALL_STATIONS)
+
+
+# Climatologie couvrant la période de référence : seules les années absentes sont lues dans l'archive
+def reference_climatology(reference_end_year):
+    source = get_data_provider().name
+    climatology = get_climatology(source)
+    missing = climatology.missing_years(reference_end_year - NORMAL_YEARS + 1, reference_end_year)
+    if missing:
+        daily = read_rainfall_archive(f"{min(missing)}-01-01", f"{max(missing)}-12-31")
+        climatology.add_years(dekadal_totals(daily), years=missing)
+        climatology.save(climatology_path(source))
+    return climatology
+
+
+# Situation pluviométrique décadaire d'une région (lecture seule de la climatologie : les processus de calcul
+# parallèles ne l'enregistrent jamais)
+def generate_decade_rainfall_data(region):
+    today = pd.Timestamp(datetime.now()).normalize()
+    year = today.year
+    stations = get_station_index().stations_in_region(region)
+    observed = read_rainfall_archive(f"{year}-01-01", today, stations)
+    climatology = reference_climatology(year - 1)
+    return decade_rainfall_table(climatology, observed, stations, year)
+
+
+# Décades closes de l'année intégrées à la climatologie pour toutes les stations, puis un seul enregistrement ;
+# appelé par le processus de l'application ou par le parent du calcul des produits, au plus une fois par heure
+@lru_cache(maxsize=1)
+def ingest_closed_dekads(hour):
+    today = pd.Timestamp(hour[:10])
+    current_dekad = dekad_start(today)
+    if current_dekad.dayofyear == 1:
+        return 0
+    climatology = reference_climatology(today.year - 1)
+    closed = read_rainfall_archive(f"{today.year}-01-01", current_dekad - pd.Timedelta(days=1))
+    new = climatology.ingest_dekadal(dekadal_totals(closed))
+    if new:
+        climatology.save(climatology_path(get_data_provider().name))
+    return new
+
+
+# Paramètres gamma du SPI, ajustés une seule fois par période de référence puis relus sur disque
+@RESOURCES.shared('spi_calibration')
+def get_spi_calibration(reference_end_year, source):
+    first_year = reference_end_year - NORMAL_YEARS + 1
+    path = os.path.join(CLIMATOLOGY_DIR, f"spi-{source}-{first_year}-{reference_end_year}.npz")
+    if os.path.exists(path):
+        return SPICalibration.load(path, ALL_STATIONS)
+    climatology = reference_climatology(reference_end_year)
+    calibration = SPICalibration.fit(
+        climatology.dekadal_array(first_year - 1, reference_end_year), climatology.stations, first_year
+    )
+    calibration.save(path)
+    return calibration
+
+
+# SPI de toutes les stations sur la fenêtre close la plus récente (seule la fonction de répartition est évaluée),
+# recalculé une fois par heure
+@lru_cache(maxsize=16)
+def get_current_spi(timescale, hour):
+    today = pd.Timestamp(hour[:10])
+    end = dekad_start(today)
+    start = (end - pd.DateOffset(months=7)).replace(day=1)
+    daily = read_rainfall_archive(start, end - pd.Timedelta(days=1))
+    return get_spi_calibration(today.year - 1, get_data_provider().name).latest(dekadal_totals(daily), timescale)
+
+
+def current_spi(timescale):
+    return get_current_spi(timescale, current_hour())
+
+
+# Ensembles de prévision saisonnière (un répertoire NPY ou un fichier NetCDF par date de début)
+FORECAST_DIR = os.environ.get(
+    "AGROMET_FORECAST_DIR",
+    os.path.join(os.path.dirname(OBSERVATIONS_DIR), "forecast")
+)
+
+
+# Début de la saison agricole prévue : mai de l'année en cours, ou de l'année suivante après octobre
+def forecast_season_start(today=None):
+    today = pd.Timestamp(today if today is not None else datetime.now())
+    return pd.Timestamp(today.year + (1 if today.month >= 11 else 0), 5, 1)
+
+
+# Ensemble de prévision lu sur disque, sinon simulé une fois puis enregistré
+def load_forecast_ensemble(start):
+    name = start.strftime("%Y-%m-%d")
+    netcdf = os.path.join(FORECAST_DIR, f"{name}.nc")
+    if os.path.exists(netcdf):
+        return ForecastEnsemble.load(netcdf)
+    directory = os.path.join(FORECAST_DIR, name)
+    if os.path.exists(os.path.join(directory, "ensemble.json")):
+        return ForecastEnsemble.load(directory)
+    ensemble = synthetic_ensemble(start, seed=start.year)
+    ensemble.save(directory)
+    return ForecastEnsemble.load(directory)
+
+
+# Perspectives saisonnières de toutes les régions, calculées une fois par ensemble et par source de données
+@RESOURCES.shared('seasonal_outlook')
+def get_seasonal_outlook(start, source):
+    ensemble = load_forecast_ensemble(start)
+    reference_end_year = start.year - 1
+    climatology = reference_climatology(reference_end_year)
+    # Stations de l'ensemble absentes de la climatologie : terciles NaN
+    dekadal = climatology.dekadal_array(
+        reference_end_year - NORMAL_YEARS + 1, reference_end_year, stations=ensemble.stations
+    )
+    terciles = climatology_terciles(dekadal, ensemble.start, len(ensemble.dates))
+    return ensemble.members, regional_outlook(seasonal_outlook(ensemble, terciles))
+
+
+# Moteur d'avis partagé : les règles sont compilées une seule fois (matrices en lecture seule)
+@RESOURCES.shared('advisory_engine')
+def get_advisory_engine():
+    return AdvisoryEngine()
+
+
+# Moyenne régionale d'une série indexée par station
+def regional_mean(values):
+    return values.groupby(values.index.map(STATION_REGIONS)).mean()
+
+
+# Indicateurs de toutes les régions × cultures, assemblés en un lot pour le moteur d'avis
+def advisory_indicators():
+    panel = current_weather_panel()
+    today = pd.Timestamp(datetime.now()).normalize()
+    wrsi = current_wrsi_table().xs('Semis normal', level='Scénario')
+    elapsed = (today - wrsi['Semis']).dt.days
+    stage = pd.Series(
+        [int(crop_stage(CROP_CALENDARS[crop], days)) for (_, crop), days in elapsed.items()],
+        index=wrsi.index
+    )
+    _, outlook = get_seasonal_outlook(forecast_season_start(), get_data_provider().name)
+    return build_indicators(
+        get_station_index().regions_list(),
+        CROP_CALENDARS,
+        region_values={
+            'pluie_3j': regional_period_totals(panel, 'Précipitations (mm)', days=3),
+            'pluie_7j': regional_period_totals(panel, 'Précipitations (mm)', days=7),
+            'tmax': regional_daily_values(panel, 'Température Max (°C)', how='max'),
+            'vent_max': regional_daily_values(panel, 'Vitesse Vent (m/s)', how='max'),
+            'reserve': current_soil_water_balance().regional_reserve(),
+            'spi_decade': regional_mean(current_spi('SPI décadaire')),
+            'spi_3': regional_mean(current_spi('SPI-3')),
+            'proba_inferieur': outlook['terciles'].loc['Inférieur'],
+            'proba_superieur': outlook['terciles'].loc['Supérieur']
+        },
+        crop_values={'wrsi': wrsi['WRSI'], 'stade': stage, 'jours_avant_semis': -elapsed}
+    )
+
+
+# Calendrier des prochaines semaines : stade de chaque culture (semis normal) et pluie mensuelle prévue
+def crop_calendar_activities(region, weeks=4):
+    today = pd.Timestamp(datetime.now()).normalize()
+    sowing = current_wrsi_table().xs((region, 'Semis normal'), level=('Région', 'Scénario'))['Semis']
+    _, outlook = get_seasonal_outlook(forecast_season_start(), get_data_provider().name)
+    monthly_rain = outlook['monthly_rain'][region] if region in outlook['monthly_rain'] else pd.Series(dtype=float)
+    forecast_months = pd.period_range(forecast_season_start(), periods=len(monthly_rain), freq='M')
+    rows = []
+    for week in range(weeks):
+        day = today + pd.Timedelta(weeks=week)
+        stages = {crop: int(crop_stage(CROP_CALENDARS[crop], (day - sowing[crop]).days)) for crop in sowing.index}
+        month = day.to_period('M')
+        if month in forecast_months:
+            conditions = f"≈ {monthly_rain.iloc[forecast_months.get_loc(month)]:.0f} mm prévus sur le mois"
+        else:
+            conditions = "Hors période de prévision saisonnière"
+        rows.append({
+            'Semaine': f"Semaine {week + 1} ({day.strftime('%d/%m')})",
+            'Activités Principales': " · ".join(f"{crop}: {STAGE_ACTIVITIES[stage]}" for crop, stage in stages.items()),
+            'Conditions Météo': conditions,
+            'Priorité': 'Haute' if any(stage in (0, 2) for stage in stages.values()) else 'Moyenne'
+        })
+    return pd.DataFrame(rows)
+
+
+# Bulletins PDF, nommés par l'empreinte de leur contenu
+BULLETIN_DIR = os.environ.get(
+    "AGROMET_BULLETIN_DIR",
+    os.path.join(os.path.dirname(OBSERVATIONS_DIR), "bulletins")
+)
+
+
+def format_value(value, unit="", decimals=0):
+    return "n.d." if pd.isna(value) else f"{value:.{decimals}f}{unit}"
+
+
+# Contenu d'un bulletin régional : uniquement des données sérialisables, rendues par un processus séparé
+def bulletin_content(region, indicators=None, masks=None):
+    engine = get_advisory_engine()
+    if indicators is None:
+        indicators = advisory_indicators()
+    if masks is None:
+        masks = engine.evaluate(indicators)
+    values = indicators.xs(region, level='Région').iloc[0]
+    rainfall = generate_decade_rainfall_data(region)
+    current = int(dekad_of_year([datetime.now()])[0])
+    wrsi = current_wrsi_table().xs((region, 'Semis normal'), level=('Région', 'Scénario'))
+    return {
+        'region': region,
+        'date': datetime.now().strftime("%d/%m/%Y"),
+        'indicators': [
+            ["Pluie des 7 derniers jours", format_value(values['pluie_7j'], " mm")],
+            ["Température maximale", format_value(values['tmax'], " °C", 1)],
+            ["Vent maximal", format_value(values['vent_max'], " m/s", 1)],
+            ["Réserve en eau du sol", format_value(values['reserve'], " %")],
+            ["SPI-3", format_value(values['spi_3'], "", 2)],
+            ["Probabilité d'une saison déficitaire", format_value(values['proba_inferieur'], " %")]
+        ],
+        'map': {
+            'title': "Précipitations cumulées sur 30 jours",
+            'unit': "mm",
+            'palette': MAP_PALETTES['precipitation'],
+            'values': regional_period_totals(current_weather_panel(), 'Précipitations (mm)', days=30)
+        },
+        'rainfall': {
+            'labels': rainfall['Période'][:current].tolist(),
+            'observed': rainfall['Pluie observée (mm)'][:current].tolist(),
+            'normal': rainfall['Moyenne 30 ans (mm)'][:current].tolist()
+        },
+        'wrsi': [
+            [crop] + [format_value(row[column], " %") for column in ['Initial', 'Développement', 'Mi-saison', 'WRSI']]
+            for crop, row in wrsi.iterrows()
+        ],
+        'alerts': [[item['title'], item['message']]
+                   for item in engine.advisories(masks, indicators, region, category='alerte')],
+        'advice': [[item['culture'], item['message']]
+                   for item in engine.advisories(masks, indicators, region, category='conseil')],
+        'calendar': crop_calendar_activities(region).astype(str).values.tolist()
+    }
+
+
+# Bulletins de toutes les régions, rendus en parallèle sur tous les cœurs
+def render_all_bulletins():
+    indicators = advisory_indicators()
+    masks = get_advisory_engine().evaluate(indicators)
+    contents = [bulletin_content(region, indicators, masks) for region in STATIONS_DATA]
+    return render_bulletins(contents, BULLETIN_DIR)
+
+
+# Bulletins préparés hors du fil de la page (un lot à la fois), rendus sur le pool de processus partagé
+_batch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='bulletins')
+
+
+def submit_all_bulletins():
+    """Future {région: chemin du PDF} du lot de toutes les régions"""
+    return _batch_executor.submit(render_all_bulletins)
+
+
+def render_region_bulletin(region):
+    return submit_bulletin(bulletin_content(region), BULLETIN_DIR).result()
+
+
+def submit_region_bulletin(region):
+    """Future du chemin du PDF d'une région : le contenu est aussi préparé hors du fil de la page"""
+    return _batch_executor.submit(render_region_bulletin, region)
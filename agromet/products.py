@@ -0,0 +1,317 @@
+import os
+import re
+import json
+import time
+import shutil
+import argparse
+import multiprocessing
+from datetime import datetime
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from agromet import pipeline
+from agromet.metrics import METRICS
+from agromet.spi import SPI_TIMESCALES
+from agromet.stations import STATIONS_DATA
+from agromet.weather import regional_daily_values, regional_period_totals
+
+# Version du format des produits : la changer ignore les exécutions déjà écrites
+PRODUCTS_VERSION = 1
+
+# Produits finis, un répertoire par jour et par exécution
+PRODUCTS_DIR = os.environ.get(
+    "AGROMET_PRODUCTS_DIR",
+    os.path.join(os.path.dirname(pipeline.OBSERVATIONS_DIR), "products")
+)
+
+# Nombre de processus de calcul (par défaut un par cœur)
+PRODUCTS_WORKERS = int(os.environ.get("AGROMET_PRODUCTS_WORKERS", "0")) or None
+
+# Exécutions du jour gardées en plus de LATEST (un lecteur ayant résolu l'ancien LATEST la lit jusqu'au bout) ;
+# les jours passés sont supprimés à chaque publication
+PRODUCTS_KEEP_RUNS = int(os.environ.get("AGROMET_PRODUCTS_KEEP_RUNS", "2"))
+
+
+def _weather():
+    panel = pipeline.current_weather_panel()
+    dates = panel.index.get_level_values('Date')
+    return panel[dates > dates.max() - pd.Timedelta(days=7)]
+
+
+def _spi():
+    return pd.DataFrame({timescale: pipeline.current_spi(timescale) for timescale in SPI_TIMESCALES})
+
+
+def _seasonal():
+    start = pipeline.forecast_season_start()
+    members, outlook = pipeline.get_seasonal_outlook(start, pipeline.get_data_provider().name)
+    return {'start': start.strftime('%Y-%m-%d'), 'members': int(members), **outlook}
+
+
+def _et0():
+    return pipeline.get_panel_et0(pipeline.current_hour()).tail(7)
+
+
+def _soil():
+    balance = pipeline.current_soil_water_balance()
+    parameters = pd.DataFrame({'capacity': balance.capacity(), 'raw': balance.raw}, index=balance.stations)
+    return {'reserve': balance.reserve_history().tail(31), 'parameters': parameters}
+
+
+def _advisories():
+    engine = pipeline.get_advisory_engine()
+    indicators = pipeline.advisory_indicators()
+    masks = engine.evaluate(indicators)
+    return {
+        region: [
+            {key: item.get(key) for key in ('category', 'level', 'icon', 'title', 'message', 'culture')}
+            for item in engine.advisories(masks, indicators, region)
+        ]
+        for region in STATIONS_DATA
+    }
+
+
+# Produits nationaux : une tâche chacun ; DataFrame -> Parquet, dictionnaire -> JSON
+# (les DataFrames d'un dictionnaire sont écrits à part, les autres valeurs dans le JSON)
+NATIONAL_PRODUCTS = {
+    'weather': _weather,
+    'daily_precipitation': lambda: regional_daily_values(pipeline.current_weather_panel(), 'Précipitations (mm)'),
+    'rainfall_30d': lambda: regional_period_totals(pipeline.current_weather_panel(), 'Précipitations (mm)', days=30),
+    'spi': _spi,
+    'seasonal': _seasonal,
+    'wrsi': pipeline.current_wrsi_table,
+    'et0': _et0,
+    'soil': _soil,
+    'soil_regional': lambda: pipeline.current_soil_water_balance().regional_reserve(),
+    'advisories': _advisories
+}
+
+# Produits régionaux : une tâche par région
+REGIONAL_PRODUCTS = {
+    'decade_rainfall': pipeline.generate_decade_rainfall_data,
+    'calendar': pipeline.crop_calendar_activities
+}
+
+
+def compute_product(name, region=None):
+    if region is None:
+        return NATIONAL_PRODUCTS[name]()
+    return REGIONAL_PRODUCTS[name](region)
+
+
+def artifact_name(name, region=None):
+    return name if region is None else f"{name}-{region}"
+
+
+def _to_json(value):
+    if hasattr(value, 'item'):
+        return value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+# Écrit un produit dans le répertoire d'une exécution ; retourne la liste des fichiers écrits
+def write_artifact(directory, name, value):
+    if isinstance(value, pd.DataFrame):
+        value.to_parquet(os.path.join(directory, f"{name}.parquet"))
+        return [f"{name}.parquet"]
+    files = [f"{name}.json"]
+    frames = {key: item for key, item in value.items() if isinstance(item, pd.DataFrame)}
+    for key, frame in frames.items():
+        frame.to_parquet(os.path.join(directory, f"{name}.{key}.parquet"))
+        files.append(f"{name}.{key}.parquet")
+    document = {
+        'values': {key: item for key, item in value.items() if key not in frames},
+        'frames': list(frames)
+    }
+    with open(os.path.join(directory, f"{name}.json"), 'w', encoding='utf-8') as f:
+        json.dump(document, f, ensure_ascii=False, default=_to_json)
+    return files
+
+
+def read_artifact(directory, name):
+    path = os.path.join(directory, f"{name}.parquet")
+    if os.path.exists(path):
+        return pd.read_parquet(path)
+    path = os.path.join(directory, f"{name}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        document = json.load(f)
+    value = document['values']
+    for key in document['frames']:
+        value[key] = pd.read_parquet(os.path.join(directory, f"{name}.{key}.parquet"))
+    return value
+
+
+# Tâche exécutée dans un processus de calcul
+def product_job(directory, name, region=None):
+    started = time.perf_counter()
+    files = write_artifact(directory, artifact_name(name, region), compute_product(name, region))
+    return artifact_name(name, region), files, round(time.perf_counter() - started, 3)
+
+
+# Répertoires de jour <racine>/AAAA-MM-JJ
+DAY_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+class ProductStore:
+    """Exécutions versionnées <racine>/<jour>/<exécution>, publiées par renommage atomique.
+
+    Le fichier LATEST de chaque jour désigne la dernière exécution complète ; les lecteurs
+    ne voient jamais une exécution partiellement écrite.
+    """
+
+    def __init__(self, root, version=PRODUCTS_VERSION, keep_runs=PRODUCTS_KEEP_RUNS):
+        self.root = os.path.abspath(root)
+        self.version = version
+        self.keep_runs = keep_runs
+
+    def begin(self, day):
+        # Horodatage à la microseconde et processus : deux exécutions n'ont jamais le même identifiant
+        run_id = f"{datetime.now():%Y%m%dT%H%M%S%f}-{os.getpid()}"
+        directory = os.path.join(self.root, day, f".{run_id}.tmp")
+        os.makedirs(directory)
+        return run_id, directory
+
+    def publish(self, day, run_id, directory, artifacts, **metadata):
+        with open(os.path.join(directory, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': self.version,
+                'day': day,
+                'run': run_id,
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'artifacts': artifacts,
+                **metadata
+            }, f, ensure_ascii=False, indent=1)
+        # Un répertoire publié n'est jamais remplacé : le renommage échoue plutôt que d'écraser une exécution lue
+        final = os.path.join(self.root, day, run_id)
+        os.rename(directory, final)
+        pointer = os.path.join(self.root, day, 'LATEST')
+        with open(f"{pointer}.tmp", 'w', encoding='utf-8') as f:
+            f.write(run_id)
+        os.replace(f"{pointer}.tmp", pointer)
+        self.prune(day)
+        return final
+
+    def prune(self, day):
+        """Supprime les jours antérieurs à `day` et les exécutions du jour au-delà de LATEST + keep_runs"""
+        for entry in os.listdir(self.root):
+            if DAY_PATTERN.fullmatch(entry) and entry < day:
+                shutil.rmtree(os.path.join(self.root, entry), ignore_errors=True)
+        day_dir = os.path.join(self.root, day)
+        try:
+            with open(os.path.join(day_dir, 'LATEST'), encoding='utf-8') as f:
+                latest = f.read().strip()
+        except OSError:
+            return
+        # Identifiants horodatés : l'ordre alphabétique est l'ordre chronologique ; les exécutions en cours (.tmp) sont ignorées
+        runs = sorted(
+            entry for entry in os.listdir(day_dir)
+            if entry != latest and not entry.startswith('.') and os.path.isdir(os.path.join(day_dir, entry))
+        )
+        for run in runs[:max(len(runs) - self.keep_runs, 0)]:
+            shutil.rmtree(os.path.join(day_dir, run), ignore_errors=True)
+
+    def manifest(self, day):
+        """Manifeste de la dernière exécution complète du jour, None si absente ou d'une autre version"""
+        try:
+            with open(os.path.join(self.root, day, 'LATEST'), encoding='utf-8') as f:
+                run_id = f.read().strip()
+            with open(os.path.join(self.root, day, run_id, 'manifest.json'), encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return manifest if manifest.get('version') == self.version else None
+
+    def latest_run(self, day):
+        manifest = self.manifest(day)
+        return None if manifest is None else os.path.join(self.root, day, manifest['run'])
+
+    def read(self, day, name, region=None):
+        directory = self.latest_run(day)
+        if directory is None:
+            return None
+        return _read_cached(directory, artifact_name(name, region))
+
+
+# Les exécutions publiées sont immuables : un artefact lu une fois est gardé en mémoire
+@lru_cache(maxsize=256)
+def _read_cached(directory, name):
+    return read_artifact(directory, name)
+
+
+METRICS.register_cache('product_artifacts', _read_cached.cache_info)
+
+
+@lru_cache(maxsize=None)
+def get_product_store():
+    return ProductStore(PRODUCTS_DIR)
+
+
+def load_product(name, region=None):
+    """Produit du jour lu dans la dernière exécution publiée, calculé à la volée sinon"""
+    with METRICS.timer('data_fetch'):
+        value = get_product_store().read(datetime.now().strftime('%Y-%m-%d'), name, region)
+    if value is None:
+        with METRICS.timer('computation'):
+            if name == 'decade_rainfall':
+                pipeline.ingest_closed_dekads(pipeline.current_hour())
+            value = compute_product(name, region)
+    return value
+
+
+def product_tasks(regions=None):
+    regions = list(regions or STATIONS_DATA)
+    return [(name, None) for name in NATIONAL_PRODUCTS] + [
+        (name, region) for name in REGIONAL_PRODUCTS for region in regions
+    ]
+
+
+def warm_up():
+    """Prépare dans le processus parent les états partagés enregistrés sur disque
+    (climatologie, calibration du SPI, ensemble de prévision) pour que les processus
+    de calcul les relisent au lieu de les reconstruire chacun"""
+    year = datetime.now().year
+    pipeline.reference_climatology(year - 1)
+    pipeline.get_spi_calibration(year - 1, pipeline.get_data_provider().name)
+    start = pipeline.forecast_season_start()
+    pipeline.reference_climatology(start.year - 1)
+    pipeline.load_forecast_ensemble(start)
+
+
+def build_products(root=PRODUCTS_DIR, max_workers=PRODUCTS_WORKERS, regions=None):
+    """Calcule tous les produits du jour en parallèle et publie l'exécution ; retourne son répertoire"""
+    store = ProductStore(root)
+    day = datetime.now().strftime('%Y-%m-%d')
+    warm_up()
+    run_id, directory = store.begin(day)
+    artifacts = {}
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = [pool.submit(product_job, directory, name, region) for name, region in product_tasks(regions)]
+            for future in as_completed(futures):
+                name, files, seconds = future.result()
+                artifacts[name] = {'files': files, 'seconds': seconds}
+    except BaseException:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+    # Les processus de calcul n'enregistrent pas la climatologie : les décades closes sont intégrées ici, une fois
+    pipeline.ingest_closed_dekads(pipeline.current_hour())
+    return store.publish(day, run_id, directory, artifacts)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calcul des produits AGROMET_RCI")
+    parser.add_argument("--root", default=PRODUCTS_DIR, help="Répertoire des produits")
+    parser.add_argument("--workers", type=int, default=PRODUCTS_WORKERS, help="Nombre de processus de calcul")
+    parser.add_argument("--bulletins", action="store_true", help="Rendre aussi les bulletins PDF de toutes les régions")
+    args = parser.parse_args()
+    started = time.perf_counter()
+    directory = build_products(args.root, args.workers)
+    print(f"Produits publiés dans {directory} ({time.perf_counter() - started:.1f} s)")
+    if args.bulletins:
+        print(f"{len(pipeline.render_all_bulletins())} bulletins dans {pipeline.BULLETIN_DIR}")
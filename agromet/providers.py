@@ -0,0 +1,144 @@
+import abc
+import zlib
+import threading
+
+import numpy as np
+import pandas as pd
+
+from agromet.evapotranspiration import panel_matrix
+from agromet.stations import ALL_STATIONS, STATIONS_DATA
+from agromet.store import ObservationStore
+from agromet.weather import WEATHER_COLUMNS, simulate_weather, station_latitudes, weather_panel_frame
+
+
+class DataProvider(abc.ABC):
+    """Source des observations journalières partagée par toutes les sessions.
+
+    Les implémentations ne gardent aucun état mutable propre à un appel : elles peuvent être
+    appelées simultanément depuis plusieurs threads.
+    """
+
+    name = None
+
+    @abc.abstractmethod
+    def weather(self, stations=None, start=None, end=None, columns=None):
+        """Panneau indexé par (Station, Date) avec une colonne 'Région'"""
+
+    def regions_weather(self, regions, start=None, end=None, columns=None):
+        """Panneau de toutes les stations de plusieurs régions, lu ou simulé en un seul lot"""
+        stations = [station for region in regions for station in STATIONS_DATA[region]]
+        return self.weather(stations, start, end, columns)
+
+    def rainfall(self, start, end, stations=None):
+        """Pluie journalière (jours × stations)"""
+        panel = self.weather(stations, start, end, columns=['Précipitations (mm)'])
+        return panel_matrix(panel, 'Précipitations (mm)', stations)
+
+
+class SyntheticProvider(DataProvider):
+    """Séries simulées reproductibles : un générateur indépendant par station et par année.
+
+    La valeur d'un jour ne dépend que de la graine, de la station et de la date, quelles que
+    soient la fenêtre ou les stations demandées ; aucun état aléatoire global n'est utilisé.
+    """
+
+    def __init__(self, seed=42):
+        self.seed = seed
+        self.name = f"synthetique-{seed}"
+
+    def _generator(self, station, year):
+        return np.random.default_rng([self.seed, zlib.crc32(station.encode('utf-8')), year])
+
+    def weather(self, stations=None, start=None, end=None, columns=None):
+        stations = list(ALL_STATIONS if stations is None else stations)
+        end = pd.Timestamp(end if end is not None else pd.Timestamp.now()).normalize()
+        start = pd.Timestamp(start if start is not None else end).normalize()
+        dates = pd.date_range(start, end, freq='D')
+        lats = station_latitudes(stations)
+
+        # Tirages par blocs annuels (stations × jours de l'année), puis découpe de la fenêtre
+        blocks = []
+        for year in range(start.year, end.year + 1):
+            year_dates = pd.date_range(f"{year}-01-01", f"{year}-12-31", freq='D')
+            draws = [
+                simulate_weather(self._generator(station, year), lats[k:k + 1], year_dates.dayofyear.to_numpy())
+                for k, station in enumerate(stations)
+            ]
+            keep = (year_dates >= start) & (year_dates <= end)
+            blocks.append({name: np.concatenate([d[name] for d in draws])[:, keep] for name in draws[0]})
+        values = {name: np.concatenate([block[name] for block in blocks], axis=1) for name in blocks[0]}
+        panel = weather_panel_frame(stations, dates, values)
+        return panel if columns is None else panel[['Région'] + list(columns)]
+
+
+class ObservationProvider(DataProvider):
+    """Observations de l'archive Parquet partitionnée"""
+
+    name = "observations"
+
+    def __init__(self, root):
+        self.store = ObservationStore(root)
+        self._lock = threading.Lock()
+
+    def has_data(self):
+        return self.store.has_data()
+
+    def weather(self, stations=None, start=None, end=None, columns=None):
+        # La découverte des fichiers du jeu de données n'est faite que par un thread à la fois
+        # (archive vide : la lecture retourne un panneau vide)
+        if self.store.has_data():
+            with self._lock:
+                self.store.dataset()
+        panel = self.store.read(stations, start, end, columns)
+        return panel[['Région'] + [c for c in (columns or WEATHER_COLUMNS) if c in panel.columns]]
+
+
+class AutoProvider(DataProvider):
+    """Archive d'observations quand elle couvre la fenêtre du panneau météo, séries simulées sinon.
+
+    Le choix est refait à chaque écriture dans l'archive (marqueur de version) et à chaque changement
+    de jour : une application démarrée avant le remplissage de l'archive passe aux observations sans
+    redémarrer, et revient aux séries simulées si l'archive n'est plus à jour.
+    """
+
+    def __init__(self, root, coverage_days=365):
+        self.observations = ObservationProvider(root)
+        self.synthetic = SyntheticProvider()
+        self.coverage_days = coverage_days
+        self._source = None
+        self._key = None
+        self._lock = threading.Lock()
+
+    def covers(self, start, end):
+        bounds = self.observations.store.date_range()
+        return bounds is not None and bounds[0] <= start and end <= bounds[1]
+
+    def source(self):
+        today = pd.Timestamp.now().normalize()
+        key = (self.observations.store.version(), today)
+        with self._lock:
+            if self._source is None or key != self._key:
+                self._key = key
+                start = today - pd.Timedelta(days=self.coverage_days - 1)
+                self._source = self.observations if self.covers(start, today) else self.synthetic
+            return self._source
+
+    @property
+    def name(self):
+        return self.source().name
+
+    def weather(self, stations=None, start=None, end=None, columns=None):
+        return self.source().weather(stations, start, end, columns)
+
+
+# Fournisseurs disponibles : nom -> constructeur (racine de l'archive, profondeur du panneau en jours)
+DATA_PROVIDERS = {
+    'auto': AutoProvider,
+    'synthetique': lambda root, coverage_days: SyntheticProvider(),
+    'observations': lambda root, coverage_days: ObservationProvider(root)
+}
+
+
+def create_provider(kind, root, coverage_days=365):
+    """Fournisseur demandé ; 'auto' suit l'archive dès qu'elle couvre les coverage_days derniers jours"""
+    return DATA_PROVIDERS[kind](root, coverage_days)
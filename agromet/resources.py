@@ -0,0 +1,147 @@
+import sys
+import time
+import threading
+from functools import wraps
+
+import numpy as np
+import pandas as pd
+
+from agromet.metrics import METRICS
+
+_MISSING = object()
+
+
+def sizeof(value, seen=None, exclude=frozenset()):
+    """Taille approchée (octets) d'un objet et de tout ce qu'il référence, chaque objet compté une fois.
+
+    Les objets dont l'identifiant figure dans `exclude` (ressources partagées) ne sont pas comptés.
+    """
+    seen = set() if seen is None else seen
+    if id(value) in seen or id(value) in exclude:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        # Une vue ne compte que le tableau dont elle dépend (une seule fois)
+        return sizeof(value.base, seen, exclude) if isinstance(value.base, np.ndarray) else value.nbytes
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(sizeof(k, seen, exclude) + sizeof(v, seen, exclude) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(sizeof(item, seen, exclude) for item in value)
+    elif hasattr(value, '__dict__') and not isinstance(value, type):
+        size += sizeof(vars(value), seen, exclude)
+    return size
+
+
+def freeze(value, seen=None):
+    """Passe en lecture seule les tableaux NumPy d'une ressource (attributs, dictionnaires, listes, tuples).
+
+    Les DataFrame ne sont pas modifiés : avec le copy-on-write de pandas, un objet dérivé d'une
+    ressource partagée n'écrit jamais dans ses données.
+    """
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return value
+    seen.add(id(value))
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    elif isinstance(value, dict):
+        for item in value.values():
+            freeze(item, seen)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            freeze(item, seen)
+    elif hasattr(value, '__dict__') and not isinstance(value, (type, pd.DataFrame, pd.Series, pd.Index)):
+        freeze(vars(value), seen)
+    return value
+
+
+class ResourceRegistry:
+    """Ressources du processus chargées une seule fois et partagées par référence entre les sessions.
+
+    Une ressource est identifiée par son nom et les arguments de son chargeur ; les appels simultanés
+    attendent le premier chargement au lieu de le dupliquer. Les ressources figées sont en lecture seule.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._info = {}
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def shared(self, name, frozen=True):
+        """Décorateur d'un chargeur : une valeur partagée par jeu d'arguments (remplace lru_cache(maxsize=None))"""
+        def decorator(loader):
+            @wraps(loader)
+            def get(*args):
+                key = (name, args)
+                value = self._values.get(key, _MISSING)
+                if value is _MISSING:
+                    value = self._load(key, loader, args, frozen)
+                self._info[key]['reads'] += 1
+                return value
+            return get
+        return decorator
+
+    def _load(self, key, loader, args, frozen):
+        with self._lock:
+            lock = self._loading.setdefault(key, threading.Lock())
+        with lock:
+            if key in self._values:
+                return self._values[key]
+            started = time.perf_counter()
+            value = loader(*args)
+            if frozen:
+                freeze(value)
+            self._info[key] = {'seconds': time.perf_counter() - started, 'frozen': frozen, 'reads': 0}
+            self._values[key] = value
+            return value
+
+    def stats(self):
+        """Une ligne par ressource chargée : nom, arguments, taille actuelle, durée de chargement, lectures"""
+        return [
+            {'resource': name, 'args': ', '.join(map(str, args)), 'bytes': sizeof(self._values[(name, args)]), **info}
+            for (name, args), info in list(self._info.items())
+        ]
+
+    def resource_bytes(self):
+        totals = {}
+        for row in self.stats():
+            totals[row['resource']] = totals.get(row['resource'], 0) + row['bytes']
+        return totals
+
+    def account_session(self, session_id, state, force=False):
+        """Mesure les octets propres à une session (son état, hors ressources partagées référencées),
+        au plus toutes les EXPORT_INTERVAL secondes : le parcours de l'état est coûteux
+        """
+        if not force and not METRICS.session_due(session_id):
+            return None
+        shared = frozenset(id(value) for value in list(self._values.values()))
+        size = sizeof(dict(state), exclude=shared)
+        METRICS.record_session_bytes(session_id, size)
+        return size
+
+    def session_stats(self):
+        """Sessions actives, octets par session mesurée (moyenne, maximum, total) et octets partagés"""
+        sizes = METRICS.session_bytes()
+        return {
+            'sessions': METRICS.active_sessions(),
+            'mean': sum(sizes) / len(sizes) if sizes else 0,
+            'max': max(sizes, default=0),
+            'total': sum(sizes),
+            'shared': sum(self.resource_bytes().values())
+        }
+
+
+RESOURCES = ResourceRegistry()
+
+
+METRICS.register_gauge('agromet_shared_resource_bytes', 'resource', RESOURCES.resource_bytes)
+METRICS.register_gauge(
+    'agromet_session_state_bytes', 'stat',
+    lambda: {key: value for key, value in RESOURCES.session_stats().items() if key in ('mean', 'max', 'total')}
+)
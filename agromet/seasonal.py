@@ -0,0 +1,206 @@
+import os
+import json
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from agromet.climatology import DEKADS_PER_YEAR, dekad_of_year
+from agromet.spi import rolling_accumulation
+from agromet.stations import ALL_STATIONS, STATION_REGIONS, STATIONS_DATA
+from agromet.weather import MONTH_LABELS, WET_DAY_MEAN_RAIN, wet_day_probability
+from agromet.wrsi import regional_matrix
+
+# Variables d'un ensemble de prévision : pluie journalière (mm) et température moyenne (°C)
+ENSEMBLE_VARIABLES = ['rain', 'tmean']
+
+# Nombre de membres traités à la fois (mémoire bornée quel que soit l'ensemble)
+CHUNK_MEMBERS = 8
+
+TERCILE_LABELS = ['Inférieur', 'Normal', 'Supérieur']
+
+# Début de saison : 20 mm en 3 jours sans séquence sèche de 7 jours dans les 30 jours suivants
+ONSET_RAIN = 20.0
+ONSET_WINDOW = 3
+DRY_DAY = 1.0
+DRY_SPELL = 7
+DRY_SPELL_HORIZON = 30
+
+# Fin de saison : à partir du 1er septembre, moins de 10 mm sur les 20 jours suivants
+CESSATION_EARLIEST = (9, 1)
+CESSATION_RAIN = 10.0
+CESSATION_WINDOW = 20
+
+
+class ForecastEnsemble:
+    """Membres d'une prévision saisonnière : tableaux (membres × jours × stations) par variable"""
+
+    def __init__(self, start, stations, variables):
+        self.start = pd.Timestamp(start).normalize()
+        self.stations = list(stations)
+        self.variables = variables
+        self.members, days, _ = variables['rain'].shape
+        self.dates = pd.date_range(self.start, periods=days, freq='D')
+
+    @classmethod
+    def load(cls, path):
+        """Ensemble NPY (répertoire, lecture en mmap) ou NetCDF (fichier, nécessite xarray)"""
+        if os.path.isdir(path):
+            with open(os.path.join(path, 'ensemble.json'), encoding='utf-8') as f:
+                metadata = json.load(f)
+            variables = {
+                name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+                for name in metadata['variables']
+            }
+            return cls(metadata['start'], metadata['stations'], variables)
+
+        import xarray as xr
+        dataset = xr.open_dataset(path)
+        variables = {
+            name: dataset[name].transpose('member', 'time', 'station')
+            for name in ENSEMBLE_VARIABLES if name in dataset
+        }
+        return cls(dataset['time'].values[0], [str(s) for s in dataset['station'].values], variables)
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name, values in self.variables.items():
+            np.save(os.path.join(directory, f"{name}.npy"), np.asarray(values, dtype=np.float32))
+        with open(os.path.join(directory, 'ensemble.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'start': self.start.strftime('%Y-%m-%d'),
+                'stations': self.stations,
+                'variables': list(self.variables)
+            }, f)
+
+    def chunks(self, size=CHUNK_MEMBERS):
+        """Parcourt les membres par blocs ; seul le bloc courant est chargé en mémoire"""
+        for first in range(0, self.members, size):
+            yield {
+                name: np.asarray(values[first:first + size], dtype=float)
+                for name, values in self.variables.items()
+            }
+
+
+def synthetic_ensemble(start, months=6, members=51, stations=None, seed=2024):
+    """Ensemble simulé : régime de pluie du générateur météo modulé par une anomalie propre à chaque membre"""
+    stations = list(ALL_STATIONS if stations is None else stations)
+    start = pd.Timestamp(start).normalize()
+    dates = pd.date_range(start, start + pd.DateOffset(months=months) - pd.Timedelta(days=1), freq='D')
+    lats = np.array([STATIONS_DATA[STATION_REGIONS[s]][s]['lat'] for s in stations])
+    shape = (members, len(dates), len(stations))
+
+    rng = np.random.default_rng(seed)
+    probability = wet_day_probability(lats[None, None, :], dates.dayofyear.to_numpy()[None, :, None])
+    wetness = rng.normal(1.0, 0.2, (members, 1, 1))
+    wet = rng.random(shape) < np.clip(probability * wetness, 0.0, 1.0)
+    rain = np.where(wet, np.minimum(rng.exponential(WET_DAY_MEAN_RAIN, shape), 120.0), 0.0)
+    seasonal = 27.0 - 2.0 * np.sin(2 * np.pi * (dates.dayofyear.to_numpy() - 100) / 365)
+    tmean = seasonal[None, :, None] + rng.normal(0.0, 0.5, (members, 1, 1)) + rng.normal(0.0, 1.0, shape)
+    return ForecastEnsemble(start, stations, {
+        'rain': rain.astype(np.float32),
+        'tmean': np.round(tmean, 1).astype(np.float32)
+    })
+
+
+def climatology_terciles(dekadal, start, days):
+    """Bornes des terciles (2 × stations) du cumul de la fenêtre de prévision sur les années de référence.
+
+    dekadal : cumuls décadaires (années × 36 décades × stations) ; la fenêtre peut chevaucher deux années.
+    """
+    years, _, n_stations = dekadal.shape
+    first_dekad = int(dekad_of_year([start])[0]) - 1
+    window = max(int(round(days / (365.25 / DEKADS_PER_YEAR))), 1)
+    series = dekadal.reshape(years * DEKADS_PER_YEAR, n_stations)
+    accumulation = rolling_accumulation(series, window)
+    ends = np.arange(years) * DEKADS_PER_YEAR + first_dekad + window - 1
+    totals = accumulation[ends[ends < len(series)]]
+    # Une station sans climatologie garde des terciles NaN
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return np.nanquantile(totals, [1 / 3, 2 / 3], axis=0)
+
+
+# Premier indice (axe des jours) où la condition est vraie, NaN sinon
+def _first_day(condition):
+    found = condition.any(axis=1)
+    return np.where(found, condition.argmax(axis=1), np.nan)
+
+
+# Sommes glissantes vers l'avant sur `window` jours (axe 1), NaN au-delà de la fin de la série
+def _forward_sum(values, window):
+    cumulative = np.concatenate([np.zeros_like(values[:, :1]), np.cumsum(values, axis=1)], axis=1)
+    sums = np.full(values.shape, np.nan)
+    sums[:, :values.shape[1] - window + 1] = cumulative[:, window:] - cumulative[:, :-window]
+    return sums
+
+
+def season_dates(rain, dates):
+    """Indices (jours depuis le début) du début et de la fin de saison, par membre × station"""
+    # Séquences sèches de DRY_SPELL jours commençant à chaque jour, comptées sur l'horizon suivant
+    dry_spell_start = _forward_sum((rain < DRY_DAY).astype(float), DRY_SPELL) == DRY_SPELL
+    spells_ahead = _forward_sum(np.nan_to_num(dry_spell_start.astype(float)), DRY_SPELL_HORIZON - DRY_SPELL + 1)
+    spells_ahead = np.concatenate([spells_ahead[:, 1:], np.full_like(spells_ahead[:, :1], np.nan)], axis=1)
+    onset_condition = (_forward_sum(rain, ONSET_WINDOW) >= ONSET_RAIN) & (spells_ahead == 0)
+    onset = _first_day(onset_condition)
+
+    earliest = pd.Timestamp(dates[0].year, *CESSATION_EARLIEST)
+    after = np.asarray(dates >= earliest)[None, :, None]
+    after_onset = np.arange(len(dates))[None, :, None] > np.nan_to_num(onset, nan=len(dates))[:, None, :]
+    cessation = _first_day((_forward_sum(rain, CESSATION_WINDOW) < CESSATION_RAIN) & after & after_onset)
+    return onset, cessation
+
+
+def seasonal_outlook(ensemble, terciles, chunk_members=CHUNK_MEMBERS):
+    """Probabilités des terciles, moyennes mensuelles d'ensemble et dates de saison par station.
+
+    Les membres sont traités par blocs : seuls les agrégats (stations × mois) sont conservés.
+    Retourne des DataFrames dont les colonnes sont les stations.
+    """
+    months = ensemble.dates.to_period('M')
+    month_index = pd.Index(months.unique())
+    month_codes = month_index.get_indexer(months)
+    n_stations = len(ensemble.stations)
+
+    counts = np.zeros((3, n_stations))
+    monthly_sums = {name: np.zeros((len(month_index), n_stations)) for name in ensemble.variables}
+    onsets, cessations = [], []
+    for chunk in ensemble.chunks(chunk_members):
+        rain = chunk['rain']
+        total = rain.sum(axis=1)
+        counts[0] += (total < terciles[0]).sum(axis=0)
+        counts[2] += (total > terciles[1]).sum(axis=0)
+        counts[1] += ((total >= terciles[0]) & (total <= terciles[1])).sum(axis=0)
+        for name, values in chunk.items():
+            # Cumul mensuel de la pluie, moyenne mensuelle des autres variables
+            reduce = np.add.reduceat if name == 'rain' else _mean_reduceat
+            monthly_sums[name] += reduce(values, np.flatnonzero(np.diff(month_codes, prepend=-1)), axis=1).sum(axis=0)
+        onset, cessation = season_dates(rain, ensemble.dates)
+        onsets.append(onset)
+        cessations.append(cessation)
+
+    labels = [MONTH_LABELS[period.month - 1] for period in month_index]
+    # Sans terciles climatologiques, les probabilités d'une station restent NaN
+    probabilities = np.where(np.isnan(terciles).any(axis=0), np.nan, 100 * counts / ensemble.members)
+    outlook = {
+        'terciles': pd.DataFrame(probabilities, index=TERCILE_LABELS, columns=ensemble.stations),
+        'season_dates': pd.DataFrame(
+            [np.nanmedian(np.concatenate(onsets), axis=0), np.nanmedian(np.concatenate(cessations), axis=0)],
+            index=['Début de saison', 'Fin de saison'], columns=ensemble.stations
+        )
+    }
+    for name, sums in monthly_sums.items():
+        outlook[f"monthly_{name}"] = pd.DataFrame(sums / ensemble.members, index=labels, columns=ensemble.stations)
+    return outlook
+
+
+def _mean_reduceat(values, indices, axis):
+    lengths = np.diff(np.append(indices, values.shape[axis]))
+    shape = [1] * values.ndim
+    shape[axis] = len(lengths)
+    return np.add.reduceat(values, indices, axis=axis) / lengths.reshape(shape)
+
+
+# Agrégation régionale de toutes les sorties en une passe (moyenne des stations de chaque région)
+def regional_outlook(outlook):
+    return {name: regional_matrix(frame) for name, frame in outlook.items()}
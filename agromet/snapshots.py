@@ -0,0 +1,226 @@
+import os
+import json
+import time
+import shutil
+import argparse
+import multiprocessing
+from datetime import datetime
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from agromet.figures import (
+    decade_rainfall_figure, seasonal_timeline_figure, soil_reserve_figure, stage_satisfaction_figure, temperature_figure
+)
+from agromet.maps import render_folium_heatmap_html
+from agromet.metrics import METRICS
+from agromet.pipeline import current_hour
+from agromet.products import (
+    PRODUCTS_DIR, PRODUCTS_WORKERS, ProductStore, artifact_name, build_products, get_product_store,
+    load_product, write_artifact
+)
+from agromet.spatial import get_station_index
+from agromet.spi import SPI_TIMESCALES
+from agromet.stations import STATIONS_DATA
+from agromet.weather import weather_table
+from agromet.wrsi import CROP_CALENDARS
+
+# Version du format des vues : la changer ignore les vues déjà rendues
+SNAPSHOTS_VERSION = 3
+
+# Vues pré-rendues (cartes HTML, figures Plotly, tableaux), une par page × région
+SNAPSHOTS_DIR = os.environ.get(
+    "AGROMET_SNAPSHOTS_DIR",
+    os.path.join(os.path.dirname(PRODUCTS_DIR), "snapshots")
+)
+
+# Libellés des stades affichés sur la page de satisfaction en eau
+WRSI_STAGE_LABELS = ['Début croissance', 'Croissance végétative', 'Phase reproductive']
+
+
+# Carte d'un produit régional : régions colorées par défaut, surface interpolée pour les valeurs par station
+def _map(data, title, colormap, unit, map_type, height, surface="choropleth"):
+    return {'html': render_folium_heatmap_html(data, title, colormap, unit, map_type, height, surface), 'height': height}
+
+
+# Figure construite puis sérialisée en dictionnaire JSON
+def _figure(builder, *args):
+    with METRICS.timer('plotly_build'):
+        return json.loads(builder(*args).to_json())
+
+
+def _daily_weather(region):
+    panel = load_product('weather')
+    snapshot = {
+        'maps': {'precipitation': _map(load_product('daily_precipitation'), "🌧️ Précipitations Journalières",
+                                       'Blues', " mm", "precipitation", 450)},
+        'figures': {}
+    }
+    recorded = set(panel.index.get_level_values('Station'))
+    for station in get_station_index().stations_in_region(region):
+        if station in recorded:
+            table = weather_table(panel, station)
+            snapshot[f"weather_{station}"] = table
+            snapshot['figures'][f"temperature_{station}"] = _figure(temperature_figure, table)
+    return snapshot
+
+
+# Écarts décadaires à la normale (mm et %)
+def rainfall_deviations(rainfall_data):
+    deviations = rainfall_data[['Période', 'Pluie observée (mm)', 'Moyenne 30 ans (mm)', 'Écart (mm)']].copy()
+    deviations['Écart (%)'] = round(
+        rainfall_data['Écart (mm)'] / rainfall_data['Moyenne 30 ans (mm)'].replace(0, np.nan) * 100, 1
+    )
+    return deviations
+
+
+def _rainfall(region):
+    rainfall_data = load_product('decade_rainfall', region)
+    spi = load_product('spi')
+    maps = {'rainfall_30d': _map(load_product('rainfall_30d'), "🌧️ Précipitations Cumulées Mensuelles",
+                                 'Blues', " mm", "precipitation", 550)}
+    for timescale in SPI_TIMESCALES:
+        values = spi[timescale].dropna().round(2)
+        if not values.empty:
+            maps[f"spi_{timescale}"] = _map(values.to_dict(), f"🏜️ SPI - {timescale}", 'BrBG', "", "spi", 550, "idw")
+    return {
+        'maps': maps,
+        'figures': {'decades': _figure(decade_rainfall_figure, rainfall_data)},
+        'deviations': rainfall_deviations(rainfall_data)
+    }
+
+
+def _seasonal(region):
+    outlook = load_product('seasonal')
+    monthly_rain = outlook['monthly_rain']
+    seasonal_precipitation_data = {reg: round(float(total), 0) for reg, total in monthly_rain.sum().items()}
+    return {
+        'maps': {'precipitation': _map(seasonal_precipitation_data, "📅 Prévisions Précipitations Saisonnières",
+                                       'RdYlBu_r', " mm", "precipitation", 500)},
+        'figures': {'monthly': _figure(
+            seasonal_timeline_figure, list(monthly_rain.index), monthly_rain[region].round(0).tolist(),
+            outlook['monthly_tmean'][region].round(1).tolist()
+        )}
+    }
+
+
+# Satisfaction (%) des trois premiers stades d'une région, None pour un stade pas encore atteint
+def stage_levels(region_row):
+    values = [region_row['Initial'], region_row['Développement'], region_row['Mi-saison']]
+    return [None if pd.isna(x) else int(x) for x in values]
+
+
+def _water_satisfaction(region):
+    wrsi_table = load_product('wrsi')
+    snapshot = {'maps': {}, 'figures': {}}
+    for crop in CROP_CALENDARS:
+        normal_sowing = wrsi_table.xs((crop, 'Semis normal'), level=('Culture', 'Scénario'))
+        water_satisfaction_data = {reg: float(value) for reg, value in normal_sowing['WRSI'].dropna().items()}
+        snapshot['maps'][f"wrsi_{crop}"] = _map(water_satisfaction_data, f"Satisfaction en Eau - {crop}",
+                                                'RdYlGn', "%", "water_satisfaction", 450)
+        snapshot['figures'][f"stages_{crop}"] = _figure(
+            stage_satisfaction_figure, WRSI_STAGE_LABELS, stage_levels(normal_sowing.loc[region]), crop, region
+        )
+    return snapshot
+
+
+def _soil_reserve(region):
+    region_reserve = load_product('soil')['reserve'][get_station_index().stations_in_region(region)].mean(axis=1)
+    return {
+        'maps': {'reserve': _map(load_product('soil_regional'), "Réserve en Eau du Sol",
+                                 'Blues', "%", "humidity", 450)},
+        'figures': {'reserve': _figure(soil_reserve_figure, region_reserve.index, region_reserve.to_numpy())}
+    }
+
+
+def _advice(region):
+    return {'maps': {}, 'figures': {}, 'calendar': load_product('calendar', region)}
+
+
+# Vues d'une page pour une région : cartes {'html', 'height'}, figures Plotly (dict) et tableaux
+SNAPSHOT_PAGES = {
+    'daily_weather': _daily_weather,
+    'rainfall': _rainfall,
+    'seasonal': _seasonal,
+    'water_satisfaction': _water_satisfaction,
+    'soil_reserve': _soil_reserve,
+    'advice': _advice
+}
+
+
+def build_snapshot(page, region):
+    return SNAPSHOT_PAGES[page](region)
+
+
+# Tâche exécutée dans un processus de rendu
+def snapshot_job(directory, page, region):
+    started = time.perf_counter()
+    files = write_artifact(directory, artifact_name(page, region), build_snapshot(page, region))
+    return artifact_name(page, region), files, round(time.perf_counter() - started, 3)
+
+
+@lru_cache(maxsize=None)
+def get_snapshot_store():
+    return ProductStore(SNAPSHOTS_DIR, version=SNAPSHOTS_VERSION)
+
+
+# Vue rendue à la volée, gardée tant que les produits dont elle dépend ne changent pas, et au plus une heure
+# (même tranche que les caches du panneau météo)
+@lru_cache(maxsize=64)
+def _live_snapshot(page, region, hour, products_run):
+    return build_snapshot(page, region)
+
+
+def load_snapshot(page, region):
+    """Vue pré-rendue de la dernière publication si elle correspond aux produits du jour, rendue à la volée sinon"""
+    day = datetime.now().strftime('%Y-%m-%d')
+    products = get_product_store().manifest(day)
+    products_run = products['run'] if products else None
+    snapshots = get_snapshot_store().manifest(day)
+    if snapshots is not None and snapshots.get('products') == products_run:
+        with METRICS.timer('data_fetch'):
+            value = get_snapshot_store().read(day, page, region)
+        if value is not None:
+            return value
+    with METRICS.timer('computation'):
+        return _live_snapshot(page, region, current_hour(), products_run)
+
+
+METRICS.register_cache('live_snapshots', _live_snapshot.cache_info)
+
+
+def build_snapshots(root=SNAPSHOTS_DIR, max_workers=PRODUCTS_WORKERS, regions=None):
+    """Rend toutes les pages × régions à partir des produits publiés du jour ; retourne le répertoire publié"""
+    store = ProductStore(root, version=SNAPSHOTS_VERSION)
+    day = datetime.now().strftime('%Y-%m-%d')
+    products = get_product_store().manifest(day)
+    run_id, directory = store.begin(day)
+    artifacts = {}
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = [
+                pool.submit(snapshot_job, directory, page, region)
+                for page in SNAPSHOT_PAGES for region in (regions or STATIONS_DATA)
+            ]
+            for future in as_completed(futures):
+                name, files, seconds = future.result()
+                artifacts[name] = {'files': files, 'seconds': seconds}
+    except BaseException:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+    return store.publish(day, run_id, directory, artifacts, products=products['run'] if products else None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rendu des vues AGROMET_RCI (page × région)")
+    parser.add_argument("--root", default=SNAPSHOTS_DIR, help="Répertoire des vues")
+    parser.add_argument("--workers", type=int, default=PRODUCTS_WORKERS, help="Nombre de processus de rendu")
+    parser.add_argument("--products", action="store_true", help="Recalculer d'abord les produits du jour")
+    args = parser.parse_args()
+    started = time.perf_counter()
+    if args.products:
+        print(f"Produits publiés dans {build_products(max_workers=args.workers)}")
+    directory = build_snapshots(args.root, args.workers)
+    print(f"Vues publiées dans {directory} ({time.perf_counter() - started:.1f} s)")
@@ -0,0 +1,153 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from agromet.stations import STATION_REGIONS
+
+# Propriétés hydriques par type de sol : humidités volumiques (m3/m3) et numéro de courbe SCS
+SOIL_TYPES = {
+    'sableux': {'theta_fc': 0.15, 'theta_wp': 0.06, 'curve_number': 65},
+    'sablo-limoneux': {'theta_fc': 0.22, 'theta_wp': 0.10, 'curve_number': 72},
+    'limoneux': {'theta_fc': 0.30, 'theta_wp': 0.15, 'curve_number': 78},
+    'argilo-limoneux': {'theta_fc': 0.36, 'theta_wp': 0.22, 'curve_number': 82},
+    'argileux': {'theta_fc': 0.42, 'theta_wp': 0.28, 'curve_number': 86}
+}
+DEFAULT_SOIL_TYPE = 'limoneux'
+
+# Profondeur racinaire (m) et fraction facilement utilisable p (FAO-56 tableau 22)
+DEFAULT_ROOT_DEPTH = 0.6
+DEFAULT_DEPLETION_FRACTION = 0.5
+
+
+def soil_parameters(stations, soil_types=None, root_depth=DEFAULT_ROOT_DEPTH,
+                    depletion_fraction=DEFAULT_DEPLETION_FRACTION):
+    """Réserve utile totale (TAW), facilement utilisable (RAW) et rétention S par station"""
+    soil_types = soil_types or {}
+    properties = [SOIL_TYPES[soil_types.get(s, DEFAULT_SOIL_TYPE)] for s in stations]
+    theta_fc = np.array([p['theta_fc'] for p in properties])
+    theta_wp = np.array([p['theta_wp'] for p in properties])
+    curve_number = np.array([p['curve_number'] for p in properties], dtype=float)
+    taw = 1000 * (theta_fc - theta_wp) * root_depth
+    raw = depletion_fraction * taw
+    retention = 25400 / curve_number - 254
+    return taw, raw, retention
+
+
+# Ruissellement journalier par la méthode du numéro de courbe SCS
+def scs_runoff(rain, retention):
+    initial_abstraction = 0.2 * retention
+    excess = np.maximum(rain - initial_abstraction, 0.0)
+    return np.where(excess > 0, excess ** 2 / (excess + retention), 0.0)
+
+
+class SoilWaterBalance:
+    """Bilan hydrique FAO-56 à un réservoir, vectorisé sur les stations et avancé jour par jour"""
+
+    def __init__(self, stations, soil_types=None, root_depth=DEFAULT_ROOT_DEPTH,
+                 depletion_fraction=DEFAULT_DEPLETION_FRACTION, initial_depletion=0.0):
+        self.stations = list(stations)
+        self.taw, self.raw, self.retention = soil_parameters(
+            self.stations, soil_types, root_depth, depletion_fraction
+        )
+        self.depletion = np.minimum(np.full(len(self.stations), float(initial_depletion)), self.taw)
+        self.last_date = None
+        self.history = []
+        self._lock = threading.Lock()
+
+    def reserve_percent(self, depletion=None):
+        depletion = self.depletion if depletion is None else depletion
+        return 100 * (self.taw - depletion) / self.taw
+
+    def step(self, rain, et0, kc=1.0, irrigation=0.0):
+        """Avance l'état d'un jour ; toutes les entrées sont des tableaux (stations,) ou des scalaires"""
+        rain = np.nan_to_num(np.asarray(rain, dtype=float))
+        et0 = np.nan_to_num(np.asarray(et0, dtype=float))
+        runoff = scs_runoff(rain, self.retention)
+        # Coefficient de stress hydrique Ks (FAO-56 équation 84)
+        ks = np.clip((self.taw - self.depletion) / ((self.taw - self.raw) + 1e-9), 0.0, 1.0)
+        ks = np.where(self.depletion <= self.raw, 1.0, ks)
+        etc = ks * kc * et0
+        depletion = self.depletion - (rain - runoff) - irrigation + etc
+        # L'eau au-delà de la capacité au champ percole (FAO-56 équation 88)
+        drainage = np.maximum(-depletion, 0.0)
+        self.depletion = np.clip(depletion, 0.0, self.taw)
+        return {
+            'reserve_pct': self.reserve_percent(),
+            'depletion': self.depletion.copy(),
+            'etc': etc,
+            'ks': ks,
+            'runoff': runoff,
+            'drainage': drainage
+        }
+
+    def run(self, dates, rain, et0, kc=1.0):
+        """Avance l'état sur une série (jours × stations) et retourne les sorties empilées"""
+        rain = np.asarray(rain, dtype=float)
+        et0 = np.asarray(et0, dtype=float)
+        kc = np.broadcast_to(np.asarray(kc, dtype=float), rain.shape)
+        outputs = [self.step(rain[day], et0[day], kc[day]) for day in range(len(dates))]
+        if not outputs:
+            return {}
+        return {name: np.vstack([o[name] for o in outputs]) for name in outputs[0]}
+
+    def advance(self, rain, et0, kc=1.0, through=None):
+        """Intègre uniquement les jours postérieurs au dernier jour déjà traité, jusqu'à `through` inclus.
+
+        rain et et0 sont des DataFrames jours × stations ; l'historique du taux de remplissage
+        est conservé pour les graphiques. Un jour intégré ne l'est plus jamais : `through` doit
+        être le dernier jour complet, pour que les corrections d'un jour en cours soient prises en compte.
+        """
+        with self._lock:
+            if self.last_date is not None:
+                rain = rain[rain.index > self.last_date]
+            if through is not None:
+                rain = rain[rain.index <= pd.Timestamp(through)]
+            if rain.empty:
+                return 0
+            rain = rain.reindex(columns=self.stations)
+            et0 = et0.reindex(index=rain.index, columns=self.stations)
+            outputs = self.run(rain.index, rain.to_numpy(), et0.to_numpy(), kc)
+            self.history.append(pd.DataFrame(outputs['reserve_pct'], index=rain.index, columns=self.stations))
+            self.last_date = rain.index[-1]
+            return len(rain.index)
+
+    def reserve_history(self):
+        with self._lock:
+            if not self.history:
+                return pd.DataFrame(columns=self.stations)
+            if len(self.history) > 1:
+                self.history = [pd.concat(self.history)]
+            return self.history[0]
+
+    def capacity(self, stations=None):
+        """Réserve utile totale (mm) par station"""
+        capacity = pd.Series(self.taw, index=self.stations)
+        return capacity if stations is None else capacity.reindex(stations)
+
+    def regional_reserve(self, decimals=0):
+        """Taux de remplissage moyen (%) des stations de chaque région, au dernier jour traité"""
+        reserve = pd.Series(self.reserve_percent(), index=self.stations)
+        by_region = reserve.groupby(reserve.index.map(STATION_REGIONS), sort=False).mean()
+        return {region: round(float(value), decimals) for region, value in by_region.items()}
+
+    def save(self, path):
+        with self._lock:
+            np.savez(
+                path,
+                stations=np.array(self.stations),
+                depletion=self.depletion,
+                last_date=np.array(str(self.last_date) if self.last_date is not None else '')
+            )
+
+    def load(self, path):
+        """Reprend l'état enregistré par save() pour les stations connues"""
+        saved = np.load(path)
+        with self._lock:
+            positions = {s: i for i, s in enumerate(self.stations)}
+            for station, depletion in zip(saved['stations'], saved['depletion']):
+                if station in positions:
+                    self.depletion[positions[station]] = min(depletion, self.taw[positions[station]])
+            last_date = str(saved['last_date'])
+            self.last_date = pd.Timestamp(last_date) if last_date else None
+        return self
@@ -0,0 +1,162 @@
+import math
+
+import numpy as np
+
+from agromet.resources import RESOURCES
+from agromet.stations import STATIONS_DATA
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+# Distance orthodromique (km) entre un point et des tableaux de coordonnées
+def haversine_km(lat, lon, lats, lons):
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class StationIndex:
+    """Index spatial des stations sur une grille régulière en latitude/longitude"""
+
+    def __init__(self, stations_data=STATIONS_DATA, cell_deg=0.5):
+        self.cell_deg = cell_deg
+        self.names = []
+        self.regions = []
+        lats, lons = [], []
+        for region, stations in stations_data.items():
+            for station, coords in stations.items():
+                self.names.append(station)
+                self.regions.append(region)
+                lats.append(coords['lat'])
+                lons.append(coords['lon'])
+        self.lats = np.asarray(lats, dtype=float)
+        self.lons = np.asarray(lons, dtype=float)
+        self.positions = {name: i for i, name in enumerate(self.names)}
+        self.region_members = {}
+        for i, region in enumerate(self.regions):
+            self.region_members.setdefault(region, []).append(i)
+
+        # Grille : cellule (ligne, colonne) -> indices des stations qu'elle contient
+        self.origin_lat = float(self.lats.min()) if len(self.lats) else 0.0
+        self.origin_lon = float(self.lons.min()) if len(self.lons) else 0.0
+        cells = {}
+        for i, cell in enumerate(zip(self._row(self.lats), self._col(self.lons))):
+            cells.setdefault(cell, []).append(i)
+        self.cells = {cell: np.asarray(members) for cell, members in cells.items()}
+        rows = [cell[0] for cell in self.cells] or [0]
+        cols = [cell[1] for cell in self.cells] or [0]
+        self.row_range = (min(rows), max(rows))
+        self.col_range = (min(cols), max(cols))
+        # Largeur minimale d'une cellule en km (le degré de longitude rétrécit avec la latitude)
+        max_abs_lat = float(np.abs(self.lats).max()) + cell_deg if len(self.lats) else 0.0
+        self.cell_km = cell_deg * KM_PER_DEGREE * math.cos(math.radians(min(max_abs_lat, 89.0)))
+
+        # Station représentative de chaque région : la plus proche du barycentre des stations
+        self.representatives = {}
+        for region, members in self.region_members.items():
+            members = np.asarray(members)
+            distances = haversine_km(self.lats[members].mean(), self.lons[members].mean(),
+                                     self.lats[members], self.lons[members])
+            self.representatives[region] = self.names[members[int(np.argmin(distances))]]
+
+    def _row(self, lat):
+        return np.floor((np.asarray(lat) - self.origin_lat) / self.cell_deg).astype(int)
+
+    def _col(self, lon):
+        return np.floor((np.asarray(lon) - self.origin_lon) / self.cell_deg).astype(int)
+
+    def _ring(self, row, col, radius):
+        if radius == 0:
+            cell = self.cells.get((row, col))
+            return [] if cell is None else [cell]
+        found = []
+        for r in range(row - radius, row + radius + 1):
+            for c in (col - radius, col + radius):
+                cell = self.cells.get((r, c))
+                if cell is not None:
+                    found.append(cell)
+        for c in range(col - radius + 1, col + radius):
+            for r in (row - radius, row + radius):
+                cell = self.cells.get((r, c))
+                if cell is not None:
+                    found.append(cell)
+        return found
+
+    def _result(self, indices, distances):
+        return [(self.names[i], self.regions[i], round(float(d), 3)) for i, d in zip(indices, distances)]
+
+    def __len__(self):
+        return len(self.names)
+
+    def nearest(self, lat, lon, k=1):
+        """Les k stations les plus proches : liste de (station, région, distance en km)"""
+        if not self.names:
+            return []
+        k = min(k, len(self.names))
+        row, col = int(self._row(lat)), int(self._col(lon))
+        # Anneaux à parcourir : du premier qui touche la grille jusqu'à celui qui la couvre entièrement
+        gaps = (row - self.row_range[1], self.row_range[0] - row, col - self.col_range[1], self.col_range[0] - col)
+        first = max(0, *gaps)
+        last = max(row - self.row_range[0], self.row_range[1] - row, col - self.col_range[0], self.col_range[1] - col)
+        candidates = []
+        for radius in range(first, max(first, last) + 1):
+            candidates.extend(self._ring(row, col, radius))
+            if not candidates:
+                continue
+            indices = np.concatenate(candidates)
+            if len(indices) < k:
+                continue
+            distances = haversine_km(lat, lon, self.lats[indices], self.lons[indices])
+            order = np.argsort(distances)[:k]
+            # Toute station d'un anneau non exploré est à plus de `radius` largeurs de cellule
+            if distances[order[-1]] <= radius * self.cell_km or radius >= last:
+                return self._result(indices[order], distances[order])
+        return []
+
+    def within_radius(self, lat, lon, radius_km):
+        """Stations situées à moins de radius_km, triées par distance"""
+        lat_span = radius_km / KM_PER_DEGREE
+        lon_span = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(min(abs(lat) + lat_span, 89.0))), 1e-6))
+        rows = range(int(self._row(lat - lat_span)), int(self._row(lat + lat_span)) + 1)
+        cols = range(int(self._col(lon - lon_span)), int(self._col(lon + lon_span)) + 1)
+        candidates = [self.cells[(r, c)] for r in rows for c in cols if (r, c) in self.cells]
+        if not candidates:
+            return []
+        indices = np.concatenate(candidates)
+        distances = haversine_km(lat, lon, self.lats[indices], self.lons[indices])
+        keep = distances <= radius_km
+        order = np.argsort(distances[keep])
+        return self._result(indices[keep][order], distances[keep][order])
+
+    def region_of(self, lat, lon):
+        """Région d'un point, par rattachement à la station la plus proche (partition de Voronoï)"""
+        nearest = self.nearest(lat, lon, k=1)
+        return nearest[0][1] if nearest else None
+
+    def regions_list(self):
+        return list(self.region_members.keys())
+
+    def stations_in_region(self, region):
+        return [self.names[i] for i in self.region_members.get(region, [])]
+
+    def representative_station(self, region):
+        return self.representatives.get(region)
+
+    def locate(self, name):
+        """(station, région) pour un nom de station, ou pour une région via sa station représentative"""
+        if name in self.positions:
+            return name, self.regions[self.positions[name]]
+        station = self.representatives.get(name)
+        return (station, name) if station is not None else (None, None)
+
+    def coordinates(self, station):
+        i = self.positions[station]
+        return float(self.lats[i]), float(self.lons[i])
+
+
+# Index construit une seule fois par processus à partir de STATIONS_DATA (tableaux en lecture seule)
+@RESOURCES.shared('station_index')
+def get_station_index():
+    return StationIndex(STATIONS_DATA)
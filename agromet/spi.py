@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+from scipy.special import gammainc, ndtri
+
+from agromet.climatology import DEKADS_PER_YEAR, take_stations
+
+# Échelles de temps de l'indice : nombre de décades cumulées
+SPI_TIMESCALES = {
+    'SPI décadaire': 1,
+    'SPI-1': 3,
+    'SPI-3': 9,
+    'SPI-6': 18
+}
+
+# Effectif minimal d'années pour ajuster une loi gamma, et bornes d'affichage de l'indice
+MIN_FIT_YEARS = 20
+MIN_WET_YEARS = 3
+SPI_LIMIT = 3.0
+
+# Classes de sécheresse et d'humidité (seuils inférieurs, McKee et al. 1993)
+SPI_CATEGORIES = [
+    (2.0, 'Extrêmement humide'),
+    (1.5, 'Très humide'),
+    (1.0, 'Modérément humide'),
+    (-1.0, 'Proche de la normale'),
+    (-1.5, 'Modérément sec'),
+    (-2.0, 'Sévèrement sec'),
+    (-np.inf, 'Extrêmement sec')
+]
+
+
+def spi_category(value):
+    if value is None or np.isnan(value):
+        return 'Indéterminé'
+    return next(label for threshold, label in SPI_CATEGORIES if value >= threshold)
+
+
+# Cumuls glissants sur `window` décades consécutives (NaN si une décade de la fenêtre manque)
+def rolling_accumulation(series, window):
+    missing = np.isnan(series)
+    totals = np.cumsum(np.where(missing, 0.0, series), axis=0)
+    gaps = np.cumsum(missing, axis=0)
+    totals = np.concatenate([np.zeros((1,) + series.shape[1:]), totals])
+    gaps = np.concatenate([np.zeros((1,) + series.shape[1:]), gaps])
+    accumulation = np.full(series.shape, np.nan)
+    accumulation[window - 1:] = np.where(
+        gaps[window:] - gaps[:-window] == 0, totals[window:] - totals[:-window], np.nan
+    )
+    return accumulation
+
+
+def fit_gamma(samples):
+    """Loi gamma mixte ajustée le long du premier axe : (alpha, beta, probabilité de cumul nul).
+
+    Les paramètres sont estimés par l'approximation du maximum de vraisemblance de Thom
+    sur les cumuls non nuls.
+    """
+    valid = ~np.isnan(samples)
+    wet = valid & (np.nan_to_num(samples) > 0)
+    n_valid = valid.sum(axis=0)
+    n_wet = wet.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(wet, samples, 0.0).sum(axis=0) / n_wet
+        mean_log = np.where(wet, np.log(np.where(wet, samples, 1.0)), 0.0).sum(axis=0) / n_wet
+        a = np.log(mean) - mean_log
+        alpha = (1 + np.sqrt(1 + 4 * a / 3)) / (4 * a)
+        beta = mean / alpha
+        zero = 1 - n_wet / n_valid
+    fitted = (n_valid >= MIN_FIT_YEARS) & (n_wet >= MIN_WET_YEARS) & (a > 0)
+    return np.where(fitted, alpha, np.nan), np.where(fitted, beta, np.nan), np.where(fitted, zero, np.nan)
+
+
+class SPICalibration:
+    """Paramètres gamma par échelle de temps × décade de l'année × station, ajustés une seule fois"""
+
+    def __init__(self, stations, reference_years, parameters):
+        self.stations = list(stations)
+        self.reference_years = tuple(reference_years)
+        self.parameters = parameters
+
+    @classmethod
+    def fit(cls, dekadal, stations, first_year, timescales=SPI_TIMESCALES):
+        """dekadal : cumuls (années × 36 décades × stations) depuis first_year - 1.
+
+        L'année précédant la période de référence ne sert qu'à compléter les premières fenêtres.
+        """
+        years = dekadal.shape[0]
+        series = dekadal.reshape(years * DEKADS_PER_YEAR, -1)
+        parameters = {}
+        for name, window in timescales.items():
+            accumulation = rolling_accumulation(series, window).reshape(dekadal.shape)[1:]
+            parameters[name] = np.stack(fit_gamma(accumulation))
+        return cls(stations, (first_year, first_year + years - 2), parameters)
+
+    def evaluate(self, timescale, dekad, accumulation):
+        """SPI des cumuls (stations,) se terminant à la décade donnée : évaluation de la seule fonction de répartition"""
+        alpha, beta, zero = self.parameters[timescale][:, dekad - 1]
+        accumulation = np.asarray(accumulation, dtype=float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # Un cumul nul est placé au milieu de la masse de probabilité en zéro
+            probability = np.where(
+                accumulation > 0,
+                zero + (1 - zero) * gammainc(alpha, np.maximum(accumulation, 0.0) / beta),
+                zero / 2
+            )
+            spi = np.clip(ndtri(probability), -SPI_LIMIT, SPI_LIMIT)
+        return np.where(np.isnan(accumulation), np.nan, spi)
+
+    def latest(self, dekadal, timescale):
+        """SPI de la fenêtre la plus récente d'une table de cumuls décadaires (année, décade) × stations"""
+        window = SPI_TIMESCALES[timescale]
+        dekadal = dekadal.sort_index().reindex(columns=self.stations)
+        if len(dekadal) < window:
+            return pd.Series(np.nan, index=self.stations)
+        accumulation = rolling_accumulation(dekadal.to_numpy()[-window:], window)[-1]
+        dekad = dekadal.index[-1][1]
+        return pd.Series(self.evaluate(timescale, dekad, accumulation), index=self.stations)
+
+    def save(self, path):
+        np.savez(
+            path,
+            stations=np.array(self.stations),
+            reference_years=np.array(self.reference_years),
+            timescales=np.array(list(self.parameters)),
+            **{f"parameters_{k}": self.parameters[name] for k, name in enumerate(self.parameters)}
+        )
+
+    @classmethod
+    def load(cls, path, stations=None):
+        """Relit un étalonnage ; avec stations, les paramètres sont réordonnés (NaN pour les stations absentes)"""
+        saved = np.load(path)
+        saved_stations = [str(s) for s in saved['stations']]
+        parameters = {str(name): saved[f"parameters_{k}"] for k, name in enumerate(saved['timescales'])}
+        if stations is not None and list(stations) != saved_stations:
+            parameters = {name: take_stations(values, saved_stations, stations) for name, values in parameters.items()}
+        else:
+            stations = saved_stations
+        return cls(stations, tuple(int(y) for y in saved['reference_years']), parameters)
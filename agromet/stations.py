@@ -0,0 +1,87 @@
+# Données étendues de stations par région avec coordonnées géographiques
+STATIONS_DATA = {
+    "N'ZI": {
+        "Dimbokro": {"lat": 6.65, "lon": -4.7},
+        "Bocanda": {"lat": 7.066667, "lon": -4.516667},
+        "Bongouanou": {"lat": 6.65, "lon": -4.2}
+    },
+    "GOH": {
+        "Gagnoa": {"lat": 6.133333, "lon": -5.95},
+        "Ouragahio": {"lat": 6.316667, "lon": -5.933333},
+        "Oumé": {"lat": 6.366667, "lon": -5.416667}
+    },
+    "LAGUNES": {
+        "Abidjan": {"lat": 5.359952, "lon": -4.008256},
+        "Grand-Bassam": {"lat": 5.200833, "lon": -3.738889},
+        "Dabou": {"lat": 5.325, "lon": -4.376667}
+    },
+    "SASSANDRA-MARAHOUÉ": {
+        "Daloa": {"lat": 6.877222, "lon": -6.450833},
+        "Bouaflé": {"lat": 6.988889, "lon": -5.745556},
+        "Zuénoula": {"lat": 7.426667, "lon": -6.053333}
+    },
+    "VALLÉE DU BANDAMA": {
+        "Bouaké": {"lat": 7.690556, "lon": -5.030556},
+        "Katiola": {"lat": 8.135833, "lon": -5.106944},
+        "Béoumi": {"lat": 7.673889, "lon": -5.580556}
+    },
+    "MONTAGNES": {
+        "Man": {"lat": 7.412222, "lon": -7.553056},
+        "Danané": {"lat": 7.264167, "lon": -8.151944},
+        "Biankouma": {"lat": 7.744722, "lon": -7.620833}
+    },
+    "SAVANES": {
+        "Korhogo": {"lat": 9.458056, "lon": -5.629167},
+        "Boundiali": {"lat": 9.520833, "lon": -6.489722},
+        "Ferkessédougou": {"lat": 9.590833, "lon": -5.195833}
+    },
+    "ZANZAN": {
+        "Bondoukou": {"lat": 8.040278, "lon": -2.798611},
+        "Tanda": {"lat": 7.803056, "lon": -3.168611},
+        "Bouna": {"lat": 9.273611, "lon": -2.996667}
+    },
+    "COMOÉ": {
+        "Abengourou": {"lat": 6.729167, "lon": -3.496944},
+        "Agnibilékrou": {"lat": 7.123611, "lon": -3.200833},
+        "Bettié": {"lat": 6.235, "lon": -3.173333}
+    },
+    "LACS": {
+        "Yamoussoukro": {"lat": 6.820556, "lon": -5.276667},
+        "Tiébissou": {"lat": 7.158333, "lon": -5.223056},
+        "Toumodi": {"lat": 6.557222, "lon": -5.018333}
+    }
+}
+
+# Type de sol dominant autour de chaque station (clés de soil_water.SOIL_TYPES) :
+# sols ferrugineux sableux au nord, ferrallitiques argileux en zone forestière, sables côtiers au sud
+STATION_SOIL_TYPES = {
+    "Dimbokro": "sablo-limoneux", "Bocanda": "sablo-limoneux", "Bongouanou": "limoneux",
+    "Gagnoa": "argilo-limoneux", "Ouragahio": "argilo-limoneux", "Oumé": "limoneux",
+    "Abidjan": "sableux", "Grand-Bassam": "sableux", "Dabou": "argilo-limoneux",
+    "Daloa": "argilo-limoneux", "Bouaflé": "limoneux", "Zuénoula": "limoneux",
+    "Bouaké": "sablo-limoneux", "Katiola": "sablo-limoneux", "Béoumi": "sablo-limoneux",
+    "Man": "argilo-limoneux", "Danané": "argileux", "Biankouma": "argilo-limoneux",
+    "Korhogo": "sableux", "Boundiali": "sablo-limoneux", "Ferkessédougou": "sableux",
+    "Bondoukou": "sablo-limoneux", "Tanda": "limoneux", "Bouna": "sableux",
+    "Abengourou": "argilo-limoneux", "Agnibilékrou": "limoneux", "Bettié": "argileux",
+    "Yamoussoukro": "limoneux", "Tiébissou": "sablo-limoneux", "Toumodi": "limoneux"
+}
+
+# Coordonnées des frontières de la Côte d'Ivoire pour créer un polygone
+COTE_DIVOIRE_BOUNDS = [
+    [10.740197, -2.494897],  # Nord-Est
+    [10.740197, -8.599302],  # Nord-Ouest  
+    [4.357067, -8.599302],   # Sud-Ouest
+    [4.357067, -2.494897],   # Sud-Est
+    [10.740197, -2.494897]   # Retour au point de départ
+]
+
+# Région de rattachement de chaque station
+STATION_REGIONS = {
+    station: region
+    for region, stations in STATIONS_DATA.items()
+    for station in stations
+}
+
+# Liste à plat de toutes les stations du réseau, dans l'ordre de STATIONS_DATA
+ALL_STATIONS = list(STATION_REGIONS.keys())
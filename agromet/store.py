@@ -0,0 +1,211 @@
+import os
+import argparse
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+
+from agromet.stations import STATION_REGIONS
+from agromet.weather import generate_weather_panel
+
+# Correspondance colonnes d'affichage -> colonnes stockées
+STORE_COLUMNS = {
+    'Température Min (°C)': 'tmin',
+    'Température Max (°C)': 'tmax',
+    'Humidité Min (%)': 'rh_min',
+    'Humidité Max (%)': 'rh_max',
+    'Précipitations (mm)': 'rain',
+    'Vitesse Vent (m/s)': 'wind_speed',
+    'Direction Vent': 'wind_dir',
+    'Insolation (h)': 'insolation'
+}
+DISPLAY_COLUMNS = {stored: display for display, stored in STORE_COLUMNS.items()}
+
+PARTITION_SCHEMA = pa.schema([
+    ('region', pa.string()),
+    ('station', pa.string()),
+    ('year', pa.int16())
+])
+
+OBSERVATION_SCHEMA = pa.schema([
+    ('date', pa.date32()),
+    ('tmin', pa.float32()),
+    ('tmax', pa.float32()),
+    ('rh_min', pa.float32()),
+    ('rh_max', pa.float32()),
+    ('rain', pa.float32()),
+    ('wind_speed', pa.float32()),
+    ('wind_dir', pa.string()),
+    ('insolation', pa.float32())
+]).append(PARTITION_SCHEMA.field('region')).append(PARTITION_SCHEMA.field('station')).append(PARTITION_SCHEMA.field('year'))
+
+# Un groupe de lignes par mois : une fenêtre de 7 jours ne décode qu'un ou deux groupes
+ROW_GROUP_DAYS = 31
+
+# Marqueur touché à chaque écriture (ignoré par la découverte des fichiers, préfixe '_')
+VERSION_FILE = "_version"
+
+
+class ObservationStore:
+    """Archive d'observations journalières en Parquet partitionné region/station/year"""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.filesystem = pafs.LocalFileSystem(use_mmap=True)
+        self._dataset = None
+        self._dataset_version = None
+
+    def version(self):
+        """Date (ns) de la dernière écriture, None si l'archive n'a pas de marqueur"""
+        try:
+            return os.stat(os.path.join(self.root, VERSION_FILE)).st_mtime_ns
+        except OSError:
+            return None
+
+    def has_data(self):
+        if not os.path.isdir(self.root):
+            return False
+        for _, _, files in os.walk(self.root):
+            if any(name.endswith('.parquet') for name in files):
+                return True
+        return False
+
+    def date_range(self):
+        """(Première, dernière) date de l'archive, None si elle est vide"""
+        if not self.has_data():
+            return None
+        dates = self.dataset().to_table(columns=['date']).column('date')
+        if len(dates) == 0:
+            return None
+        bounds = pc.min_max(dates)
+        return pd.Timestamp(bounds['min'].as_py()), pd.Timestamp(bounds['max'].as_py())
+
+    def dataset(self):
+        # La découverte des fichiers est réutilisée tant que le marqueur d'écriture n'a pas changé,
+        # y compris quand l'écriture vient d'un autre processus (ingestion en ligne de commande)
+        version = self.version()
+        if self._dataset is None or version != self._dataset_version:
+            self._dataset_version = version
+            self._dataset = ds.dataset(
+                self.root,
+                schema=OBSERVATION_SCHEMA,
+                format='parquet',
+                partitioning=ds.partitioning(PARTITION_SCHEMA, flavor='hive'),
+                filesystem=self.filesystem
+            )
+        return self._dataset
+
+    def write(self, panel):
+        """Fusionne un panneau (Station, Date) dans l'archive : les partitions station/année touchées sont
+        réécrites avec leurs lignes existantes, les dates déjà présentes prenant les nouvelles valeurs"""
+        frame = panel.reset_index().rename(columns={'Station': 'station', 'Date': 'date', 'Région': 'region'})
+        frame = frame.rename(columns=STORE_COLUMNS)
+        if 'region' not in frame.columns:
+            frame['region'] = frame['station'].map(STATION_REGIONS)
+        frame['region'] = frame['region'].astype(str)
+        frame['station'] = frame['station'].astype(str)
+        frame['year'] = frame['date'].dt.year.astype('int16')
+        frame['date'] = frame['date'].dt.date
+        frame['wind_dir'] = frame['wind_dir'].astype(str)
+        frame = frame[OBSERVATION_SCHEMA.names]
+
+        if self.has_data():
+            partitions = frame[['station', 'year']].drop_duplicates()
+            existing = self.dataset().to_table(filter=(
+                ds.field('station').isin(partitions['station'].unique().tolist())
+                & ds.field('year').isin(partitions['year'].unique().tolist())
+            )).to_pandas()
+            if len(existing):
+                existing['year'] = existing['year'].astype('int16')
+                existing = existing.merge(partitions, on=['station', 'year'])[OBSERVATION_SCHEMA.names]
+                frame = pd.concat([existing, frame], ignore_index=True)
+        frame = frame.drop_duplicates(['station', 'date'], keep='last')
+
+        table = pa.Table.from_pandas(
+            frame.sort_values(['station', 'date']),
+            schema=OBSERVATION_SCHEMA,
+            preserve_index=False
+        )
+        # Chaque partition écrite remplace entièrement l'ancienne : réécrire les mêmes dates ne duplique rien
+        ds.write_dataset(
+            table,
+            self.root,
+            format='parquet',
+            partitioning=ds.partitioning(PARTITION_SCHEMA, flavor='hive'),
+            basename_template="part-{i}.parquet",
+            existing_data_behavior='delete_matching',
+            max_rows_per_group=ROW_GROUP_DAYS,
+            min_rows_per_group=ROW_GROUP_DAYS,
+            filesystem=self.filesystem
+        )
+        with open(os.path.join(self.root, VERSION_FILE), 'w') as f:
+            f.write(datetime.now().isoformat())
+        self._dataset = None
+
+    def _filter(self, stations=None, start=None, end=None):
+        expression = None
+
+        def combine(condition):
+            return condition if expression is None else expression & condition
+
+        if stations is not None:
+            regions = sorted({STATION_REGIONS[s] for s in stations if s in STATION_REGIONS})
+            if regions:
+                expression = combine(ds.field('region').isin(regions))
+            expression = combine(ds.field('station').isin(list(stations)))
+        if start is not None:
+            start = pd.Timestamp(start)
+            expression = combine((ds.field('year') >= start.year) & (ds.field('date') >= start.date()))
+        if end is not None:
+            end = pd.Timestamp(end)
+            expression = combine((ds.field('year') <= end.year) & (ds.field('date') <= end.date()))
+        return expression
+
+    def read_table(self, stations=None, start=None, end=None, columns=None):
+        """Lecture Arrow avec élagage des partitions, des colonnes et des groupes de lignes"""
+        stored = list(dict.fromkeys(['station', 'date'] + [STORE_COLUMNS.get(c, c) for c in (columns or STORE_COLUMNS)] + ['region']))
+        if not self.has_data():
+            # Archive absente ou vide : table vide au même schéma
+            return OBSERVATION_SCHEMA.empty_table().select(stored)
+        return self.dataset().to_table(
+            columns=stored,
+            filter=self._filter(stations, start, end)
+        )
+
+    def read(self, stations=None, start=None, end=None, columns=None):
+        """Retourne un panneau indexé par (Station, Date) au format de generate_weather_panel"""
+        frame = self.read_table(stations, start, end, columns).to_pandas()
+        frame = frame.rename(columns={'station': 'Station', 'date': 'Date', 'region': 'Région'})
+        frame = frame.rename(columns=DISPLAY_COLUMNS)
+        frame['Date'] = pd.to_datetime(frame['Date'])
+        # Archives écrites avant la fusion des partitions : une date peut y figurer dans deux fichiers
+        frame = frame.drop_duplicates(['Station', 'Date'], keep='last')
+        for column in frame.columns:
+            if frame[column].dtype == 'float32':
+                frame[column] = frame[column].astype('float64').round(1)
+        frame['Région'] = frame['Région'].astype('category')
+        panel = frame.set_index(['Station', 'Date']).sort_index()
+        display_order = ['Région'] + [c for c in STORE_COLUMNS if c in panel.columns]
+        return panel[display_order]
+
+
+# Remplissage d'une archive avec les séries simulées (développement et démonstration)
+def seed_synthetic_archive(root, years=32, end=None):
+    store = ObservationStore(root)
+    end = pd.Timestamp(end if end is not None else datetime.now()).normalize()
+    store.write(generate_weather_panel(days=int(years * 365.25), end=end))
+    return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive d'observations AGROMET_RCI")
+    parser.add_argument("root", help="Répertoire de l'archive Parquet")
+    parser.add_argument("--seed-synthetic", action="store_true", help="Remplir l'archive avec des séries simulées")
+    parser.add_argument("--years", type=int, default=32)
+    args = parser.parse_args()
+    if args.seed_synthetic:
+        seed_synthetic_archive(args.root, years=args.years)
+    print(f"{ObservationStore(args.root).dataset().count_rows()} observations dans {args.root}")
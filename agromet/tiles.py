@@ -0,0 +1,398 @@
+import os
+import re
+import math
+import time
+import zlib
+import sqlite3
+import argparse
+import mimetypes
+import posixpath
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from agromet.stations import COTE_DIVOIRE_BOUNDS
+
+# Fonds de carte : nom affiché, URL amont par défaut et attribution. L'URL amont se remplace par
+# AGROMET_TILES_UPSTREAM_<FOND> (serveur propre, fournisseur commercial, clé d'API dans l'URL).
+# La politique d'usage d'OpenStreetMap interdit le pré-chargement en masse depuis tile.openstreetmap.org :
+# le fond 'osm' n'est pré-chargé que depuis une URL amont configurée explicitement.
+TILE_LAYERS = {
+    'osm': {
+        'name': 'OpenStreetMap',
+        'url': 'https://tile.openstreetmap.org/{z}/{x}/{y}.png',
+        'seed_default': False,
+        'attribution': '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
+    },
+    'positron': {
+        'name': 'CartoDB Positron',
+        'url': 'https://a.basemaps.cartocdn.com/light_all/{z}/{x}/{y}.png',
+        'seed_default': True,
+        'attribution': '&copy; OpenStreetMap contributors &copy; <a href="https://carto.com/attributions">CARTO</a>'
+    },
+    'dark': {
+        'name': 'CartoDB Dark',
+        'url': 'https://a.basemaps.cartocdn.com/dark_all/{z}/{x}/{y}.png',
+        'seed_default': True,
+        'attribution': '&copy; OpenStreetMap contributors &copy; <a href="https://carto.com/attributions">CARTO</a>'
+    }
+}
+
+
+def upstream_url(layer):
+    """URL amont d'un fond, pour l'affichage en ligne"""
+    return os.environ.get(f"AGROMET_TILES_UPSTREAM_{layer.upper()}") or TILE_LAYERS[layer]['url']
+
+
+def seed_url(layer):
+    """URL amont autorisée pour le pré-chargement, None si le fond ne peut pas être pré-chargé"""
+    configured = os.environ.get(f"AGROMET_TILES_UPSTREAM_{layer.upper()}")
+    return configured or (TILE_LAYERS[layer]['url'] if TILE_LAYERS[layer]['seed_default'] else None)
+
+
+# Fond affiché à l'ouverture des cartes
+DEFAULT_TILE_LAYER = 'positron'
+
+# Niveaux de zoom pré-chargés (au-delà, Leaflet agrandit les tuiles du niveau le plus proche)
+TILE_MIN_ZOOM = 5
+TILE_MAX_ZOOM = 10
+
+# Archives MBTiles (un fichier par fond de carte)
+TILES_DIR = os.environ.get(
+    "AGROMET_TILES_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "tiles")
+)
+
+# Serveur de tuiles local : port (0 = désactivé), adresse d'écoute et URL vue par les navigateurs.
+# Il n'écoute que la machine locale par défaut ; pour un réseau local, AGROMET_TILES_HOST=0.0.0.0
+# et AGROMET_TILES_URL avec l'adresse de l'hôte de l'application.
+TILES_PORT = int(os.environ.get("AGROMET_TILES_PORT", "0"))
+TILES_HOST = os.environ.get("AGROMET_TILES_HOST", "127.0.0.1")
+TILES_URL = os.environ.get("AGROMET_TILES_URL", f"http://localhost:{TILES_PORT}/tiles" if TILES_PORT else "")
+
+# Les tuiles d'une archive ne changent pas : les navigateurs les gardent un an sans revalidation
+TILE_MAX_AGE = 365 * 24 * 3600
+
+# Copies locales des scripts et feuilles de style des cartes (Leaflet, plugins, polices d'icônes),
+# rangées par hôte et chemin d'origine pour que les références relatives des CSS restent valides
+ASSETS_DIR = os.environ.get("AGROMET_ASSETS_DIR", os.path.join(TILES_DIR, "assets"))
+ASSETS_URL = os.environ.get(
+    "AGROMET_ASSETS_URL", TILES_URL[:-len("/tiles")] + "/assets" if TILES_URL.endswith("/tiles") else ""
+)
+
+# Niveaux de détail des limites de régions servis à la demande (les cartes n'insèrent que celui du zoom initial)
+GEOMETRY_URL = os.environ.get(
+    "AGROMET_GEOMETRY_URL", TILES_URL[:-len("/tiles")] + "/geometry" if TILES_URL.endswith("/tiles") else ""
+)
+
+# Téléchargements simultanés lors du pré-chargement (politique d'usage des serveurs de tuiles)
+SEED_WORKERS = 4
+USER_AGENT = "AGROMET_RCI-tile-seeder/1.0"
+
+
+# (sud, ouest), (nord, est) d'un polygone [lat, lon]
+def tile_bounds(polygon=COTE_DIVOIRE_BOUNDS):
+    lats = [point[0] for point in polygon]
+    lons = [point[1] for point in polygon]
+    return (min(lats), min(lons)), (max(lats), max(lons))
+
+
+# Tuile (x, y) du schéma XYZ contenant un point
+def tile_xy(lat, lon, zoom):
+    n = 2 ** zoom
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tiles_in_bounds(polygon=COTE_DIVOIRE_BOUNDS, min_zoom=TILE_MIN_ZOOM, max_zoom=TILE_MAX_ZOOM):
+    """(zoom, x, y) de toutes les tuiles couvrant l'emprise, du zoom le plus faible au plus fort"""
+    (south, west), (north, east) = tile_bounds(polygon)
+    for zoom in range(min_zoom, max_zoom + 1):
+        x0, y0 = tile_xy(north, west, zoom)
+        x1, y1 = tile_xy(south, east, zoom)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                yield zoom, x, y
+
+
+class MBTiles:
+    """Archive de tuiles au format MBTiles : table SQLite `tiles` en lignes TMS (y inversé) et table `metadata`"""
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.executescript("""
+                CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE IF NOT EXISTS tiles (
+                    zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB,
+                    PRIMARY KEY (zoom_level, tile_column, tile_row)
+                );
+            """)
+        return self._connection
+
+    def get(self, zoom, x, y):
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                (zoom, x, 2 ** zoom - 1 - y)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put_many(self, tiles):
+        """tiles : (zoom, x, y, données PNG) dans le schéma XYZ"""
+        with self._lock:
+            connection = self._connect()
+            connection.executemany(
+                "INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?)",
+                [(zoom, x, 2 ** zoom - 1 - y, sqlite3.Binary(data)) for zoom, x, y, data in tiles]
+            )
+            connection.commit()
+
+    def existing(self):
+        with self._lock:
+            rows = self._connect().execute("SELECT zoom_level, tile_column, tile_row FROM tiles").fetchall()
+        return {(zoom, x, 2 ** zoom - 1 - row) for zoom, x, row in rows}
+
+    def set_metadata(self, **values):
+        with self._lock:
+            connection = self._connect()
+            connection.executemany("INSERT OR REPLACE INTO metadata VALUES (?, ?)", [(k, str(v)) for k, v in values.items()])
+            connection.commit()
+
+    def metadata(self):
+        with self._lock:
+            return dict(self._connect().execute("SELECT name, value FROM metadata").fetchall())
+
+
+def tile_store_path(layer, root=TILES_DIR):
+    return os.path.join(root, f"{layer}.mbtiles")
+
+
+# Fonds dont l'archive MBTiles existe, dans l'ordre de TILE_LAYERS
+def seeded_layers(root=TILES_DIR):
+    return [layer for layer in TILE_LAYERS if os.path.exists(tile_store_path(layer, root))]
+
+
+def fetch_tile(url, timeout=30):
+    request = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.read()
+
+
+def seed_layer(layer, root=TILES_DIR, min_zoom=TILE_MIN_ZOOM, max_zoom=TILE_MAX_ZOOM, workers=SEED_WORKERS, fetch=fetch_tile):
+    """Télécharge les tuiles manquantes de l'emprise nationale ; retourne (téléchargées, échecs, total)"""
+    source = TILE_LAYERS[layer]
+    url = seed_url(layer)
+    if url is None:
+        raise ValueError(
+            f"Pas d'URL amont autorisée pour pré-charger '{layer}' : définir AGROMET_TILES_UPSTREAM_{layer.upper()}"
+        )
+    store = MBTiles(tile_store_path(layer, root))
+    (south, west), (north, east) = tile_bounds()
+    store.set_metadata(
+        name=source['name'], format='png', type='baselayer', attribution=source['attribution'],
+        bounds=f"{west},{south},{east},{north}", minzoom=min_zoom, maxzoom=max_zoom
+    )
+    wanted = list(tiles_in_bounds(min_zoom=min_zoom, max_zoom=max_zoom))
+    existing = store.existing()
+    missing = [tile for tile in wanted if tile not in existing]
+
+    def download(tile):
+        zoom, x, y = tile
+        try:
+            return zoom, x, y, fetch(url.format(z=zoom, x=x, y=y))
+        except OSError:
+            return None
+
+    # Écriture par lots : une interruption ne perd que le lot en cours, le pré-chargement reprend où il s'est arrêté
+    batch, downloaded = [], 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(download, missing):
+            if result is not None:
+                batch.append(result)
+            if len(batch) >= 100:
+                store.put_many(batch)
+                downloaded += len(batch)
+                batch = []
+    store.put_many(batch)
+    downloaded += len(batch)
+    return downloaded, len(missing) - downloaded, len(wanted)
+
+
+# Références url(...) d'une feuille de style
+CSS_URL = re.compile(r"""url\(\s*['"]?([^'")]+?)['"]?\s*\)""")
+
+
+# Chemin local (relatif à ASSETS_DIR) d'une ressource distante : hôte puis chemin, sans paramètres
+def asset_path(url):
+    parts = urlsplit(url)
+    return posixpath.normpath(f"{parts.netloc}{parts.path}").lstrip('/')
+
+
+def mirror_assets(urls, root=ASSETS_DIR, fetch=fetch_tile):
+    """Copie locale des ressources et de tout ce que leurs CSS référencent (polices, images) ;
+    retourne (copiées, échecs)"""
+    pending, seen, copied, failed = list(urls), set(), 0, []
+    while pending:
+        url = pending.pop()
+        path = asset_path(url)
+        if path in seen or path.startswith('..'):
+            continue
+        seen.add(path)
+        target = os.path.join(root, *path.split('/'))
+        if os.path.exists(target):
+            with open(target, 'rb') as f:
+                data = f.read()
+        else:
+            try:
+                data = fetch(url)
+            except OSError:
+                failed.append(url)
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(data)
+            copied += 1
+        if path.endswith('.css'):
+            for reference in CSS_URL.findall(data.decode('utf-8', 'replace')):
+                if not reference.startswith('data:'):
+                    pending.append(urljoin(url, reference).split('#')[0].split('?')[0])
+    return copied, failed
+
+
+class TileHandler(BaseHTTPRequestHandler):
+    """/tiles/<fond>/<z>/<x>/<y>.png lus dans les archives MBTiles, /assets/<hôte>/<chemin> des copies
+    locales des scripts des cartes et /geometry/<zoom>.json des TopoJSON des régions, avec cache navigateur
+    longue durée (les cartes versionnent l'URL des TopoJSON par leur empreinte)"""
+
+    stores = None
+    assets_root = ASSETS_DIR
+    server_version = "AGROMET_RCI"
+
+    def do_GET(self):
+        self.respond(send_body=True)
+
+    def do_HEAD(self):
+        self.respond(send_body=False)
+
+    def respond(self, send_body):
+        parts = urlsplit(self.path).path.strip('/').split('/')
+        if parts[0] == 'assets':
+            data, content_type = self.asset('/'.join(parts[1:]))
+        elif parts[0] == 'geometry':
+            data, content_type = self.geometry(parts[1:]), 'application/json'
+        else:
+            data, content_type = self.lookup(parts), 'image/png'
+        if data is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.send_header('Cache-Control', 'public, max-age=3600')
+            self.end_headers()
+            return
+        etag = f'"{zlib.crc32(data):08x}-{len(data)}"'
+        not_modified = self.headers.get('If-None-Match') == etag
+        self.send_response(304 if not_modified else 200)
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', f"public, max-age={TILE_MAX_AGE}, immutable")
+        self.send_header('Access-Control-Allow-Origin', '*')
+        if not not_modified:
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if send_body and not not_modified:
+            self.wfile.write(data)
+
+    def lookup(self, parts):
+        if len(parts) != 5 or parts[0] != 'tiles' or parts[1] not in self.stores or not parts[4].endswith('.png'):
+            return None
+        try:
+            zoom, x, y = int(parts[2]), int(parts[3]), int(parts[4][:-4])
+        except ValueError:
+            return None
+        return self.stores[parts[1]].get(zoom, x, y)
+
+    def asset(self, path):
+        path = posixpath.normpath(path)
+        if path.startswith(('..', '/')) or path == '.':
+            return None, None
+        target = os.path.join(self.assets_root, *path.split('/'))
+        if not os.path.isfile(target):
+            return None, None
+        with open(target, 'rb') as f:
+            data = f.read()
+        return data, mimetypes.guess_type(target)[0] or 'application/octet-stream'
+
+    def geometry(self, parts):
+        from agromet.geometry import GEOMETRY_ZOOMS, region_topojson
+        if len(parts) != 1 or parts[0] not in {f"{zoom}.json" for zoom in GEOMETRY_ZOOMS}:
+            return None
+        return region_topojson(int(parts[0][:-len(".json")])).encode('utf-8')
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_tile_server(host=TILES_HOST, port=8503, root=TILES_DIR, assets_root=ASSETS_DIR):
+    stores = {layer: MBTiles(tile_store_path(layer, root)) for layer in seeded_layers(root)}
+    handler = type('Handler', (TileHandler,), {'stores': stores, 'assets_root': assets_root})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_tile_server(port=TILES_PORT, host=TILES_HOST):
+    """Serveur de tuiles dans un thread du processus de l'application (une seule fois)"""
+    global _server
+    with _server_lock:
+        if _server is None and port:
+            _server = make_tile_server(host, port)
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+        return _server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tuiles hors ligne des fonds de carte AGROMET_RCI")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    seed = subcommands.add_parser("seed", help="Pré-charger l'emprise nationale dans les archives MBTiles")
+    seed.add_argument("--layers", nargs="+", default=[layer for layer in TILE_LAYERS if seed_url(layer)],
+                      choices=list(TILE_LAYERS))
+    seed.add_argument("--min-zoom", type=int, default=TILE_MIN_ZOOM)
+    seed.add_argument("--max-zoom", type=int, default=TILE_MAX_ZOOM)
+    seed.add_argument("--root", default=TILES_DIR)
+    assets = subcommands.add_parser("assets", help="Copier localement les scripts et styles des cartes")
+    assets.add_argument("--root", default=ASSETS_DIR)
+    serve = subcommands.add_parser("serve", help="Servir /tiles/<fond>/<z>/<x>/<y>.png, /assets/ et /geometry/")
+    serve.add_argument("--host", default=TILES_HOST)
+    serve.add_argument("--port", type=int, default=TILES_PORT or 8503)
+    serve.add_argument("--root", default=TILES_DIR)
+    serve.add_argument("--assets-root", default=ASSETS_DIR)
+    args = parser.parse_args()
+    if args.command == "seed":
+        for layer in args.layers:
+            started = time.perf_counter()
+            try:
+                downloaded, failed, total = seed_layer(layer, args.root, args.min_zoom, args.max_zoom)
+            except ValueError as error:
+                print(f"{layer}: {error}")
+                continue
+            print(f"{layer}: {downloaded} tuiles téléchargées, {failed} échecs, {total} dans l'emprise "
+                  f"({time.perf_counter() - started:.1f} s)")
+    elif args.command == "assets":
+        from agromet.maps import map_asset_urls
+        copied, failed = mirror_assets(map_asset_urls(), args.root)
+        print(f"{copied} ressources copiées dans {args.root}" + (f", {len(failed)} échecs : {' '.join(failed)}" if failed else ""))
+    else:
+        server = make_tile_server(args.host, args.port, args.root, args.assets_root)
+        print(f"Tuiles disponibles sur http://{args.host}:{args.port}/tiles ({', '.join(server.RequestHandlerClass.stores)})")
+        server.serve_forever()
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+from agromet.weather import WEATHER_COLUMNS
+
+# Paramètres numériques consultables sur de longues périodes
+SERIES_COLUMNS = [column for column in WEATHER_COLUMNS if column != 'Direction Vent']
+
+# Profondeur de l'historique consultable (années)
+SERIES_YEARS = 30
+
+# Largeurs d'affichage proposées (px) : une courbe garde au plus un point par pixel
+PLOT_WIDTHS = [600, 900, 1200, 1800, 2400]
+DEFAULT_PLOT_WIDTH = 1200
+
+# Au-delà de ce nombre de points dans la figure, les courbes sont rendues en WebGL (Scattergl)
+WEBGL_THRESHOLD = 2000
+
+
+def lttb(x, y, threshold):
+    """Indices retenus par Largest-Triangle-Three-Buckets (premier et dernier points toujours inclus).
+
+    Les points intermédiaires sont répartis en threshold - 2 seaux ; dans chaque seau on garde le
+    point formant le plus grand triangle avec le point retenu précédemment et la moyenne du seau suivant.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x, next_y = x[end:edges[i + 2]].mean(), y[end:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[n - 1], y[n - 1]
+        area = np.abs((x[a] - next_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def downsample_series(series, threshold):
+    """Série (index de dates) réduite à au plus `threshold` points ; les valeurs manquantes sont ignorées"""
+    series = series.dropna()
+    if len(series) <= threshold:
+        return series
+    x = series.index.to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    return series.iloc[lttb(x, series.to_numpy(), threshold)]
+
+
+def downsample_frame(frame, threshold, start=None, end=None):
+    """Colonnes d'un tableau jours × stations sur [start, end], chacune réduite à `threshold` points"""
+    window = frame.loc[start:end]
+    return {station: downsample_series(window[station], threshold) for station in window.columns}
+
+
+# Plage (début, fin) d'une sélection rectangulaire Plotly, None si aucune
+def selected_range(event):
+    boxes = (event or {}).get('selection', {}).get('box', [])
+    if not boxes:
+        return None
+    # Axe de dates : chaînes ISO ou millisecondes depuis l'époque selon la version de Plotly
+    x0, x1 = sorted(
+        (pd.Timestamp(value, unit='ms') if isinstance(value, (int, float)) else pd.Timestamp(value)).normalize()
+        for value in boxes[0]['x'][:2]
+    )
+    return (x0, x1) if x1 > x0 else None
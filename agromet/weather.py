@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+from agromet.stations import ALL_STATIONS, STATION_REGIONS, STATIONS_DATA
+
+# Bornes de simulation de chaque paramètre journalier (dans l'ordre d'affichage)
+WEATHER_RANGES = {
+    'Température Min (°C)': (20, 25),
+    'Température Max (°C)': (28, 35),
+    'Humidité Min (%)': (45, 60),
+    'Humidité Max (%)': (75, 95),
+    'Vitesse Vent (m/s)': (1, 8),
+    'Insolation (h)': (4, 12)
+}
+
+WIND_DIRECTIONS = ['N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW']
+
+# Ordre des colonnes d'un panneau météo
+WEATHER_COLUMNS = [
+    'Température Min (°C)', 'Température Max (°C)', 'Humidité Min (%)', 'Humidité Max (%)',
+    'Précipitations (mm)', 'Vitesse Vent (m/s)', 'Direction Vent', 'Insolation (h)'
+]
+
+# Pluie simulée : cumul moyen d'un jour de pluie (mm) et probabilité de pluie hors saison
+WET_DAY_MEAN_RAIN = 14.0
+DRY_SEASON_WET_PROBABILITY = 0.05
+
+
+# Probabilité journalière de pluie : régime bimodal au sud, unimodal au nord
+def wet_day_probability(lat, day_of_year):
+    lat = np.asarray(lat, dtype=float)
+    doy = np.asarray(day_of_year, dtype=float)
+    south = np.maximum(np.exp(-((doy - 160) / 35) ** 2), 0.7 * np.exp(-((doy - 290) / 25) ** 2))
+    north = np.exp(-((doy - 225) / 50) ** 2)
+    northness = np.clip((lat - 6.0) / 3.0, 0.0, 1.0)
+    seasonal = (1 - northness) * south + northness * north
+    return DRY_SEASON_WET_PROBABILITY + 0.55 * seasonal
+
+# Tirages des paramètres journaliers (stations × jours) avec un générateur donné
+def simulate_weather(rng, lats, day_of_year):
+    lats = np.asarray(lats, dtype=float)
+    day_of_year = np.asarray(day_of_year)
+    shape = (len(lats), len(day_of_year))
+    columns = {}
+    for name, (low, high) in WEATHER_RANGES.items():
+        columns[name] = np.round(rng.uniform(low, high, shape), 1)
+        if name == 'Vitesse Vent (m/s)':
+            columns['Direction Vent'] = rng.integers(0, len(WIND_DIRECTIONS), shape)
+
+    # Occurrence saisonnière puis cumul exponentiel pour les jours de pluie
+    wet = rng.random(shape) < wet_day_probability(lats[:, None], day_of_year[None, :])
+    amounts = np.minimum(rng.exponential(WET_DAY_MEAN_RAIN, shape), 120.0)
+    columns['Précipitations (mm)'] = np.round(np.where(wet, amounts, 0.0), 1)
+    return columns
+
+def station_latitudes(stations):
+    regions = [STATION_REGIONS.get(station, '') for station in stations]
+    return np.array([STATIONS_DATA.get(r, {}).get(s, {}).get('lat', 7.5) for r, s in zip(regions, stations)])
+
+# Assemblage d'un panneau (Station, Date) à partir de tableaux stations × jours
+def weather_panel_frame(stations, dates, columns):
+    regions = [STATION_REGIONS.get(station, '') for station in stations]
+    values = {name: np.asarray(array).ravel() for name, array in columns.items()}
+    values['Direction Vent'] = pd.Categorical.from_codes(values['Direction Vent'], categories=WIND_DIRECTIONS)
+    index = pd.MultiIndex.from_product([stations, dates], names=['Station', 'Date'])
+    panel = pd.DataFrame(values, index=index)[WEATHER_COLUMNS]
+    panel.insert(0, 'Région', pd.Categorical(np.repeat(regions, len(dates)), categories=list(dict.fromkeys(regions))))
+    return panel
+
+# Génération vectorisée d'un panneau stations × jours
+def generate_weather_panel(stations=None, days=7, end=None, seed=42):
+    """Simule les paramètres journaliers de plusieurs stations en un seul lot de tirages.
+
+    Retourne un DataFrame indexé par (Station, Date), trié, avec une colonne 'Région'.
+    """
+    stations = list(ALL_STATIONS if stations is None else stations)
+    end_date = pd.Timestamp(end if end is not None else datetime.now()).normalize()
+    dates = pd.date_range(end=end_date, periods=days, freq='D')
+    columns = simulate_weather(np.random.default_rng(seed), station_latitudes(stations), dates.dayofyear.to_numpy())
+    return weather_panel_frame(stations, dates, columns)
+
+# Extraction du tableau journalier d'une station (format d'affichage historique)
+def weather_table(panel, station, days=None):
+    frame = panel.xs(station, level='Station')
+    if days is not None:
+        frame = frame.tail(days)
+    frame = frame.drop(columns='Région').reset_index()
+    frame['Date'] = frame['Date'].dt.strftime('%Y-%m-%d')
+    frame.insert(1, 'Station', station)
+    return frame
+
+# Valeur régionale d'un paramètre pour un jour donné (dernier jour par défaut)
+def regional_daily_values(panel, column, date=None, how='mean', decimals=1):
+    dates = panel.index.get_level_values('Date')
+    day = dates.max() if date is None else pd.Timestamp(date).normalize()
+    day_values = panel.loc[dates == day, ['Région', column]]
+    aggregated = day_values.groupby('Région', observed=True)[column].agg(how)
+    return {region: round(float(value), decimals) for region, value in aggregated.items()}
+
+# Cumul régional d'un paramètre sur les derniers jours du panneau (moyenne des stations)
+def regional_period_totals(panel, column, days=30, decimals=1):
+    dates = panel.index.get_level_values('Date')
+    window = panel.loc[dates > dates.max() - pd.Timedelta(days=days), ['Région', column]]
+    station_totals = window.groupby(level='Station', sort=False).agg({'Région': 'first', column: 'sum'})
+    aggregated = station_totals.groupby('Région', observed=True)[column].mean()
+    return {region: round(float(value), decimals) for region, value in aggregated.items()}
+
+MONTH_LABELS = ['Jan', 'Fév', 'Mar', 'Avr', 'Mai', 'Jun', 'Jul', 'Aoû', 'Sep', 'Oct', 'Nov', 'Déc']
+DECADE_LABELS = ['Décade 1', 'Décade 2', 'Décade 3']
+
+# Décade d'une date : (année, mois, 1 | 2 | 3) avec les bornes 1-10 / 11-20 / 21-fin
+def decade_of(date):
+    date = pd.Timestamp(date)
+    return date.year, date.month, min((date.day - 1) // 10, 2) + 1
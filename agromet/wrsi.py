@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+
+from agromet.soil_water import SoilWaterBalance
+from agromet.stations import STATION_REGIONS
+
+# Calendriers culturaux : durées des stades FAO-56 (jours), courbe de Kc, enracinement (m) et fraction p
+CROP_CALENDARS = {
+    'Riz': {'stages': (30, 30, 60, 30), 'kc': (1.05, 1.20, 0.75), 'root_depth': 0.5, 'p': 0.20},
+    'Maïs': {'stages': (20, 35, 40, 30), 'kc': (0.30, 1.20, 0.60), 'root_depth': 1.0, 'p': 0.55},
+    'Igname': {'stages': (60, 60, 90, 40), 'kc': (0.50, 1.10, 0.70), 'root_depth': 0.6, 'p': 0.50},
+    'Légumineuses': {'stages': (25, 35, 45, 25), 'kc': (0.40, 1.15, 0.60), 'root_depth': 0.5, 'p': 0.50}
+}
+
+STAGE_NAMES = ['Initial', 'Développement', 'Mi-saison', 'Arrière-saison']
+
+# Scénarios de semis : (mois, jour) du semis représentatif et libellé de la fenêtre
+SOWING_SCENARIOS = {
+    'Semis précoce': ((5, 22), '15-30 Mai'),
+    'Semis normal': ((6, 8), '1-15 Juin'),
+    'Semis tardif': ((6, 23), '16-30 Juin')
+}
+
+# Kc d'un sol nu avant le semis (évaporation seule)
+BARE_SOIL_KC = 0.3
+
+# Travaux associés à chaque stade : -1 avant le semis, 0 à 3 stades FAO-56, 4 après la fin du cycle
+STAGE_ACTIVITIES = {
+    -1: 'Préparation des parcelles',
+    0: 'Semis et levée',
+    1: 'Sarclage et fertilisation',
+    2: 'Suivi hydrique de la floraison',
+    3: 'Préparation de la récolte',
+    4: 'Récolte et séchage'
+}
+
+
+# Courbe journalière de Kc (FAO-56 figure 25) indexée par le nombre de jours depuis le semis
+def kc_curve(calendar):
+    l_ini, l_dev, l_mid, l_late = calendar['stages']
+    kc_ini, kc_mid, kc_end = calendar['kc']
+    knots_x = [0, l_ini, l_ini + l_dev, l_ini + l_dev + l_mid, l_ini + l_dev + l_mid + l_late]
+    knots_y = [kc_ini, kc_ini, kc_mid, kc_mid, kc_end]
+    return np.interp(np.arange(sum(calendar['stages'])), knots_x, knots_y)
+
+
+def stage_index(calendar):
+    return np.repeat(np.arange(len(calendar['stages'])), calendar['stages'])
+
+
+# Stade atteint après `elapsed` jours depuis le semis (-1 avant le semis, 4 après la fin du cycle)
+def crop_stage(calendar, elapsed):
+    elapsed = np.asarray(elapsed)
+    return np.where(elapsed < 0, -1, np.searchsorted(np.cumsum(calendar['stages']), elapsed, side='right'))
+
+
+def season_year(today, scenarios=SOWING_SCENARIOS):
+    """Année de la campagne en cours : la précédente tant que le premier semis n'est pas atteint"""
+    today = pd.Timestamp(today)
+    first_sowing = min(pd.Timestamp(today.year, m, d) for (m, d), _ in scenarios.values())
+    return today.year if today >= first_sowing else today.year - 1
+
+
+# Moyenne régionale d'un tableau jours × stations
+def regional_matrix(matrix):
+    return matrix.T.groupby(matrix.columns.map(STATION_REGIONS), sort=False).mean().T
+
+
+def compute_wrsi(rain, et0, until=None, crops=None, scenarios=None, soil_type=None):
+    """Indice de satisfaction des besoins en eau pour toutes les régions × cultures × semis en un lot.
+
+    rain et et0 sont des DataFrames jours × régions. Le bilan hydrique de chaque scénario est
+    avancé en parallèle ; l'indice d'un stade est 100 × ΣETR / ΣETM sur les jours écoulés du stade.
+    """
+    crops = crops or list(CROP_CALENDARS)
+    scenarios = scenarios or SOWING_SCENARIOS
+    if rain.empty:
+        # Aucun jour observé : tableau vide aux colonnes du résultat
+        columns = ['Région', 'Culture', 'Scénario', 'Semis', 'Jours écoulés'] + STAGE_NAMES + ['WRSI']
+        return pd.DataFrame(columns=columns).set_index(['Région', 'Culture', 'Scénario'])
+    until = pd.Timestamp(until if until is not None else rain.index.max()).normalize()
+    year = season_year(until, scenarios)
+    regions = list(rain.columns)
+
+    # Une colonne par scénario (région, culture, semis)
+    keys = [(r, c, s) for r in regions for c in crops for s in scenarios]
+    sowing = np.array([pd.Timestamp(year, *scenarios[s][0]) for _, _, s in keys], dtype='datetime64[D]')
+    curves = {c: kc_curve(CROP_CALENDARS[c]) for c in crops}
+    stages = {c: stage_index(CROP_CALENDARS[c]) for c in crops}
+    lengths = np.array([len(curves[c]) for _, c, _ in keys])
+
+    start = sowing.min()
+    end = min((sowing + lengths.astype('timedelta64[D]')).max(), np.datetime64(until.date(), 'D') + 1)
+    dates = pd.date_range(pd.Timestamp(start), pd.Timestamp(end) - pd.Timedelta(days=1), freq='D')
+    region_columns = [regions.index(r) for r, _, _ in keys]
+    rain_days = rain.reindex(dates).to_numpy()[:, region_columns]
+    et0_days = et0.reindex(dates).to_numpy()[:, region_columns]
+
+    # Jours depuis le semis, Kc et stade pour chaque jour × scénario
+    elapsed = (dates.to_numpy().astype('datetime64[D]')[:, None] - sowing[None, :]).astype(int)
+    in_season = (elapsed >= 0) & (elapsed < lengths[None, :])
+    kc = np.full(elapsed.shape, BARE_SOIL_KC)
+    stage = np.full(elapsed.shape, -1)
+    for crop in crops:
+        columns = np.array([c == crop for _, c, _ in keys])
+        crop_elapsed = np.clip(elapsed[:, columns], 0, len(curves[crop]) - 1)
+        crop_season = in_season[:, columns]
+        kc[:, columns] = np.where(crop_season, curves[crop][crop_elapsed], BARE_SOIL_KC)
+        stage[:, columns] = np.where(crop_season, stages[crop][crop_elapsed], -1)
+
+    balance = SoilWaterBalance(
+        [f"{r}|{c}|{s}" for r, c, s in keys],
+        soil_types={f"{r}|{c}|{s}": soil_type for r, c, s in keys} if soil_type else None,
+        root_depth=np.array([CROP_CALENDARS[c]['root_depth'] for _, c, _ in keys]),
+        depletion_fraction=np.array([CROP_CALENDARS[c]['p'] for _, c, _ in keys])
+    )
+    outputs = balance.run(dates, rain_days, et0_days, kc)
+    actual = np.where(in_season, outputs['etc'], 0.0)
+    required = np.where(in_season, kc * np.nan_to_num(et0_days), 0.0)
+
+    frame = pd.DataFrame(keys, columns=['Région', 'Culture', 'Scénario'])
+    frame['Semis'] = pd.to_datetime(sowing)
+    frame['Jours écoulés'] = np.minimum(in_season.sum(axis=0), lengths)
+    for k, name in enumerate(STAGE_NAMES):
+        mask = stage == k
+        stage_required = np.where(mask, required, 0.0).sum(axis=0)
+        stage_actual = np.where(mask, actual, 0.0).sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            frame[name] = np.where(stage_required > 0, 100 * stage_actual / stage_required, np.nan).round(0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        frame['WRSI'] = np.where(required.sum(axis=0) > 0,
+                                 100 * actual.sum(axis=0) / required.sum(axis=0), np.nan).round(0)
+    return frame.set_index(['Région', 'Culture', 'Scénario'])
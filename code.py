@@ -1,17 +1,37 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.graph_objects as go
-import plotly.express as px
-from datetime import datetime, timedelta
-import base64
-from io import BytesIO
-import matplotlib.pyplot as plt
-import seaborn as sns
-import folium
-from folium import plugins
-import streamlit.components.v1 as components
+import os
+import hmac
 import json
+import itertools
+from datetime import datetime
+from functools import wraps
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from agromet.spatial import get_station_index
+from agromet.wrsi import CROP_CALENDARS, SOWING_SCENARIOS
+from agromet.spi import SPI_TIMESCALES, spi_category
+from agromet.maps import MAP_HTML_CACHE
+from agromet.pipeline import (
+    BULLETIN_DIR, WEATHER_PANEL_DAYS, current_weather_panel, generate_weather_data, get_data_provider, get_station_series,
+    submit_all_bulletins, submit_region_bulletin
+)
+from agromet.products import get_product_store, load_product
+from agromet.figures import long_series_figure, temperature_figure
+from agromet.timeseries import (
+    DEFAULT_PLOT_WIDTH, PLOT_WIDTHS, SERIES_COLUMNS, SERIES_YEARS, WEBGL_THRESHOLD, downsample_frame, selected_range
+)
+from agromet.snapshots import WRSI_STAGE_LABELS, load_snapshot, stage_levels
+from agromet.metrics import METRICS, METRICS_FILE, METRICS_PORT, current_page, start_metrics_server
+from agromet.resources import RESOURCES
+from agromet.tiles import start_tile_server
+
+# Utilisateurs ayant accès à la page d'administration, sur présentation du jeton d'administration
+ADMIN_USERS = set(os.environ.get("AGROMET_ADMIN_USERS", "admin").split(","))
+
+# Une figure sur PLOTLY_SIZE_SAMPLE est sérialisée pour mesurer la taille envoyée
+PLOTLY_SIZE_SAMPLE = int(os.environ.get("AGROMET_PLOTLY_SIZE_SAMPLE", "20"))
+_plotly_calls = itertools.count()
 
 # Configuration de la page
 st.set_page_config(
@@ -57,242 +77,62 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Données étendues de stations par région avec coordonnées géographiques
-STATIONS_DATA = {
-    "N'ZI": {
-        "Dimbokro": {"lat": 6.65, "lon": -4.7},
-        "Bocanda": {"lat": 7.066667, "lon": -4.516667},
-        "Bongouanou": {"lat": 6.65, "lon": -4.2}
-    },
-    "GOH": {
-        "Gagnoa": {"lat": 6.133333, "lon": -5.95},
-        "Ouragahio": {"lat": 6.316667, "lon": -5.933333},
-        "Oumé": {"lat": 6.366667, "lon": -5.416667}
-    },
-    "LAGUNES": {
-        "Abidjan": {"lat": 5.359952, "lon": -4.008256},
-        "Grand-Bassam": {"lat": 5.200833, "lon": -3.738889},
-        "Dabou": {"lat": 5.325, "lon": -4.376667}
-    },
-    "SASSANDRA-MARAHOUÉ": {
-        "Daloa": {"lat": 6.877222, "lon": -6.450833},
-        "Bouaflé": {"lat": 6.988889, "lon": -5.745556},
-        "Zuénoula": {"lat": 7.426667, "lon": -6.053333}
-    },
-    "VALLÉE DU BANDAMA": {
-        "Bouaké": {"lat": 7.690556, "lon": -5.030556},
-        "Katiola": {"lat": 8.135833, "lon": -5.106944},
-        "Béoumi": {"lat": 7.673889, "lon": -5.580556}
-    },
-    "MONTAGNES": {
-        "Man": {"lat": 7.412222, "lon": -7.553056},
-        "Danané": {"lat": 7.264167, "lon": -8.151944},
-        "Biankouma": {"lat": 7.744722, "lon": -7.620833}
-    },
-    "SAVANES": {
-        "Korhogo": {"lat": 9.458056, "lon": -5.629167},
-        "Boundiali": {"lat": 9.520833, "lon": -6.489722},
-        "Ferkessédougou": {"lat": 9.590833, "lon": -5.195833}
-    },
-    "ZANZAN": {
-        "Bondoukou": {"lat": 8.040278, "lon": -2.798611},
-        "Tanda": {"lat": 7.803056, "lon": -3.168611},
-        "Bouna": {"lat": 9.273611, "lon": -2.996667}
-    },
-    "COMOÉ": {
-        "Abengourou": {"lat": 6.729167, "lon": -3.496944},
-        "Agnibilékrou": {"lat": 7.123611, "lon": -3.200833},
-        "Bettié": {"lat": 6.235, "lon": -3.173333}
-    },
-    "LACS": {
-        "Yamoussoukro": {"lat": 6.820556, "lon": -5.276667},
-        "Tiébissou": {"lat": 7.158333, "lon": -5.223056},
-        "Toumodi": {"lat": 6.557222, "lon": -5.018333}
-    }
-}
+# Carte pré-rendue d'une vue (HTML déjà stylé)
+def display_map_snapshot(entry):
+    METRICS.observe_bytes('map_html', len(entry['html']))
+    st.components.v1.html(entry['html'], height=entry['height'] + 20)
 
-# Coordonnées des frontières de la Côte d'Ivoire pour créer un polygone
-COTE_DIVOIRE_BOUNDS = [
-    [10.740197, -2.494897],  # Nord-Est
-    [10.740197, -8.599302],  # Nord-Ouest  
-    [4.357067, -8.599302],   # Sud-Ouest
-    [4.357067, -2.494897],   # Sud-Est
-    [10.740197, -2.494897]   # Retour au point de départ
-]
+# Figure Plotly (objet ou dictionnaire pré-rendu) : temps de validation/sérialisation et,
+# par échantillonnage, taille envoyée (la mesure sérialise la figure une seconde fois)
+def display_plotly(figure, **kwargs):
+    if next(_plotly_calls) % PLOTLY_SIZE_SAMPLE == 0:
+        METRICS.observe_bytes('plotly', len(json.dumps(figure) if isinstance(figure, dict) else figure.to_json()))
+    with METRICS.timer('plotly_send'):
+        return st.plotly_chart(figure, use_container_width=True, **kwargs)
 
-# Fonction pour créer une belle carte thermique avec Folium
-def create_folium_heatmap(data_dict, title, colormap='RdYlBu_r', unit="", map_type="temperature"):
-    # Centre de la Côte d'Ivoire
-    center_lat, center_lon = 7.5, -5.5
-    
-    # Créer la carte de base avec un style moderne
-    m = folium.Map(
-        location=[center_lat, center_lon],
-        zoom_start=7,
-        tiles=None,
-        prefer_canvas=True
-    )
-    
-    # Ajouter différentes couches de fond
-    folium.TileLayer('OpenStreetMap', name='OpenStreetMap').add_to(m)
-    folium.TileLayer('CartoDB Positron', name='CartoDB Positron').add_to(m)
-    folium.TileLayer('CartoDB Dark_Matter', name='CartoDB Dark').add_to(m)
-    
-    # Utiliser CartoDB Positron par défaut pour un look propre
-    folium.TileLayer('CartoDB Positron').add_to(m)
-    
-    # Préparer les données pour la carte
-    heat_data = []
-    markers_data = []
-    
-    # Déterminer les valeurs min et max pour la normalisation des couleurs
-    values = list(data_dict.values())
-    min_val = min(values)
-    max_val = max(values)
-    
-    # Choisir la palette de couleurs selon le type de données
-    color_palettes = {
-        'temperature': ['#313695', '#4575b4', '#74add1', '#abd9e9', '#e0f3f8', 
-                       '#ffffcc', '#fee090', '#fdae61', '#f46d43', '#d73027', '#a50026'],
-        'precipitation': ['#ffffff', '#c6dbef', '#9ecae1', '#6baed6', '#4292c6', 
-                         '#2171b5', '#08519c', '#08306b', '#041f47', '#021238'],
-        'humidity': ['#f7fcf0', '#e0f3db', '#ccebc5', '#a8ddb5', '#7bccc4', 
-                    '#4eb3d3', '#2b8cbe', '#0868ac', '#084081', '#042753'],
-        'water_satisfaction': ['#8c2d04', '#cc4c02', '#ec7014', '#fe9929', '#fec44f', 
-                              '#fee391', '#fff7bc', '#c7e9b4', '#7fcdbb', '#41b6c4', '#2c7fb8']
-    }
-    
-    palette = color_palettes.get(map_type, color_palettes['temperature'])
-    
-    for region, value in data_dict.items():
-        if region in STATIONS_DATA:
-            # Utiliser la première station comme point représentatif de la région
-            station_name = list(STATIONS_DATA[region].keys())[0]
-            station_data = STATIONS_DATA[region][station_name]
-            
-            lat, lon = station_data['lat'], station_data['lon']
-            
-            # Normaliser la valeur pour la carte de chaleur
-            normalized_value = (value - min_val) / (max_val - min_val) if max_val != min_val else 0.5
-            heat_data.append([lat, lon, normalized_value])
-            
-            # Déterminer la couleur du marqueur basée sur la valeur
-            color_index = int(normalized_value * (len(palette) - 1))
-            marker_color = palette[color_index]
-            
-            # Créer un marqueur avec style personnalisé
-            icon_color = 'white' if normalized_value > 0.5 else 'black'
-            
-            # Choisir l'icône selon le type de données
-            icons = {
-                'temperature': 'thermometer-half',
-                'precipitation': 'tint',
-                'humidity': 'eye-dropper',
-                'water_satisfaction': 'leaf'
-            }
-            icon_name = icons.get(map_type, 'info-sign')
-            
-            # Popup avec informations détaillées
-            popup_html = f"""
-            <div style='font-family: Arial, sans-serif; width: 200px;'>
-                <h4 style='color: #2E8B57; margin-bottom: 10px;'>{region}</h4>
-                <p><strong>Station:</strong> {station_name}</p>
-                <p><strong>{title.split('-')[-1].strip()}:</strong> 
-                   <span style='font-size: 18px; font-weight: bold; color: #d73027;'>
-                   {value}{unit}
-                   </span>
-                </p>
-                <p><strong>Coordonnées:</strong> {lat:.3f}°N, {abs(lon):.3f}°W</p>
-            </div>
-            """
-            
-            folium.Marker(
-                location=[lat, lon],
-                popup=folium.Popup(popup_html, max_width=250),
-                tooltip=f"{region}: {value}{unit}",
-                icon=folium.Icon(
-                    color='red' if normalized_value > 0.7 else 'orange' if normalized_value > 0.4 else 'green',
-                    icon=icon_name,
-                    prefix='fa'
-                )
-            ).add_to(m)
-            
-            # Ajouter un cercle coloré pour l'effet thermique
-            circle_color = marker_color
-            folium.CircleMarker(
-                location=[lat, lon],
-                radius=20 + (normalized_value * 30),  # Taille variable selon la valeur
-                popup=f"{region}: {value}{unit}",
-                color='white',
-                weight=2,
-                fillColor=circle_color,
-                fillOpacity=0.7
-            ).add_to(m)
-    
-    # Ajouter une carte de chaleur en arrière-plan
-    if heat_data:
-        plugins.HeatMap(
-            heat_data,
-            min_opacity=0.2,
-            max_zoom=10,
-            radius=50,
-            blur=40,
-            gradient={
-                0.0: '#313695',
-                0.2: '#4575b4', 
-                0.4: '#abd9e9',
-                0.6: '#fee090',
-                0.8: '#f46d43',
-                1.0: '#a50026'
-            }
-        ).add_to(m)
-    
-    # Ajouter une légende personnalisée
-    legend_html = f'''
-    <div style="position: fixed; 
-                top: 10px; right: 10px; width: 200px; height: auto;
-                background-color: white; border:2px solid grey; z-index:9999;
-                font-size:14px; padding: 10px; border-radius: 10px;
-                box-shadow: 0 4px 8px rgba(0,0,0,0.3);">
-    <p style="margin: 0 0 10px 0;"><strong>{title}</strong></p>
-    <p style="margin: 0;"><i class="fa fa-circle" style="color:#a50026"></i> Élevé ({max_val:.1f}{unit})</p>
-    <p style="margin: 0;"><i class="fa fa-circle" style="color:#f46d43"></i> Moyen-Élevé</p>
-    <p style="margin: 0;"><i class="fa fa-circle" style="color:#fee090"></i> Moyen</p>
-    <p style="margin: 0;"><i class="fa fa-circle" style="color:#abd9e9"></i> Moyen-Faible</p>
-    <p style="margin: 0;"><i class="fa fa-circle" style="color:#313695"></i> Faible ({min_val:.1f}{unit})</p>
-    </div>
-    '''
-    m.get_root().html.add_child(folium.Element(legend_html))
-    
-    # Ajouter un contrôle des couches
-    folium.LayerControl().add_to(m)
-    
-    # Ajouter un plugin de mesure
-    plugins.MeasureControl().add_to(m)
-    
-    # Ajouter la position de la souris
-    plugins.MousePosition().add_to(m)
-    
-    # Limiter la vue à la Côte d'Ivoire
-    m.fit_bounds([[4.0, -8.6], [10.8, -2.4]])
-    
-    return m
+# Fragment relançable seul ; `inputs` : clés de session dont dépend son contenu.
+# Une interaction avec un widget du fragment ne relance que lui ; un changement d'entrée
+# (callback `rerun_fragments`) ne relance que les fragments rendus qui en dépendent.
+def dependent_fragment(key, inputs=()):
+    def decorator(function):
+        @wraps(function)
+        def body(*args, **kwargs):
+            current_page.set(st.session_state.get('menu_radio', ''))
+            with METRICS.timer(f"fragment_{key}"):
+                return function(*args, **kwargs)
+        fragment = st.fragment(body, key=key)
+        
+        @wraps(function)
+        def render(*args, **kwargs):
+            for name in inputs:
+                st.session_state.fragment_inputs.setdefault(name, set()).add(key)
+            return fragment(*args, **kwargs)
+        return render
+    return decorator
 
-# Fonction pour afficher une carte Folium dans Streamlit
-def display_folium_map(folium_map, height=500):
-    """Fonction pour afficher une carte Folium dans Streamlit avec un style personnalisé"""
-    map_html = folium_map._repr_html_()
-    
-    # Ajouter du CSS personnalisé pour la carte
-    styled_html = f"""
-    <div class="folium-map" style="border: 3px solid #2E8B57; border-radius: 15px; overflow: hidden; box-shadow: 0 6px 12px rgba(0,0,0,0.3);">
-        <div style="height: {height}px;">
-            {map_html}
-        </div>
-    </div>
-    """
-    
-    st.components.v1.html(styled_html, height=height + 20)
+def rerun_fragments(name):
+    """Callback : relance les fragments qui dépendent de l'entrée `name` (toute l'application s'il n'y en a aucun)"""
+    keys = sorted(st.session_state.get('fragment_inputs', {}).get(name, ()))
+    if keys:
+        st.rerun(keys)
+
+# Changement de station : les cartes régionales ne dépendent pas de la station et ne sont pas relancées
+def on_station_change():
+    st.session_state.selected_station = st.session_state.station_select
+    rerun_fragments('selected_station')
+
+# Jeton de la page d'administration (st.secrets["admin_token"] ou AGROMET_ADMIN_TOKEN) ; sans jeton, la page est désactivée
+def admin_token():
+    try:
+        token = st.secrets.get("admin_token")
+    except FileNotFoundError:
+        token = None
+    return token or os.environ.get("AGROMET_ADMIN_TOKEN", "")
+
+# Accès administrateur : utilisateur autorisé dont le mot de passe est le jeton d'administration
+def is_admin_login(username, password):
+    token = admin_token()
+    return bool(token) and username in ADMIN_USERS and hmac.compare_digest(password.encode(), token.encode())
 
 # Fonction d'authentification
 def authenticate_user():
@@ -321,6 +161,7 @@ def authenticate_user():
                     if username and password:
                         st.session_state.authenticated = True
                         st.session_state.username = username
+                        st.session_state.is_admin = is_admin_login(username, password)
                         st.session_state.login_attempted = True
                         st.success("✅ Connexion réussie! Redirection en cours...")
                         st.rerun()
@@ -334,49 +175,31 @@ def authenticate_user():
     
     return True
 
-# Génération de données météo simulées
-def generate_weather_data(station, days=7):
-    np.random.seed(42)
-    dates = [datetime.now() - timedelta(days=i) for i in range(days)]
-    dates.reverse()
-    
-    data = []
-    for date in dates:
-        data.append({
-            'Date': date.strftime('%Y-%m-%d'),
-            'Station': station,
-            'Température Min (°C)': round(np.random.uniform(20, 25), 1),
-            'Température Max (°C)': round(np.random.uniform(28, 35), 1),
-            'Humidité Min (%)': round(np.random.uniform(45, 60), 1),
-            'Humidité Max (%)': round(np.random.uniform(75, 95), 1),
-            'Précipitations (mm)': round(np.random.uniform(0, 25), 1),
-            'Vitesse Vent (m/s)': round(np.random.uniform(1, 8), 1),
-            'Direction Vent': np.random.choice(['N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW']),
-            'Insolation (h)': round(np.random.uniform(4, 12), 1)
-        })
-    
-    return pd.DataFrame(data)
-
-# Génération de données pluviométriques décadaires
-def generate_decade_rainfall_data(region):
-    decades = ['Décade 1', 'Décade 2', 'Décade 3']
-    months = ['Jan', 'Fév', 'Mar', 'Avr', 'Mai', 'Jun', 'Jul', 'Aoû', 'Sep', 'Oct', 'Nov', 'Déc']
-    
-    data = []
-    for month in months:
-        for decade in decades:
-            data.append({
-                'Période': f"{month} - {decade}",
-                'Pluie observée (mm)': round(np.random.uniform(10, 150), 1),
-                'Moyenne 30 ans (mm)': round(np.random.uniform(50, 120), 1),
-                'Écart (mm)': round(np.random.uniform(-50, 50), 1),
-                'Année précédente (mm)': round(np.random.uniform(20, 140), 1)
-            })
-    
-    return pd.DataFrame(data)
+# Sans produits publiés du jour, les pages sont calculées à partir du panneau météo : une source sans
+# observations sur la fenêtre du panneau (archive non à jour) est signalée au lieu d'être rendue
+def weather_data_missing():
+    if get_product_store().manifest(datetime.now().strftime('%Y-%m-%d')) is not None:
+        return False
+    if not current_weather_panel().empty:
+        return False
+    st.warning(
+        f"⚠️ Aucune observation disponible sur les {WEATHER_PANEL_DAYS} derniers jours "
+        f"(source : {get_data_provider().name}). Mettez l'archive à jour ou choisissez la source 'auto'."
+    )
+    return True
 
 # Interface principale
 def main_interface():
+    # Sessions actives, point d'accès local des métriques et serveur de tuiles hors ligne
+    run_context = get_script_run_ctx()
+    if run_context is not None:
+        METRICS.touch_session(run_context.session_id)
+    start_metrics_server()
+    start_tile_server()
+    
+    # Dépendances des fragments, enregistrées à nouveau à chaque exécution complète
+    st.session_state.fragment_inputs = {}
+    
     # En-tête de l'application
     username = st.session_state.get('username', 'Utilisateur')
     st.markdown(f'<div class="main-header"><h1>🌾 AGROMET_RCI</h1><p>Bienvenue {username} | Informations Agrométéorologiques en Temps Réel</p></div>', unsafe_allow_html=True)
@@ -384,7 +207,7 @@ def main_interface():
     # Bouton de déconnexion avec confirmation
     if st.sidebar.button("🚪 Se déconnecter", key="logout_btn"):
         # Reset des variables de session
-        for key in ['authenticated', 'username', 'login_attempted']:
+        for key in ['authenticated', 'username', 'is_admin', 'login_attempted']:
             if key in st.session_state:
                 del st.session_state[key]
         st.rerun()
@@ -398,34 +221,50 @@ def main_interface():
     if 'selected_station' not in st.session_state:
         st.session_state.selected_station = "Dimbokro"
     
+    station_index = get_station_index()
+    
+    # Recherche de la station la plus proche d'un point
+    with st.sidebar.expander("🔎 Station la plus proche"):
+        search_lat = st.number_input("Latitude", min_value=4.0, max_value=11.0, value=7.5, step=0.1, key="search_lat")
+        search_lon = st.number_input("Longitude", min_value=-9.0, max_value=-2.0, value=-5.5, step=0.1, key="search_lon")
+        if st.button("Localiser", key="search_nearest_btn"):
+            nearest_station, nearest_region, distance_km = station_index.nearest(search_lat, search_lon, k=1)[0]
+            st.session_state.selected_region = nearest_region
+            st.session_state.selected_station = nearest_station
+            st.session_state.region_select = nearest_region
+            st.caption(f"📍 {nearest_station} ({nearest_region}) à {distance_km:.1f} km")
+    
+    # Les sélecteurs suivent leur clé de session (sans index=) : la recherche ci-dessus peut les positionner
+    if 'region_select' not in st.session_state:
+        st.session_state.region_select = st.session_state.selected_region
     selected_region = st.sidebar.selectbox(
         "Choisissez une région:",
-        options=list(STATIONS_DATA.keys()),
-        index=list(STATIONS_DATA.keys()).index(st.session_state.selected_region),
+        options=station_index.regions_list(),
         key="region_select"
     )
     
     # Mise à jour de la station si la région change
     if selected_region != st.session_state.selected_region:
         st.session_state.selected_region = selected_region
-        st.session_state.selected_station = list(STATIONS_DATA[selected_region].keys())[0]
+        st.session_state.selected_station = station_index.stations_in_region(selected_region)[0]
     
     # Sélection de la station
-    stations = list(STATIONS_DATA[selected_region].keys())
-    try:
-        station_index = stations.index(st.session_state.selected_station)
-    except ValueError:
-        station_index = 0
+    stations = station_index.stations_in_region(selected_region)
+    if st.session_state.selected_station not in stations:
         st.session_state.selected_station = stations[0]
+    if st.session_state.get('station_select') != st.session_state.selected_station:
+        st.session_state.station_select = st.session_state.selected_station
     
     selected_station = st.sidebar.selectbox(
         "Choisissez une station:",
         options=stations,
-        index=station_index,
-        key="station_select"
+        key="station_select",
+        on_change=on_station_change
     )
     
     st.session_state.selected_station = selected_station
+    with st.sidebar:
+        show_station_summary()
     
     # Menu de navigation
     st.sidebar.markdown("### 📊 Navigation")
@@ -437,6 +276,8 @@ def main_interface():
         "🌍 Réserve en Eau du Sol",
         "💡 Avis et Conseils"
     ]
+    if st.session_state.get('is_admin'):
+        menu_options.append("🛠️ Administration")
     
     # Maintenir la sélection du menu
     if 'selected_menu_index' not in st.session_state:
@@ -445,39 +286,204 @@ def main_interface():
     selected_menu = st.sidebar.radio(
         "", 
         menu_options, 
-        index=st.session_state.selected_menu_index,
+        index=min(st.session_state.selected_menu_index, len(menu_options) - 1),
         key="menu_radio"
     )
     
     # Mettre à jour l'index du menu sélectionné
     st.session_state.selected_menu_index = menu_options.index(selected_menu)
     
-    # Affichage du contenu selon le menu sélectionné
+    # Affichage du contenu selon le menu sélectionné (les mesures sont étiquetées par page)
+    current_page.set(selected_menu)
     try:
-        if selected_menu == "📊 Paramètres Météo Journaliers":
-            show_daily_weather(selected_region, selected_station)
-        elif selected_menu == "🌧️ Situation Pluviométrique":
-            show_rainfall_situation(selected_region)
-        elif selected_menu == "📅 Prévision Saisonnière":
-            show_seasonal_forecast(selected_region)
-        elif selected_menu == "💧 Satisfaction en Eau des Cultures":
-            show_crop_water_satisfaction(selected_region)
-        elif selected_menu == "🌍 Réserve en Eau du Sol":
-            show_soil_water_reserve(selected_region)
-        elif selected_menu == "💡 Avis et Conseils":
-            show_advice_and_recommendations(selected_region)
+        with METRICS.timer('page_total'):
+            if selected_menu != "🛠️ Administration" and weather_data_missing():
+                pass
+            elif selected_menu == "📊 Paramètres Météo Journaliers":
+                show_daily_weather(selected_region)
+            elif selected_menu == "🌧️ Situation Pluviométrique":
+                show_rainfall_situation(selected_region)
+            elif selected_menu == "📅 Prévision Saisonnière":
+                show_seasonal_forecast(selected_region)
+            elif selected_menu == "💧 Satisfaction en Eau des Cultures":
+                show_crop_water_satisfaction(selected_region)
+            elif selected_menu == "🌍 Réserve en Eau du Sol":
+                show_soil_water_reserve(selected_region)
+            elif selected_menu == "💡 Avis et Conseils":
+                show_advice_and_recommendations(selected_region)
+            elif selected_menu == "🛠️ Administration":
+                show_admin_metrics()
     except Exception as e:
         st.error(f"❌ Erreur lors du chargement du contenu: {str(e)}")
         st.info("🔄 Veuillez rafraîchir la page ou sélectionner un autre menu.")
+    if run_context is not None:
+        RESOURCES.account_session(run_context.session_id, st.session_state)
+    METRICS.export()
+    
+    # Statistiques du cache des cartes
+    with st.sidebar.expander("🗺️ Cache des cartes"):
+        cache_stats = MAP_HTML_CACHE.stats()
+        st.caption(
+            f"Succès: {cache_stats['hits']} | Échecs: {cache_stats['misses']} | "
+            f"Taux: {cache_stats['hit_ratio']:.0%}"
+        )
+        st.caption(
+            f"{cache_stats['entries']} cartes | {cache_stats['bytes'] / 1024:.0f} Ko / "
+            f"{cache_stats['max_bytes'] / 1024 / 1024:.0f} Mo | Évictions: {cache_stats['evictions']}"
+        )
+
+def show_admin_metrics():
+    st.header("🛠️ Administration - Performances")
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Sessions actives (5 min)", METRICS.active_sessions())
+    col2.metric("Export Prometheus", METRICS_FILE or "désactivé")
+    col3.metric("Point d'accès /metrics", f"127.0.0.1:{METRICS_PORT}" if METRICS_PORT else "désactivé")
+    
+    # Durées par étape et par page sur les 10 dernières minutes (les étapes peuvent être imbriquées)
+    st.subheader("⏱️ Durées par étape")
+    rows = pd.DataFrame(METRICS.summary())
+    if rows.empty:
+        st.info("ℹ️ Aucune mesure sur la fenêtre récente")
+    else:
+        seconds = rows[rows['metric'] == 'agromet_stage_seconds']
+        st.dataframe(
+            seconds[['stage', 'page', 'n', 'mean', 'p50', 'p95', 'max']].assign(
+                **{column: (seconds[column] * 1000).round(1) for column in ['mean', 'p50', 'p95', 'max']}
+            ).rename(columns={'mean': 'moyenne (ms)', 'p50': 'p50 (ms)', 'p95': 'p95 (ms)', 'max': 'max (ms)'}),
+            use_container_width=True
+        )
+        st.subheader("📦 Contenus envoyés")
+        sizes = rows[rows['metric'] == 'agromet_payload_bytes']
+        st.dataframe(
+            sizes[['kind', 'page', 'n', 'mean', 'p95', 'max']].assign(
+                **{column: (sizes[column] / 1024).round(1) for column in ['mean', 'p95', 'max']}
+            ).rename(columns={'mean': 'moyenne (Ko)', 'p95': 'p95 (Ko)', 'max': 'max (Ko)'}),
+            use_container_width=True
+        )
+    
+    st.subheader("🗄️ Caches")
+    caches = pd.DataFrame(METRICS.cache_stats()).T
+    if not caches.empty:
+        caches['hit_ratio'] = (caches['hit_ratio'] * 100).round(1)
+        st.dataframe(caches.rename(columns={'hits': 'succès', 'misses': 'échecs', 'hit_ratio': 'taux (%)'}), use_container_width=True)
+    
+    # Ressources partagées par référence et état propre à chaque session
+    st.subheader("🧠 Mémoire")
+    memory = RESOURCES.session_stats()
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Ressources partagées", f"{memory['shared'] / 1024 / 1024:.1f} Mo")
+    col2.metric("État par session (moyenne)", f"{memory['mean'] / 1024:.0f} Ko", f"max {memory['max'] / 1024:.0f} Ko", delta_color="off")
+    col3.metric(
+        "Économie estimée",
+        f"{memory['shared'] * max(memory['sessions'] - 1, 0) / 1024 / 1024:.1f} Mo",
+        f"{memory['sessions']} sessions",
+        delta_color="off"
+    )
+    resources = pd.DataFrame(RESOURCES.stats())
+    if not resources.empty:
+        st.dataframe(
+            resources.assign(
+                bytes=(resources['bytes'] / 1024).round(1), seconds=(resources['seconds'] * 1000).round(1)
+            ).rename(columns={
+                'resource': 'ressource', 'args': 'arguments', 'bytes': 'taille (Ko)', 'seconds': 'chargement (ms)',
+                'frozen': 'lecture seule', 'reads': 'lectures'
+            }),
+            use_container_width=True
+        )
+    
+    st.download_button(
+        "💾 Exporter (format Prometheus)",
+        data=METRICS.prometheus(),
+        file_name="agromet_metrics.prom",
+        mime="text/plain",
+        key="metrics_download"
+    )
+
+@dependent_fragment('station_summary', inputs=('selected_station',))
+def show_station_summary():
+    station = st.session_state.selected_station
+    lat, lon = get_station_index().coordinates(station)
+    st.caption(f"📍 {station} · {lat:.2f}°N, {abs(lon):.2f}°O")
+
+def show_daily_weather(region):
+    # Vue pré-rendue de la région : la partie propre à la station est relancée seule
+    snapshot = load_snapshot('daily_weather', region)
+    show_station_weather(snapshot)
+    
+    # Carte Folium des précipitations journalières (indépendante de la station)
+    st.subheader("🌧️ Précipitations Journalières par Région")
+    display_map_snapshot(snapshot['maps']['precipitation'])
+    
+    show_long_series(region)
+
+# Séries pluriannuelles de plusieurs stations : réduction LTTB côté serveur à un point par pixel,
+# détail recalculé sur la plage sélectionnée dans le graphique
+@dependent_fragment('long_series')
+def show_long_series(region):
+    st.subheader("📈 Séries Longues")
+    station_index = get_station_index()
+    
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        stations = st.multiselect("Stations", station_index.names, default=station_index.stations_in_region(region)[:2], key="series_stations")
+    with col2:
+        column = st.selectbox("Paramètre", SERIES_COLUMNS, index=SERIES_COLUMNS.index('Précipitations (mm)'), key="series_column")
+    with col3:
+        width = st.select_slider("Largeur d'affichage (px)", PLOT_WIDTHS, value=DEFAULT_PLOT_WIDTH, key="series_width")
+    
+    today = pd.Timestamp(datetime.now()).normalize()
+    period = st.slider(
+        "Période",
+        min_value=(today - pd.DateOffset(years=SERIES_YEARS)).date(),
+        max_value=today.date(),
+        value=((today - pd.DateOffset(years=5)).date(), today.date()),
+        format="DD/MM/YYYY",
+        key="series_period"
+    )
+    if not stations:
+        st.info("ℹ️ Sélectionnez au moins une station")
+        return
+    
+    # Une sélection dans le graphique devient la nouvelle plage affichée (nouveau graphique, sélection vide)
+    view = st.session_state.setdefault('series_view', 0)
+    selection = selected_range(st.session_state.get(f"series_chart_{view}"))
+    if selection is not None:
+        st.session_state.series_zoom = selection
+        st.session_state.series_view = view = view + 1
+    zoom = st.session_state.get('series_zoom')
+    if zoom is not None and not (pd.Timestamp(period[0]) <= zoom[0] and zoom[1] <= pd.Timestamp(period[1])):
+        zoom = st.session_state.series_zoom = None
+    if zoom is not None and st.button("🔍 Vue d'ensemble", key="series_reset"):
+        zoom = st.session_state.series_zoom = None
+        st.session_state.series_view = view = view + 1
+    
+    # Période lue une fois (cache partagé), puis réduite à la largeur d'affichage sur la plage visible
+    frame = get_station_series(tuple(stations), column, str(period[0]), str(period[1]))
+    start, end = zoom if zoom is not None else (None, None)
+    series = downsample_frame(frame, width, start, end)
+    display_plotly(long_series_figure(series, column, WEBGL_THRESHOLD), on_select="rerun", selection_mode="box", key=f"series_chart_{view}")
+    st.caption(
+        f"{sum(len(values) for values in series.values())} points affichés sur "
+        f"{int(frame.loc[start:end].count().sum())} · sélectionnez une plage pour afficher plus de détail"
+    )
 
-def show_daily_weather(region, station):
+@dependent_fragment('station_weather', inputs=('selected_station',))
+def show_station_weather(snapshot):
+    station = st.session_state.selected_station
     st.header(f"📊 Paramètres Météorologiques Journaliers - {station}")
     
-    # Génération des données météo
-    weather_data = generate_weather_data(station)
+    # Lecture directe pour une station absente de la vue
+    weather_data = snapshot.get(f"weather_{station}")
+    if weather_data is None:
+        weather_data = generate_weather_data(station)
     
-    # Métriques principales
+    # Métriques principales (écart par rapport à la veille)
     latest_data = weather_data.iloc[-1]
+    previous_data = weather_data.iloc[-2] if len(weather_data) > 1 else latest_data
+    
+    def day_delta(column):
+        return round(latest_data[column] - previous_data[column], 1)
     
     col1, col2, col3, col4 = st.columns(4)
     
@@ -485,315 +491,192 @@ def show_daily_weather(region, station):
         st.metric(
             label="🌡️ Température Max",
             value=f"{latest_data['Température Max (°C)']}°C",
-            delta=f"{round(np.random.uniform(-2, 2), 1)}°C"
+            delta=f"{day_delta('Température Max (°C)')}°C"
         )
     
     with col2:
         st.metric(
             label="💧 Humidité Max",
             value=f"{latest_data['Humidité Max (%)']}%",
-            delta=f"{round(np.random.uniform(-5, 5), 1)}%"
+            delta=f"{day_delta('Humidité Max (%)')}%"
         )
     
     with col3:
         st.metric(
             label="🌧️ Précipitations",
             value=f"{latest_data['Précipitations (mm)']} mm",
-            delta=f"{round(np.random.uniform(-10, 10), 1)} mm"
+            delta=f"{day_delta('Précipitations (mm)')} mm"
         )
     
     with col4:
         st.metric(
             label="💨 Vitesse Vent",
             value=f"{latest_data['Vitesse Vent (m/s)']} m/s",
-            delta=f"{round(np.random.uniform(-1, 1), 1)} m/s"
+            delta=f"{day_delta('Vitesse Vent (m/s)')} m/s"
         )
     
     # Tableau des données
     st.subheader("📋 Données des 7 derniers jours")
     st.dataframe(weather_data, use_container_width=True)
     
-    # Graphiques
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        # Graphique des températures
-        fig_temp = go.Figure()
-        fig_temp.add_trace(go.Scatter(
-            x=weather_data['Date'],
-            y=weather_data['Température Max (°C)'],
-            mode='lines+markers',
-            name='Temp Max',
-            line=dict(color='red')
-        ))
-        fig_temp.add_trace(go.Scatter(
-            x=weather_data['Date'],
-            y=weather_data['Température Min (°C)'],
-            mode='lines+markers',
-            name='Temp Min',
-            line=dict(color='blue')
-        ))
-        fig_temp.update_layout(title="📈 Évolution des Températures", xaxis_title="Date", yaxis_title="Température (°C)")
-        st.plotly_chart(fig_temp, use_container_width=True)
-    
-    with col2:
-        # Carte Folium des précipitations journalières
-        st.subheader("🌧️ Précipitations Journalières par Région")
-        precipitation_data = {}
-        np.random.seed(42)
-        for reg in STATIONS_DATA.keys():
-            precipitation_data[reg] = round(np.random.uniform(0, 50), 1)
-        
-        folium_map = create_folium_heatmap(
-            precipitation_data, 
-            "🌧️ Précipitations Journalières", 
-            colormap='Blues',
-            unit=" mm",
-            map_type="precipitation"
-        )
-        display_folium_map(folium_map, height=450, key="daily_precip_map")
+    # Graphique des températures
+    fig_temp = snapshot['figures'].get(f"temperature_{station}") or temperature_figure(weather_data)
+    display_plotly(fig_temp)
 
 def show_rainfall_situation(region):
     st.header(f"🌧️ Situation Pluviométrique - Région {region}")
     
-    # Génération des données pluviométriques
-    rainfall_data = generate_decade_rainfall_data(region)
+    snapshot = load_snapshot('rainfall', region)
     
     # Graphique de comparaison
-    fig = go.Figure()
-    
-    fig.add_trace(go.Bar(
-        name='Pluie observée',
-        x=rainfall_data['Période'],
-        y=rainfall_data['Pluie observée (mm)'],
-        marker_color='lightblue'
-    ))
-    
-    fig.add_trace(go.Bar(
-        name='Moyenne 30 ans',
-        x=rainfall_data['Période'],
-        y=rainfall_data['Moyenne 30 ans (mm)'],
-        marker_color='darkblue'
-    ))
-    
-    fig.add_trace(go.Bar(
-        name='Année précédente',
-        x=rainfall_data['Période'],
-        y=rainfall_data['Année précédente (mm)'],
-        marker_color='green'
-    ))
-    
-    fig.update_layout(
-        title="📊 Comparaison Pluviométrique par Décade",
-        barmode='group',
-        xaxis_title="Période",
-        yaxis_title="Précipitations (mm)"
-    )
-    
-    st.plotly_chart(fig, use_container_width=True)
+    display_plotly(snapshot['figures']['decades'])
     
     # Carte Folium de la situation pluviométrique
     st.subheader("🗺️ Situation Pluviométrique Régionale")
-    regional_rainfall = {}
-    np.random.seed(123)
-    for reg in STATIONS_DATA.keys():
-        regional_rainfall[reg] = round(np.random.uniform(20, 200), 1)
-    
-    folium_map = create_folium_heatmap(
-        regional_rainfall, 
-        "🌧️ Précipitations Cumulées Mensuelles", 
-        colormap='Blues',
-        unit=" mm",
-        map_type="precipitation"
-    )
-    display_folium_map(folium_map, height=550, key="rainfall_situation_map")
+    display_map_snapshot(snapshot['maps']['rainfall_30d'])
+    
+    # Indice de précipitation standardisé (le choix de l'échelle ne relance que cette carte)
+    show_spi_map(region, snapshot)
     
     # Tableau des écarts
     st.subheader("📋 Écarts par rapport à la normale")
-    rainfall_data['Écart (%)'] = round((rainfall_data['Pluie observée (mm)'] - rainfall_data['Moyenne 30 ans (mm)']) / rainfall_data['Moyenne 30 ans (mm)'] * 100, 1)
-    st.dataframe(rainfall_data[['Période', 'Pluie observée (mm)', 'Moyenne 30 ans (mm)', 'Écart (mm)', 'Écart (%)']], use_container_width=True)
+    st.dataframe(snapshot['deviations'], use_container_width=True)
+
+@dependent_fragment('spi_map')
+def show_spi_map(region, snapshot):
+    st.subheader("🏜️ Indice de Précipitation Standardisé (SPI)")
+    timescale = st.selectbox("Échelle de temps", list(SPI_TIMESCALES), index=2, key="spi_timescale")
+    spi_map = snapshot['maps'].get(f"spi_{timescale}")
+    if spi_map is None:
+        st.info("ℹ️ Historique insuffisant pour calculer le SPI sur cette échelle de temps.")
+    else:
+        display_map_snapshot(spi_map)
+        regional_spi = load_product('spi')[timescale].reindex(get_station_index().stations_in_region(region)).round(2).mean()
+        st.metric(f"{timescale} régional", f"{regional_spi:.2f}", spi_category(regional_spi), delta_color="off")
 
 def show_seasonal_forecast(region):
     st.header(f"📅 Prévision Saisonnière - Région {region}")
     
-    st.info("📋 Prévisions pour la saison agricole 2024-2025")
+    outlook = load_product('seasonal')
+    start, members = pd.Timestamp(outlook['start']), outlook['members']
+    st.info(f"📋 Prévisions pour la saison agricole {start.year} (ensemble de {members} membres)")
+    
+    monthly_rain = outlook['monthly_rain']
+    terciles = outlook['terciles'][region]
+    season_dates = outlook['season_dates'][region]
     
     col1, col2 = st.columns([2, 1])
     
     with col1:
-        # Carte Folium des prévisions saisonnières de précipitations
+        # Carte Folium des prévisions saisonnières de précipitations (moyenne d'ensemble)
         st.subheader("🌧️ Prévisions Saisonnières - Précipitations Cumulées")
-        seasonal_precipitation_data = {}
-        np.random.seed(100)
-        for reg in STATIONS_DATA.keys():
-            seasonal_precipitation_data[reg] = round(np.random.uniform(800, 1800), 0)
-        
-        folium_map = create_folium_heatmap(
-            seasonal_precipitation_data, 
-            "📅 Prévisions Précipitations Saisonnières", 
-            colormap='RdYlBu_r',
-            unit=" mm",
-            map_type="precipitation"
-        )
-        display_folium_map(folium_map, height=500, key="seasonal_forecast_map")
+        snapshot = load_snapshot('seasonal', region)
+        display_map_snapshot(snapshot['maps']['precipitation'])
         
         # Graphique temporel des prévisions mensuelles
-        months = ['Mai', 'Juin', 'Juillet', 'Août', 'Septembre', 'Octobre']
-        precipitation_forecast = [120, 180, 200, 250, 180, 100]
-        temperature_forecast = [28, 26, 25, 24, 26, 29]
-        
-        fig_timeline = go.Figure()
-        
-        fig_timeline.add_trace(go.Bar(
-            name='Précipitations (mm)',
-            x=months,
-            y=precipitation_forecast,
-            yaxis='y',
-            marker_color='lightblue'
-        ))
-        
-        fig_timeline.add_trace(go.Scatter(
-            name='Température (°C)',
-            x=months,
-            y=temperature_forecast,
-            yaxis='y2',
-            mode='lines+markers',
-            marker_color='red'
-        ))
-        
-        fig_timeline.update_layout(
-            title="📈 Évolution Mensuelle des Prévisions",
-            xaxis_title="Mois",
-            yaxis=dict(title="Précipitations (mm)", side="left"),
-            yaxis2=dict(title="Température (°C)", side="right", overlaying="y")
-        )
-        
-        st.plotly_chart(fig_timeline, use_container_width=True)
+        display_plotly(snapshot['figures']['monthly'])
     
     with col2:
         st.markdown("### 🎯 Tendances Attendues")
-        st.success("✅ **Saison favorable** pour les cultures de riz")
-        st.warning("⚠️ **Attention** aux variations pluviométriques en juillet")
-        st.info("ℹ️ **Recommandation** : Planifier les semis pour mi-mai")
+        if terciles.isna().all():
+            st.warning("⚠️ Climatologie de référence indisponible : probabilités des terciles non calculées.")
+            return
+        likely = terciles.idxmax()
+        if likely == 'Inférieur':
+            st.warning(f"⚠️ **Saison déficitaire** la plus probable ({terciles[likely]:.0f}%)")
+        elif likely == 'Supérieur':
+            st.success(f"✅ **Saison excédentaire** la plus probable ({terciles[likely]:.0f}%)")
+        else:
+            st.success(f"✅ **Saison proche de la normale** la plus probable ({terciles[likely]:.0f}%)")
         
+        wettest = monthly_rain[region].idxmax()
+        st.info(f"ℹ️ **Mois le plus pluvieux** : {wettest} ({monthly_rain[region].max():.0f} mm)")
+        for label, offset in season_dates.items():
+            if np.isnan(offset):
+                st.info(f"📆 **{label}** : non atteint sur la période de prévision")
+            else:
+                st.info(f"📆 **{label}** : vers le {(start + pd.Timedelta(days=int(round(offset)))).strftime('%d/%m')}")
+        
+        # Probabilités des terciles, comparées à la probabilité climatologique (1/3)
         st.markdown("### 📊 Probabilités")
-        st.metric("Saison normale", "65%", "↑ 5%")
-        st.metric("Saison sèche", "20%", "↓ 3%")
-        st.metric("Saison humide", "15%", "↓ 2%")
+        st.metric("Saison normale", f"{terciles['Normal']:.0f}%", f"{terciles['Normal'] - 100 / 3:+.0f} pts")
+        st.metric("Saison sèche", f"{terciles['Inférieur']:.0f}%", f"{terciles['Inférieur'] - 100 / 3:+.0f} pts")
+        st.metric("Saison humide", f"{terciles['Supérieur']:.0f}%", f"{terciles['Supérieur'] - 100 / 3:+.0f} pts")
 
 def show_crop_water_satisfaction(region):
     st.header(f"💧 Niveau de Satisfaction en Eau des Cultures - Région {region}")
+    show_crop_satisfaction(region)
+
+# Le choix de la culture ne relance que ce fragment
+@dependent_fragment('crop_satisfaction')
+def show_crop_satisfaction(region):
+    crop = st.selectbox("🌾 Culture:", list(CROP_CALENDARS.keys()), key="wrsi_crop")
+    calendar = CROP_CALENDARS[crop]
+    wrsi_table = load_product('wrsi')
+    normal_sowing = wrsi_table.xs((crop, 'Semis normal'), level=('Culture', 'Scénario'))
     
     col1, col2 = st.columns([2, 1])
     
     with col1:
-        # Carte Folium de satisfaction en eau des cultures par région
-        st.subheader("💧 Satisfaction en Eau des Cultures par Région")
-        water_satisfaction_data = {}
-        np.random.seed(50)
-        for reg in STATIONS_DATA.keys():
-            water_satisfaction_data[reg] = round(np.random.uniform(45, 95), 0)
-        
-        folium_map = create_folium_heatmap(
-            water_satisfaction_data, 
-            "Satisfaction en Eau des Cultures", 
-            colormap='RdYlGn',
-            unit="%",
-            map_type="water_satisfaction"
-        )
-        display_folium_map(folium_map, height=450)
+        # Carte Folium de satisfaction en eau des cultures par région (semis normal)
+        st.subheader(f"💧 Satisfaction en Eau - {crop} (semis normal)")
+        snapshot = load_snapshot('water_satisfaction', region)
+        display_map_snapshot(snapshot['maps'][f"wrsi_{crop}"])
         
         # Graphique par stade de développement pour la région sélectionnée
-        stages = ['Début croissance', 'Croissance végétative', 'Phase reproductive']
-        satisfaction_levels = [water_satisfaction_data.get(region, 75) + np.random.randint(-10, 10) for _ in range(3)]
-        satisfaction_levels = [max(0, min(100, level)) for level in satisfaction_levels]  # Limiter entre 0 et 100
-        
-        fig_stages = go.Figure(data=[
-            go.Bar(
-                x=stages,
-                y=satisfaction_levels,
-                marker_color=['green' if x >= 80 else 'orange' if x >= 60 else 'red' for x in satisfaction_levels],
-                text=[f"{x}%" for x in satisfaction_levels],
-                textposition='auto'
-            )
-        ])
-        
-        fig_stages.update_layout(
-            title=f"📊 Satisfaction en Eau par Stade - {region}",
-            xaxis_title="Stades de Développement",
-            yaxis_title="Niveau de Satisfaction (%)",
-            yaxis=dict(range=[0, 100])
-        )
-        
-        st.plotly_chart(fig_stages, use_container_width=True)
+        stages = WRSI_STAGE_LABELS
+        region_row = normal_sowing.loc[region]
+        satisfaction_levels = stage_levels(region_row)
+        display_plotly(snapshot['figures'][f"stages_{crop}"])
     
     with col2:
         st.markdown("### 🌾 État des Cultures")
         
-        kc_values = ['(Kc=0.3-0.5)', '(Kc=0.8)', '(Kc=1.2)']
-        for i, (stage, level, kc) in enumerate(zip(stages, satisfaction_levels, kc_values)):
-            if level >= 80:
-                st.success(f"✅ **{stage} {kc}**: {level}% - Excellent")
+        # Besoin en eau de chaque stade : ETc = Kc × ET0 moyenne des 7 derniers jours
+        region_et0 = load_product('et0')[get_station_index().stations_in_region(region)]
+        et0_week = float(region_et0.tail(7).mean().mean())
+        st.metric("ET0 moyenne (7 jours)", f"{et0_week:.1f} mm/j")
+        st.metric("WRSI cumulé", f"{region_row['WRSI']:.0f}%", f"{region_row['Jours écoulés']} jours depuis le semis", delta_color="off")
+        
+        kc_ini, kc_mid, kc_end = calendar['kc']
+        kc_values = [f'(Kc={kc_ini})', f'(Kc={kc_ini}-{kc_mid})', f'(Kc={kc_mid})']
+        kc_factors = [kc_ini, (kc_ini + kc_mid) / 2, kc_mid]
+        for i, (stage, level, kc, kc_factor) in enumerate(zip(stages, satisfaction_levels, kc_values, kc_factors)):
+            etc = f"ETc {kc_factor * et0_week:.1f} mm/j"
+            if level is None:
+                st.info(f"⏳ **{stage} {kc}**: stade non atteint · {etc}")
+            elif level >= 80:
+                st.success(f"✅ **{stage} {kc}**: {level}% - Excellent · {etc}")
             elif level >= 60:
-                st.warning(f"⚠️ **{stage} {kc}**: {level}% - Correct")
+                st.warning(f"⚠️ **{stage} {kc}**: {level}% - Correct · {etc}")
             else:
-                st.error(f"❌ **{stage} {kc}**: {level}% - Insuffisant")
+                st.error(f"❌ **{stage} {kc}**: {level}% - Insuffisant · {etc}")
         
         st.markdown("### 📅 Dates de Semis Recommandées")
-        st.info("🌱 **Semis précoce**: 15-30 Mai 2024")
-        st.info("🌱 **Semis normal**: 1-15 Juin 2024")
-        st.info("🌱 **Semis tardif**: 16-30 Juin 2024")
+        for scenario, (_, window) in SOWING_SCENARIOS.items():
+            scenario_row = wrsi_table.loc[(region, crop, scenario)]
+            st.info(f"🌱 **{scenario}**: {window} {scenario_row['Semis'].year} · WRSI {scenario_row['WRSI']:.0f}%")
 
 def show_soil_water_reserve(region):
     st.header(f"🌍 Réserve en Eau du Sol et Prévisions - Région {region}")
     
-    # Données simulées de réserve en eau
-    dates = pd.date_range(start='2024-05-01', end='2024-05-31', freq='D')
-    water_reserve = np.random.uniform(40, 100, len(dates))
+    # Bilan hydrique des stations de la région sur les 31 derniers jours
+    soil = load_product('soil')
+    region_stations = get_station_index().stations_in_region(region)
+    water_reserve = soil['reserve'][region_stations].mean(axis=1).to_numpy()
+    capacity = soil['parameters'].loc[region_stations, 'capacity'].mean()
+    readily_available = soil['parameters'].loc[region_stations, 'raw'].mean()
     
     col1, col2 = st.columns([2, 1])
     
     with col1:
         # Carte Folium de la réserve en eau du sol
         st.subheader("🗺️ Réserve en Eau du Sol par Région")
-        soil_water_data = {}
-        np.random.seed(75)
-        for reg in STATIONS_DATA.keys():
-            soil_water_data[reg] = round(np.random.uniform(30, 95), 0)
-        
-        folium_map = create_folium_heatmap(
-            soil_water_data, 
-            "Réserve en Eau du Sol", 
-            colormap='Blues',
-            unit="%",
-            map_type="humidity"
-        )
-        display_folium_map(folium_map, height=450)
+        snapshot = load_snapshot('soil_reserve', region)
+        display_map_snapshot(snapshot['maps']['reserve'])
         
         # Graphique de l'évolution de la réserve en eau
-        fig = go.Figure()
-        
-        fig.add_trace(go.Scatter(
-            x=dates,
-            y=water_reserve,
-            mode='lines+markers',
-            name='Réserve en eau (%)',
-            line=dict(color='blue', width=3),
-            fill='tonexty'
-        ))
-        
-        # Ligne de seuil critique
-        fig.add_hline(y=30, line_dash="dash", line_color="red", annotation_text="Seuil critique")
-        fig.add_hline(y=80, line_dash="dash", line_color="green", annotation_text="Seuil optimal")
-        
-        fig.update_layout(
-            title="📈 Évolution de la Réserve en Eau du Sol",
-            xaxis_title="Date",
-            yaxis_title="Réserve en Eau (%)",
-            yaxis=dict(range=[0, 100])
-        )
-        
-        st.plotly_chart(fig, use_container_width=True)
+        display_plotly(snapshot['figures']['reserve'])
     
     with col2:
         st.markdown("### 🔮 Prévisions 7 Jours")
@@ -814,7 +697,7 @@ def show_soil_water_reserve(region):
         # Métriques actuelles
         st.markdown("### 📊 État Actuel")
         st.metric("Réserve Utile", f"{water_reserve[-1]:.1f}%", f"{water_reserve[-1] - water_reserve[-2]:.1f}%")
-        st.metric("Capacité au champ", "100 mm", "Stable")
+        st.metric("Capacité au champ", f"{capacity:.0f} mm", f"RFU {readily_available:.0f} mm", delta_color="off")
 
 def show_advice_and_recommendations(region):
     st.header(f"💡 Avis et Conseils Agrométéorologiques - Région {region}")
@@ -824,48 +707,40 @@ def show_advice_and_recommendations(region):
     
     st.markdown(f"### 📅 Bulletin du {current_date}")
     
+    # Avis déclenchés pour la région (règles évaluées sur toutes les régions × cultures)
+    items = load_product('advisories')[region]
+    advice = [item for item in items if item['category'] == 'conseil']
+    
+    def show_advice(items):
+        if not items:
+            st.info("ℹ️ Aucun conseil particulier pour cette période")
+        for item in items:
+            text = f"{item['icon']} {item['message']}"
+            if item['level'] == 'warning':
+                st.warning(text)
+            else:
+                st.success(text)
+    
     # Conseils par type de culture
     col1, col2 = st.columns(2)
     
     with col1:
         st.markdown("#### 🌾 **Riziculture**")
-        
-        advice_rice = [
-            "✅ **Préparation des champs**: Conditions favorables pour le labour",
-            "🌱 **Semis**: Période optimale pour les variétés précoces",
-            "💧 **Irrigation**: Maintenir 5cm d'eau dans les rizières",
-            "🚜 **Travaux**: Éviter les interventions mécaniques lourdes",
-            "🌿 **Fertilisation**: Apporter l'engrais de fond avant repiquage"
-        ]
-        
-        for advice in advice_rice:
-            st.success(advice)
+        show_advice([item for item in advice if item['culture'] == 'Riz'])
     
     with col2:
         st.markdown("#### 🌽 **Cultures Vivrières**")
-        
-        advice_crops = [
-            "⚠️ **Maïs**: Reporter les semis de 7 jours",
-            "✅ **Igname**: Conditions favorables pour la plantation",
-            "🌿 **Légumineuses**: Période idéale pour le semis",
-            "💨 **Protection**: Installer des brise-vents si nécessaire",
-            "🐛 **Phytosanitaire**: Surveiller les attaques de chenilles"
-        ]
-        
-        for advice in advice_crops:
-            if "⚠️" in advice:
-                st.warning(advice)
-            else:
-                st.success(advice)
+        show_advice([item for item in advice if item['culture'] != 'Riz'])
     
     # Alertes météorologiques
     st.markdown("### 🚨 Alertes et Recommandations Urgentes")
     
     alerts = [
-        ("🌧️", "Fort risque de pluies intenses", "Sécuriser les récoltes en cours de séchage", "warning"),
-        ("💨", "Vents forts prévus", "Renforcer les tuteurages des jeunes plants", "error"),
-        ("☀️", "Période sèche prolongée", "Planifier l'irrigation des cultures sensibles", "info")
+        (item['icon'], item['title'], item['message'], item['level'])
+        for item in items if item['category'] == 'alerte'
     ]
+    if not alerts:
+        st.success("✅ Aucune alerte en cours pour la région")
     
     for icon, title, recommendation, alert_type in alerts:
         if alert_type == "warning":
@@ -878,37 +753,52 @@ def show_advice_and_recommendations(region):
     # Calendrier agricole
     st.markdown("### 📅 Calendrier Agricole - Prochaines Semaines")
     
-    calendar_activities = pd.DataFrame({
-        'Semaine': ['Semaine 1', 'Semaine 2', 'Semaine 3', 'Semaine 4'],
-        'Activités Principales': [
-            'Préparation des pépinières de riz',
-            'Semis des légumineuses de saison',
-            'Repiquage du riz (variétés précoces)',
-            'Premier sarclage des cultures installées'
-        ],
-        'Conditions Météo': [
-            'Pluviosité modérée attendue',
-            'Conditions sèches favorables',
-            'Retour des pluies régulières',
-            'Alternance soleil-pluie'
-        ],
-        'Priorité': ['Haute', 'Moyenne', 'Haute', 'Moyenne']
-    })
+    calendar_activities = load_snapshot('advice', region)['calendar']
     
     st.dataframe(calendar_activities, use_container_width=True)
     
     # Téléchargement des recommandations
     st.markdown("### 📥 Télécharger les Recommandations")
     
-    # Utilisation d'un container pour éviter les problèmes de rerun
-    with st.container():
-        if st.button("📄 Générer le bulletin PDF", type="primary", key="pdf_button"):
-            with st.spinner("⏳ Génération du bulletin en cours..."):
-                # Simulation du temps de génération
-                import time
-                time.sleep(1)
-                st.success("✅ Bulletin PDF généré avec succès!")
-                st.info("💾 Le fichier sera disponible dans votre espace de téléchargement.")
+    show_bulletin_download(region)
+
+# Contenu préparé sur le fil des bulletins et rendu dans un processus séparé : seul ce fragment est relancé
+@dependent_fragment('bulletin_download')
+def show_bulletin_download(region):
+    if st.button("📄 Générer le bulletin PDF", type="primary", key="pdf_button"):
+        st.session_state['bulletin_job'] = (region, submit_region_bulletin(region))
+    
+    job = st.session_state.get('bulletin_job')
+    if job is not None and job[0] == region:
+        future = job[1]
+        if not future.done():
+            st.info("⏳ Génération du bulletin en cours...")
+            st.button("🔄 Actualiser", key="pdf_refresh")
+        elif future.exception() is not None:
+            st.error(f"❌ Échec de la génération du bulletin : {future.exception()}")
+        else:
+            st.success("✅ Bulletin PDF généré avec succès!")
+            with open(future.result(), "rb") as f:
+                st.download_button(
+                    "💾 Télécharger le bulletin",
+                    data=f.read(),
+                    file_name=f"bulletin_{region}_{datetime.now().strftime('%Y%m%d')}.pdf",
+                    mime="application/pdf",
+                    key="pdf_download"
+                )
+    
+    with st.expander("📚 Bulletins de toutes les régions"):
+        if st.button("Générer tous les bulletins", key="pdf_batch"):
+            st.session_state['bulletin_batch'] = submit_all_bulletins()
+        batch = st.session_state.get('bulletin_batch')
+        if batch is not None:
+            if not batch.done():
+                st.info("⏳ Rendu parallèle des bulletins en cours...")
+                st.button("🔄 Actualiser", key="pdf_batch_refresh")
+            elif batch.exception() is not None:
+                st.error(f"❌ Échec de la génération des bulletins : {batch.exception()}")
+            else:
+                st.success(f"✅ {len(batch.result())} bulletins disponibles dans {BULLETIN_DIR}")
 
 # Point d'entrée principal
 def main():
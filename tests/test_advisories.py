@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from agromet.advisories import ADVISORY_RULES, INDICATORS, OPERATORS, AdvisoryEngine, build_indicators
+
+CROPS = ['Riz', 'Maïs', 'Igname', 'Légumineuses']
+
+
+def random_indicators(seed=0, regions=12):
+    rng = np.random.default_rng(seed)
+    region_values = {
+        'pluie_3j': rng.uniform(0, 80, regions), 'pluie_7j': rng.uniform(0, 120, regions),
+        'tmax': rng.uniform(25, 38, regions), 'vent_max': rng.uniform(0, 10, regions),
+        'reserve': rng.uniform(0, 100, regions), 'spi_decade': rng.normal(0, 1.2, regions),
+        'spi_3': rng.normal(0, 1.2, regions), 'proba_inferieur': rng.uniform(10, 60, regions),
+        'proba_superieur': rng.uniform(10, 60, regions)
+    }
+    names = [f"R{k}" for k in range(regions)]
+    region_values = {name: dict(zip(names, values)) for name, values in region_values.items()}
+    index = pd.MultiIndex.from_product([names, CROPS])
+    crop_values = {
+        'wrsi': dict(zip(index, rng.uniform(50, 100, len(index)))),
+        'stade': dict(zip(index, rng.integers(-1, 5, len(index)))),
+        'jours_avant_semis': dict(zip(index, rng.integers(-40, 40, len(index))))
+    }
+    return build_indicators(names, CROPS, region_values, crop_values)
+
+
+# Évaluation directe, règle par règle et ligne par ligne
+def naive_masks(indicators):
+    return pd.DataFrame([
+        [
+            all(OPERATORS[op](row[name], threshold) for name, op, threshold in rule['when'])
+            and crop in rule.get('crops', [crop])
+            for rule in ADVISORY_RULES
+        ]
+        for (_, crop), row in indicators.iterrows()
+    ], index=indicators.index, columns=[rule['id'] for rule in ADVISORY_RULES])
+
+
+def test_compiled_masks_match_rule_by_rule_evaluation():
+    indicators = random_indicators()
+    masks = AdvisoryEngine().evaluate(indicators)
+    pd.testing.assert_frame_equal(masks, naive_masks(indicators))
+    # Les conseils propres au riz ne concernent pas les autres cultures
+    assert not masks['irrigation_riz'].xs('Maïs', level='Culture').any()
+
+
+def test_only_rules_reading_changed_indicators_are_reevaluated():
+    engine = AdvisoryEngine()
+    indicators = random_indicators()
+    engine.evaluate(indicators)
+    assert engine.stats['rules_evaluated'] == len(ADVISORY_RULES)
+    indicators['vent_max'] = 9.0
+    masks = engine.evaluate(indicators)
+    reading_wind = [rule for rule in ADVISORY_RULES if any(c[0] == 'vent_max' for c in rule['when'])]
+    assert engine.stats['rules_evaluated'] == len(ADVISORY_RULES) + len(reading_wind)
+    pd.testing.assert_frame_equal(masks, naive_masks(indicators))
+
+
+def test_missing_indicator_never_triggers_a_rule():
+    indicators = build_indicators(['R0'], CROPS, {'vent_max': {'R0': np.nan}})
+    assert not AdvisoryEngine().evaluate(indicators).any().any()
+
+
+def test_regional_alerts_are_listed_once_with_their_values():
+    engine = AdvisoryEngine()
+    indicators = build_indicators(['R0'], CROPS, {'vent_max': {'R0': 8.2}})
+    alerts = engine.advisories(engine.evaluate(indicators), indicators, 'R0', category='alerte')
+    assert [alert['id'] for alert in alerts] == ['vents_forts']
+    assert '8.2 m/s' in alerts[0]['message']
+
+
+def test_unknown_indicator_is_rejected():
+    with pytest.raises(ValueError):
+        AdvisoryEngine([{'id': 'x', 'category': 'alerte', 'message': '', 'when': [('humidite', '>', 1)]}])
+    assert set(INDICATORS) >= {c[0] for rule in ADVISORY_RULES for c in rule['when']}
@@ -0,0 +1,46 @@
+from agromet import api
+from agromet.api import EncodedResponse, ResponseCache, accepted_coding
+from agromet.products import ProductStore
+
+
+def test_accepted_coding_prefers_brotli_then_gzip():
+    assert accepted_coding('gzip, deflate, br', {'identity', 'gzip', 'br'}) == 'br'
+    assert accepted_coding('gzip, deflate, br', {'identity', 'gzip'}) == 'gzip'
+    assert accepted_coding('GZIP', {'identity', 'gzip'}) == 'gzip'
+
+
+def test_accepted_coding_honours_quality_values():
+    assert accepted_coding('br;q=0, gzip;q=0.5', {'identity', 'gzip', 'br'}) == 'gzip'
+    assert accepted_coding('gzip;q=0', {'identity', 'gzip'}) == 'identity'
+    assert accepted_coding('gzip;q=abc', {'identity', 'gzip'}) == 'identity'
+    assert accepted_coding('*', {'identity', 'gzip'}) == 'gzip'
+    assert accepted_coding('*;q=0, identity', {'identity', 'gzip'}) == 'identity'
+
+
+def test_missing_header_means_identity():
+    assert accepted_coding(None, {'identity', 'gzip'}) == 'identity'
+    assert accepted_coding('', {'identity', 'gzip'}) == 'identity'
+
+
+def test_each_coding_has_its_own_etag():
+    response = EncodedResponse(b'{"a":1}', 'application/json')
+    assert response.etag('identity') == f'"{response.tag}"'
+    assert response.etag('gzip') == f'"{response.tag}-gzip"'
+    assert response.etag('identity') != response.etag('gzip')
+
+
+def test_if_none_match_accepts_any_variant_of_the_body():
+    response = EncodedResponse(b'{"a":1}', 'application/json')
+    other = EncodedResponse(b'{"a":2}', 'application/json')
+    assert response.matches(response.etag('identity'))
+    assert response.matches(response.etag('gzip'))
+    assert response.matches(f'W/{response.etag("gzip")}')
+    assert response.matches(f'{other.etag("identity")}, {response.etag("identity")}')
+    assert response.matches('*')
+    assert not response.matches(other.etag('identity'))
+
+
+def test_unpublished_products_are_keyed_on_the_hourly_slot(tmp_path, monkeypatch):
+    monkeypatch.setattr(api, 'get_product_store', lambda: ProductStore(tmp_path))
+    monkeypatch.setattr(api, 'current_hour', lambda: '2024-06-30 14')
+    assert ResponseCache().current_run() == '2024-06-30 14'
@@ -0,0 +1,45 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from agromet.bulletin import _plain, bulletin_job, bulletin_path, render_bulletins
+
+
+def content(region='LACS', rain=12.0):
+    return {
+        'region': region,
+        'date': '30/06/2024',
+        'indicators': [["Pluie des 7 derniers jours", f"{rain:.0f} mm"], ["SPI-3", "-1.20"]],
+        'map': {'title': "Précipitations cumulées sur 30 jours", 'unit': "mm",
+                'palette': ['#ffffcc', '#41b6c4', '#253494'], 'values': {'LACS': rain, 'SAVANES': 3.0, 'GOH': 40.0}},
+        'rainfall': {'labels': ['Jan - Décade 1', 'Jan - Décade 2'], 'observed': [4.0, None], 'normal': [6.0, 8.5]},
+        'wrsi': [["Maïs", "100 %", "95 %", "n.d.", "97 %"]],
+        'alerts': [],
+        'advice': [["Riz", "**Sécheresse** : irriguer si possible 💧"]],
+        'calendar': [["S1", "Semis", "Favorables", "Haute"]]
+    }
+
+
+def test_plain_text_fits_the_standard_pdf_fonts():
+    assert _plain("**Alerte** œil ≈ 10 mm – pluie 🌧️") == "Alerte oeil ~ 10 mm - pluie"
+    assert _plain("Région Zuénoula") == "Région Zuénoula"
+
+
+def test_bulletin_path_follows_the_content():
+    assert bulletin_path('out', content()) == bulletin_path('out', content())
+    assert bulletin_path('out', content()) != bulletin_path('out', content(rain=13.0))
+
+
+def test_bulletin_is_rendered_once(tmp_path):
+    path = bulletin_job(content(), str(tmp_path))
+    with open(path, 'rb') as f:
+        assert f.read(5) == b'%PDF-'
+    modified = os.path.getmtime(path)
+    assert bulletin_job(content(), str(tmp_path)) == path
+    assert os.path.getmtime(path) == modified
+
+
+def test_batch_renders_one_pdf_per_region(tmp_path):
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        paths = render_bulletins([content('LACS'), content('GOH')], str(tmp_path), executor)
+    assert sorted(paths) == ['GOH', 'LACS']
+    assert all(os.path.exists(path) for path in paths.values())
@@ -0,0 +1,79 @@
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from agromet.climatology import (
+    DEKADS, Climatology, RunningStats, decade_rainfall_table, dekad_of_year, dekad_start, dekadal_totals
+)
+
+
+def test_merge_matches_single_pass():
+    values = np.random.default_rng(0).gamma(2.0, 15.0, (40, 3))
+    values[5, 1] = np.nan
+    merged = reduce(RunningStats.merge, [RunningStats.from_values(row) for row in values])
+    assert (merged.count == [40, 39, 40]).all()
+    assert np.allclose(merged.mean_values(), np.nanmean(values, axis=0))
+    assert np.allclose(merged.variance(), np.nanvar(values, axis=0, ddof=1))
+
+
+def test_add_and_merge_of_partial_aggregates_agree():
+    values = np.random.default_rng(1).gamma(2.0, 15.0, (30, 2))
+    first, second = RunningStats((2,)), RunningStats((2,))
+    for row in values[:12]:
+        first.add(slice(None), row)
+    for row in values[12:]:
+        second.add(slice(None), row)
+    merged = first.merge(second)
+    assert np.allclose(merged.mean_values(), values.mean(axis=0))
+    assert np.allclose(merged.variance(), values.var(axis=0, ddof=1))
+    assert (merged.sketch.sum(axis=-1) == 30).all()
+
+
+def test_empty_cells_are_nan():
+    stats = RunningStats.from_values([np.nan, 4.0])
+    assert np.isnan(stats.mean_values()[0]) and stats.mean_values()[1] == 4.0
+    assert np.isnan(stats.variance()).all()
+    assert np.isnan(stats.quantile(0.5)[0])
+
+
+def test_quantiles_follow_the_sample():
+    values = np.random.default_rng(2).gamma(2.0, 20.0, 5000)
+    stats = reduce(RunningStats.merge, [RunningStats.from_values([v]) for v in values])
+    for q in (0.1, 0.5, 0.9):
+        assert stats.quantile(q)[0] == pytest.approx(np.quantile(values, q), rel=0.1)
+    assert stats.quantile(1 / 3)[0] < stats.quantile(2 / 3)[0]
+
+
+def test_dekad_boundaries():
+    dates = ['2024-01-01', '2024-01-10', '2024-01-11', '2024-01-21', '2024-01-31', '2024-02-29', '2024-12-31']
+    assert list(dekad_of_year(dates)) == [1, 1, 2, 3, 3, 6, 36]
+    assert dekad_start('2024-02-29 15:00') == pd.Timestamp('2024-02-21')
+
+
+def test_dekadal_totals_sum_each_dekad():
+    days = pd.date_range('2024-01-01', '2024-03-31')
+    daily = pd.DataFrame({'A': 1.0, 'B': np.nan}, index=days)
+    daily.loc['2024-02-05', 'B'] = 12.0
+    totals = dekadal_totals(daily)
+    assert list(totals.loc[2024, 'A']) == [10, 10, 11, 10, 10, 9, 10, 10, 11]
+    # Une décade sans aucune donnée reste manquante au lieu de valoir 0
+    assert totals.loc[(2024, 4), 'B'] == 12.0 and totals['B'].isna().sum() == 8
+
+
+def test_normals_and_rainfall_table_from_saved_climatology(tmp_path):
+    days = pd.date_range('2021-01-01', '2024-12-31')
+    # 1, 2 puis 3 mm par jour de 2021 à 2023, 4 mm en 2024
+    daily = pd.DataFrame({'A': days.year - 2020.0, 'B': 2.0}, index=days)
+    Climatology.build(daily[daily.index.year < 2024]).save(tmp_path / 'climatology.npz')
+    climatology = Climatology.load(tmp_path / 'climatology.npz', stations=['B', 'A', 'C'])
+    normals = climatology.normals(2021, 2023)
+    assert normals.loc[1, 'A'] == pytest.approx(20.0) and normals.loc[1, 'B'] == pytest.approx(20.0)
+    assert normals['C'].isna().all()
+
+    table = decade_rainfall_table(climatology, daily, ['A'], 2024, normal_years=3)
+    assert len(table) == len(DEKADS)
+    assert table.loc[0, 'Pluie observée (mm)'] == 40.0 and table.loc[0, 'Année précédente (mm)'] == 30.0
+    # L'écart est calculé à partir des colonnes affichées
+    assert (table['Écart (mm)'] == (table['Pluie observée (mm)'] - table['Moyenne 30 ans (mm)']).round(1)).all()
@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+
+from agromet.evapotranspiration import extraterrestrial_radiation, hargreaves_et0, penman_monteith_et0, reference_et0
+
+
+def test_extraterrestrial_radiation_matches_fao56_example():
+    # FAO-56 exemple 8 : 20° S, 3 septembre
+    assert extraterrestrial_radiation(-20, 246) == pytest.approx(32.2, abs=0.05)
+
+
+def test_penman_monteith_matches_fao56_example():
+    # FAO-56 exemple 18 : Uccle, 6 juillet, vent de 10 km/h mesuré à 10 m
+    et0 = penman_monteith_et0(12.3, 21.5, 63, 84, 10 / 3.6, 9.25, 50.8, 187, elevation=100, wind_height=10)
+    assert et0 == pytest.approx(3.9, abs=0.05)
+
+
+def test_missing_humidity_falls_back_to_hargreaves():
+    et0 = reference_et0([20, 20], [32, 32], [40, np.nan], [90, 90], [2, 2], [8, 8], 7.5, 60)
+    assert et0[1] == pytest.approx(hargreaves_et0(20, 32, 7.5, 60))
+    assert et0[0] != pytest.approx(et0[1])
@@ -0,0 +1,49 @@
+import numpy as np
+
+from agromet.geometry import build_topology, douglas_peucker, simplify_topology
+
+
+def square(x, y):
+    return [(x, y), (x + 1, y), (x + 1, y + 1), (x, y + 1), (x, y)]
+
+
+def test_douglas_peucker_drops_points_within_tolerance():
+    points = np.array([(0, 0), (1, 0.01), (2, 1), (3, -0.01), (4, 0)], dtype=float)
+    assert list(douglas_peucker(points, 0.5)) == [0, 2, 4]
+    assert list(douglas_peucker(points, 5.0)) == [0, 4]
+
+
+def test_douglas_peucker_keeps_min_points():
+    points = np.array([(0, 0), (1, 0), (1, 1), (0, 1), (0, 0)], dtype=float)
+    assert len(douglas_peucker(points, 10.0, min_points=4)) == 4
+
+
+def test_shared_border_is_stored_once():
+    arcs, geometries = build_topology({'A': [[square(0, 0)]], 'B': [[square(1, 0)]]})
+    assert len(arcs) == 3
+    ring_a, ring_b = geometries['A'][0][0], geometries['B'][0][0]
+    shared = [arc for arc in ring_a if ~arc in ring_b]
+    assert len(shared) == 1
+    assert sorted(map(tuple, arcs[shared[0]])) == [(1.0, 0.0), (1.0, 1.0)]
+
+
+def test_island_ring_is_a_single_closed_arc():
+    arcs, geometries = build_topology({'A': [[square(0, 0)], [square(5, 5)]]})
+    assert [len(part[0]) for part in geometries['A']] == [1, 1]
+    assert all((arc[0] == arc[-1]).all() for arc in arcs)
+
+
+def test_simplified_neighbours_keep_the_same_border():
+    zigzag = [(1, 0), (1.01, 0.25), (0.99, 0.5), (1.01, 0.75), (1, 1)]
+    left = [(0, 0)] + zigzag + [(0, 1), (0, 0)]
+    right = zigzag[::-1] + [(2, 1), (2, 0), (1, 0)]
+    arcs, geometries = build_topology({'A': [[left]], 'B': [[right]]})
+    simplified = simplify_topology(arcs, geometries, 0.1)
+    shared = next(arc for arc in geometries['A'][0][0] if ~arc in geometries['B'][0][0])
+    # Anneau de deux arcs : un seul point intérieur est gardé sur la frontière commune
+    assert len(simplified[shared]) == 3
+    for parts in geometries.values():
+        ring = parts[0][0]
+        # Un anneau simplifié garde au moins trois sommets distincts
+        points = {tuple(p) for arc in ring for p in simplified[arc if arc >= 0 else ~arc]}
+        assert len(points) >= 3
@@ -0,0 +1,43 @@
+import os
+
+import pandas as pd
+
+from agromet.products import ProductStore, write_artifact
+
+
+def publish(store, day, value):
+    run_id, directory = store.begin(day)
+    files = write_artifact(directory, 'spi', value)
+    return store.publish(day, run_id, directory, {'spi': {'files': files}})
+
+
+def test_runs_started_in_the_same_second_are_distinct(tmp_path):
+    store = ProductStore(tmp_path)
+    first, _ = store.begin('2024-06-30')
+    second, _ = store.begin('2024-06-30')
+    assert first != second
+
+
+def test_unpublished_run_is_invisible(tmp_path):
+    store = ProductStore(tmp_path)
+    run_id, directory = store.begin('2024-06-30')
+    write_artifact(directory, 'spi', pd.DataFrame({'SPI-3': [0.5]}))
+    assert store.manifest('2024-06-30') is None
+    assert store.read('2024-06-30', 'spi') is None
+
+
+def test_publish_moves_latest_and_keeps_recent_runs(tmp_path):
+    store = ProductStore(tmp_path, keep_runs=1)
+    runs = [publish(store, '2024-06-30', pd.DataFrame({'SPI-3': [value]})) for value in (0.1, 0.2, 0.3)]
+    assert store.latest_run('2024-06-30') == runs[-1]
+    assert store.read('2024-06-30', 'spi')['SPI-3'].iloc[0] == 0.3
+    # LATEST et une exécution précédente (lecteurs en cours) sont gardés, la plus ancienne est supprimée
+    assert [os.path.exists(run) for run in runs] == [False, True, True]
+
+
+def test_publishing_a_new_day_prunes_past_days(tmp_path):
+    store = ProductStore(tmp_path)
+    old = publish(store, '2024-06-29', {'start': '2024-06-01'})
+    publish(store, '2024-06-30', {'start': '2024-06-01'})
+    assert not os.path.exists(old)
+    assert store.read('2024-06-30', 'spi') == {'start': '2024-06-01'}
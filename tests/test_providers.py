@@ -0,0 +1,26 @@
+import pandas as pd
+
+from agromet.providers import AutoProvider, ObservationProvider
+from agromet.weather import generate_weather_panel
+
+
+def test_auto_provider_falls_back_when_the_archive_is_stale(tmp_path):
+    provider = AutoProvider(tmp_path, coverage_days=30)
+    assert provider.source() is provider.synthetic
+    provider.observations.store.write(generate_weather_panel(days=60, end='2024-06-30'))
+    assert provider.source() is provider.synthetic
+    assert not provider.weather(start=pd.Timestamp.now().normalize() - pd.Timedelta(days=29)).empty
+
+
+def test_auto_provider_uses_an_archive_covering_the_window(tmp_path):
+    provider = AutoProvider(tmp_path, coverage_days=30)
+    today = pd.Timestamp.now().normalize()
+    provider.observations.store.write(generate_weather_panel(days=40, end=today))
+    assert provider.source() is provider.observations
+    assert provider.name == 'observations'
+
+
+def test_empty_archive_reads_as_an_empty_panel(tmp_path):
+    panel = ObservationProvider(tmp_path / 'absent').weather(start='2024-01-01', end='2024-01-31')
+    assert panel.empty
+    assert 'Précipitations (mm)' in panel.columns
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from agromet.seasonal import climatology_terciles, season_dates, seasonal_outlook, synthetic_ensemble
+
+
+def test_terciles_of_the_forecast_window():
+    # 9 années de 3 stations, x mm par décade l'année x ; une station sans climatologie
+    years = np.arange(1, 10, dtype=float)
+    dekadal = np.repeat(years[:, None, None], 36, axis=1).repeat(3, axis=2)
+    dekadal[:, :, 2] = np.nan
+    terciles = climatology_terciles(dekadal, '2024-01-01', 30)
+    expected = np.quantile(3 * years, [1 / 3, 2 / 3])
+    assert terciles[:, 0] == pytest.approx(expected) and terciles[:, 1] == pytest.approx(expected)
+    assert np.isnan(terciles[:, 2]).all()
+
+
+def test_outlook_does_not_depend_on_chunking():
+    ensemble = synthetic_ensemble('2024-05-01', months=3, members=20, stations=['Abidjan', 'Korhogo'])
+    terciles = np.array([[250.0, 150.0], [400.0, 300.0]])
+    chunked = seasonal_outlook(ensemble, terciles, chunk_members=3)
+    whole = seasonal_outlook(ensemble, terciles, chunk_members=20)
+    for name in whole:
+        pd.testing.assert_frame_equal(chunked[name], whole[name])
+    assert whole['terciles'].sum().to_numpy() == pytest.approx([100.0, 100.0])
+    assert list(whole['monthly_rain'].index) == ['Mai', 'Jun', 'Jul']
+
+
+def test_station_without_terciles_has_no_probabilities():
+    ensemble = synthetic_ensemble('2024-05-01', months=1, members=4, stations=['Abidjan', 'Korhogo'])
+    outlook = seasonal_outlook(ensemble, np.array([[1e6, np.nan], [1e6, np.nan]]))
+    assert (outlook['terciles']['Abidjan'] == [100.0, 0.0, 0.0]).all()
+    assert outlook['terciles']['Korhogo'].isna().all()
+
+
+def test_onset_and_cessation_dates():
+    dates = pd.date_range('2024-06-01', '2024-11-30')
+    last_rain = dates.get_loc(pd.Timestamp('2024-09-15'))
+    rain = np.zeros((1, len(dates), 1))
+    rain[0, 8:11, 0] = 8.0
+    rain[0, 11:last_rain + 1, 0] = 5.0
+    onset, cessation = season_dates(rain, dates)
+    # 24 mm du 9 au 11 juin ; moins de 10 mm sur les 20 jours qui suivent le 15 septembre
+    assert onset[0, 0] == 8
+    assert cessation[0, 0] == last_rain
@@ -0,0 +1,73 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from agromet import snapshots
+from agromet.products import ProductStore, artifact_name, write_artifact
+
+
+def publish(store, day, artifacts, **metadata):
+    run_id, directory = store.begin(day)
+    files = {name: {'files': write_artifact(directory, name, value)} for name, value in artifacts.items()}
+    store.publish(day, run_id, directory, files, **metadata)
+    return run_id
+
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    products = ProductStore(tmp_path / 'products')
+    views = ProductStore(tmp_path / 'snapshots', version=snapshots.SNAPSHOTS_VERSION)
+    builds = []
+    monkeypatch.setattr(snapshots, 'get_product_store', lambda: products)
+    monkeypatch.setattr(snapshots, 'get_snapshot_store', lambda: views)
+    monkeypatch.setattr(snapshots, 'current_hour', lambda: '2024-06-30 08')
+    monkeypatch.setattr(snapshots, 'build_snapshot', lambda page, region: builds.append((page, region)) or {'live': True})
+    snapshots._live_snapshot.cache_clear()
+    yield products, views, builds
+    snapshots._live_snapshot.cache_clear()
+
+
+def test_published_snapshot_is_read_without_rendering(stores):
+    products, views, builds = stores
+    day = datetime.now().strftime('%Y-%m-%d')
+    run = publish(products, day, {'spi': {'start': day}})
+    calendar = pd.DataFrame({'Activité': ['Semis'], 'Début': ['Avril']})
+    view = {'maps': {'reserve': {'html': '<div></div>', 'height': 450}}, 'figures': {}, 'calendar': calendar}
+    publish(views, day, {artifact_name('advice', 'Lagunes'): view}, products=run)
+
+    value = snapshots.load_snapshot('advice', 'Lagunes')
+    assert builds == []
+    assert value['maps'] == view['maps']
+    pd.testing.assert_frame_equal(value['calendar'], calendar)
+
+
+def test_stale_snapshots_fall_back_to_hourly_live_rendering(stores, monkeypatch):
+    products, views, builds = stores
+    day = datetime.now().strftime('%Y-%m-%d')
+    old = publish(products, day, {'spi': {'start': day}})
+    publish(views, day, {artifact_name('advice', 'Lagunes'): {'maps': {}}}, products=old)
+    # Nouveaux produits publiés après les vues : les vues ne sont plus servies
+    publish(products, day, {'spi': {'start': day}})
+
+    assert snapshots.load_snapshot('advice', 'Lagunes') == {'live': True}
+    snapshots.load_snapshot('advice', 'Lagunes')
+    assert builds == [('advice', 'Lagunes')]
+    monkeypatch.setattr(snapshots, 'current_hour', lambda: '2024-06-30 09')
+    snapshots.load_snapshot('advice', 'Lagunes')
+    assert len(builds) == 2
+
+
+def test_deviation_percent_follows_the_displayed_columns():
+    rainfall = pd.DataFrame({
+        'Période': ['Jan - D1', 'Jan - D2'],
+        'Pluie observée (mm)': [15.0, 4.0],
+        'Moyenne 30 ans (mm)': [10.0, 0.0],
+        'Écart (mm)': [5.0, 4.0],
+        'Année précédente (mm)': [8.0, 1.0]
+    })
+    deviations = snapshots.rainfall_deviations(rainfall)
+    assert deviations['Écart (%)'].iloc[0] == 50.0
+    # Pas de pourcentage sur une normale nulle
+    assert np.isnan(deviations['Écart (%)'].iloc[1])
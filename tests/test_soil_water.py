@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from agromet.soil_water import SoilWaterBalance, soil_parameters
+
+
+def frame(values, start='2024-06-01'):
+    values = np.asarray(values, dtype=float)
+    return pd.DataFrame(values, index=pd.date_range(start, periods=len(values)), columns=['A', 'B'][:values.shape[1]])
+
+
+def test_dry_days_deplete_and_rain_refills():
+    balance = SoilWaterBalance(['A'])
+    outputs = balance.run(range(20), np.zeros((20, 1)), np.full((20, 1), 5.0))
+    assert (np.diff(outputs['reserve_pct'][:, 0]) < 0).all()
+    # Au-delà de la RFU, le stress hydrique réduit l'évapotranspiration réelle
+    assert outputs['ks'][-1, 0] < 1.0
+    depleted = balance.reserve_percent()[0]
+    outputs = balance.step([60.0], [5.0])
+    # Une partie de la pluie ruisselle (SCS), le reste remplit la réserve
+    assert 0 < outputs['runoff'][0] < 60.0
+    assert balance.reserve_percent()[0] > depleted
+
+
+def test_sandy_soil_holds_less_water():
+    taw, raw, _ = soil_parameters(['A', 'B'], {'A': 'sableux', 'B': 'argileux'})
+    assert taw[0] < taw[1] and raw[0] < raw[1]
+
+
+def test_advance_only_integrates_new_days():
+    balance = SoilWaterBalance(['A', 'B'])
+    rain, et0 = frame(np.zeros((10, 2))), frame(np.full((10, 2), 4.0))
+    assert balance.advance(rain, et0) == 10
+    assert balance.advance(rain, et0) == 0
+    assert len(balance.reserve_history()) == 10
+
+
+def test_partial_day_is_integrated_once_complete():
+    balance = SoilWaterBalance(['A', 'B'])
+    et0 = frame(np.full((10, 2), 4.0))
+    partial = frame(np.zeros((10, 2)))
+    assert balance.advance(partial, et0, through=partial.index[-2]) == 9
+    # La pluie du dernier jour, complétée ensuite, est prise en compte
+    corrected = partial.copy()
+    corrected.iloc[-1] = 30.0
+    depleted = balance.reserve_percent().copy()
+    assert balance.advance(corrected, et0) == 1
+    assert (balance.reserve_percent() > depleted).all()
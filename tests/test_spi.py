@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from agromet.spi import MIN_FIT_YEARS, SPICalibration, fit_gamma, rolling_accumulation
+
+
+def test_thom_fit_recovers_gamma_parameters():
+    samples = np.random.default_rng(0).gamma(2.0, 10.0, (5000, 1))
+    alpha, beta, zero = fit_gamma(samples)
+    assert alpha[0] == pytest.approx(2.0, rel=0.05)
+    assert beta[0] == pytest.approx(10.0, rel=0.05)
+    assert zero[0] == 0.0
+
+
+def test_fit_counts_dry_years_and_ignores_missing_ones():
+    samples = np.random.default_rng(1).gamma(2.0, 10.0, (1000, 1))
+    samples[:300] = 0.0
+    samples[300:400] = np.nan
+    alpha, beta, zero = fit_gamma(samples)
+    assert zero[0] == pytest.approx(300 / 900)
+    assert alpha[0] == pytest.approx(2.0, rel=0.1)
+
+
+def test_fit_requires_enough_years():
+    alpha, beta, zero = fit_gamma(np.full((MIN_FIT_YEARS - 1, 1), 10.0))
+    assert np.isnan([alpha, beta, zero]).all()
+
+
+def test_spi_of_the_reference_sample_is_standard_normal():
+    samples = np.random.default_rng(2).gamma(2.0, 10.0, (3000, 36, 1))
+    calibration = SPICalibration(['A'], (1991, 2020), {'SPI-1': np.stack(fit_gamma(samples))})
+    spi = calibration.evaluate('SPI-1', 5, samples[:, 4, 0])
+    assert spi.mean() == pytest.approx(0.0, abs=0.05)
+    assert spi.std() == pytest.approx(1.0, abs=0.05)
+    assert np.isnan(calibration.evaluate('SPI-1', 5, [np.nan]))[0]
+
+
+def test_dry_window_sits_in_the_middle_of_the_zero_mass():
+    samples = np.random.default_rng(3).gamma(2.0, 10.0, (1000, 36, 1))
+    samples[:500] = 0.0
+    calibration = SPICalibration(['A'], (1991, 2020), {'SPI-1': np.stack(fit_gamma(samples))})
+    assert calibration.evaluate('SPI-1', 1, [0.0])[0] == pytest.approx(-0.674, abs=0.01)
+
+
+def test_rolling_accumulation_skips_incomplete_windows():
+    series = np.array([[1.0], [2.0], [np.nan], [4.0], [5.0], [6.0]])
+    accumulation = rolling_accumulation(series, 2)[:, 0]
+    assert np.isnan(accumulation[[0, 2, 3]]).all()
+    assert list(accumulation[[1, 4, 5]]) == [3.0, 9.0, 11.0]
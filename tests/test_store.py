@@ -0,0 +1,33 @@
+from agromet.store import ObservationStore
+from agromet.weather import generate_weather_panel
+
+
+def test_rewrite_does_not_duplicate_dates(tmp_path):
+    store = ObservationStore(tmp_path)
+    panel = generate_weather_panel(days=10, end='2024-01-05')
+    store.write(panel)
+    store.write(panel)
+    stored = store.read()
+    assert len(stored) == len(panel)
+    assert stored.index.is_unique
+
+
+def test_rewrite_keeps_new_values_and_other_dates(tmp_path):
+    store = ObservationStore(tmp_path)
+    store.write(generate_weather_panel(days=10, end='2024-01-05'))
+    update = generate_weather_panel(days=3, end='2024-01-06', seed=1)
+    store.write(update)
+    stored = store.read()
+    assert len(stored) == 11 * len(update.index.unique('Station'))
+    assert stored.index.is_unique
+    assert (stored.loc[update.index, 'Précipitations (mm)'].to_numpy()
+            == update['Précipitations (mm)'].round(1).to_numpy()).all()
+
+
+def test_other_instance_sees_new_writes(tmp_path):
+    reader = ObservationStore(tmp_path)
+    writer = ObservationStore(tmp_path)
+    writer.write(generate_weather_panel(days=10, end='2024-01-05'))
+    assert len(reader.read()) == 300
+    writer.write(generate_weather_panel(days=3, end='2024-01-08'))
+    assert len(reader.read()) == 390
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from agromet.timeseries import downsample_series, lttb
+
+
+def test_lttb_keeps_endpoints_and_threshold():
+    y = np.random.default_rng(0).normal(size=1000)
+    selected = lttb(np.arange(1000), y, 100)
+    assert len(selected) == 100
+    assert selected[0] == 0 and selected[-1] == 999
+    assert (np.diff(selected) > 0).all()
+
+
+def test_lttb_keeps_isolated_peaks():
+    y = np.zeros(1000)
+    y[[137, 612]] = [50.0, -40.0]
+    selected = lttb(np.arange(1000), y, 20)
+    assert {137, 612} <= set(selected)
+
+
+def test_lttb_returns_every_point_below_threshold():
+    assert list(lttb(np.arange(5), np.arange(5), 10)) == [0, 1, 2, 3, 4]
+    assert list(lttb(np.arange(5), np.arange(5), 2)) == [0, 1, 2, 3, 4]
+
+
+def test_downsample_series_ignores_missing_values():
+    index = pd.date_range('2000-01-01', periods=3000)
+    series = pd.Series(np.sin(np.arange(3000) / 50), index=index)
+    series.iloc[::7] = np.nan
+    reduced = downsample_series(series, 300)
+    assert len(reduced) == 300
+    assert reduced.notna().all()
+    assert reduced.index[0] == series.first_valid_index() and reduced.index[-1] == index[-1]
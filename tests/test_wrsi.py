@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from agromet.wrsi import CROP_CALENDARS, STAGE_NAMES, compute_wrsi
+
+
+def daily(value, regions=('A', 'B'), start='2024-05-01', end='2024-09-30'):
+    dates = pd.date_range(start, end, freq='D')
+    return pd.DataFrame(value, index=dates, columns=list(regions))
+
+
+def test_empty_rain_gives_an_empty_table():
+    empty = daily(0.0).iloc[:0]
+    wrsi = compute_wrsi(empty, empty)
+    assert wrsi.empty
+    assert list(wrsi.index.names) == ['Région', 'Culture', 'Scénario']
+    assert {'WRSI', 'Semis', *STAGE_NAMES} <= set(wrsi.columns)
+
+
+def test_one_row_per_region_crop_and_sowing_date():
+    wrsi = compute_wrsi(daily(5.0), daily(4.0), until='2024-08-15')
+    assert len(wrsi) == 2 * len(CROP_CALENDARS) * 3
+
+
+def test_ample_rain_satisfies_the_crop_and_drought_does_not():
+    et0 = daily(4.0)
+    rain = daily(0.0)
+    rain['A'] = 20.0
+    wrsi = compute_wrsi(rain, et0, until='2024-08-15')['WRSI']
+    watered, dry = wrsi.xs('A', level='Région'), wrsi.xs('B', level='Région')
+    assert (watered == 100).all()
+    # Sans pluie, seule la réserve initiale du sol est consommée
+    assert (dry < watered).all() and dry.mean() < 60
+    assert np.isfinite(wrsi).all()